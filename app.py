@@ -1,33 +1,65 @@
+import os
+import sys
 import streamlit as st
 from pathlib import Path
-from core.classify import classify_doc
-from core.checklist import detect_process_and_compare
-from core.redflags import analyze_document
-from core.comments import annotate_docx
-from core.summarize import build_report
-from core.ingest import build_index
-from core.rag import ask_gemini
+from core.engine import ReviewEngine
+from core.llm import get_client
+from core.embeddings import get_embedder
+from core.review_cache import get_review_cache
+from core.summarize import ReportWriter
+from core import telemetry
 
 REPO_ROOT = Path(__file__).resolve().parent
+ISSUES_PER_PAGE = 25
+# Review-only workers never build the index: core.ingest (pypdf, the chunker) is never imported and the
+# embedding model is only loaded if a citation was not precomputed at index time.
+REVIEW_ONLY = (os.getenv("REVIEW_ONLY") or "false").lower() == "true"
 
 st.set_page_config(page_title="ADGM Document Review", layout="wide")
 st.title("ADGM Corporate Agent — ADGM Document Review")
 
 @st.cache_resource
 def _ready():
-    return True
+    # Load the embedding model in the background so the first review doesn't pay for it.
+    embedder = get_embedder()
+    if not REVIEW_ONLY:
+        embedder.warm_up(background=True)
+    return embedder
 
-_ready()
+embedder = _ready()
 
 with st.sidebar:
     st.header("Admin")
-    st.caption("Run this once (after fetching sources) to build the RAG index.")
-    if st.button("Build ADGM RAG Index"):
-        try:
-            msg = build_index()
-            st.success(msg)
-        except Exception as e:
-            st.error(str(e))
+    if REVIEW_ONLY:
+        st.caption("Review-only mode: build the RAG index from a full install (REVIEW_ONLY=false).")
+    else:
+        st.caption("Run this once (after fetching sources) to build the RAG index.")
+        full_rebuild = st.checkbox("Full rebuild", value=False,
+                                   help="Re-extract and re-embed every reference instead of only changed files.")
+        if st.button("Build ADGM RAG Index"):
+            from core.ingest import build_index
+            try:
+                msg = build_index(incremental=not full_rebuild)
+                st.success(msg)
+            except Exception as e:
+                st.error(str(e))
+    with st.expander("Embedding model"):
+        st.json(embedder.stats())
+    if "core.rag" in sys.modules:  # only once a review or build has needed live retrieval
+        with st.expander("Retrieval cache"):
+            st.json(sys.modules["core.rag"].cache_stats())
+    with st.expander("Gemini client"):
+        st.json(get_client().stats())
+    review_cache = get_review_cache()
+    if review_cache is not None:
+        with st.expander("Review cache"):
+            st.json(review_cache.stats())
+            if st.button("Clear review cache"):
+                review_cache.clear()
+    show_perf = st.checkbox("Performance panel", value=False,
+                            help="Show a per-stage timing waterfall and pipeline counters after each review.")
+    archive_report = st.checkbox("Gzip report", value=False,
+                                 help="Write the streamed JSONL report gzip-compressed (report.jsonl.gz) for archival.")
 
 uploaded = st.file_uploader("Upload .docx files", type=["docx"], accept_multiple_files=True)
 run_btn = st.button("Run Review")
@@ -37,60 +69,77 @@ if run_btn and uploaded:
     (outputs_dir / "reviewed").mkdir(parents=True, exist_ok=True)
     (outputs_dir / "reports").mkdir(parents=True, exist_ok=True)
 
-    all_issues = []
-    doc_types = []
-
-    for file in uploaded:
-        temp_path = REPO_ROOT / "data" / "samples" / file.name
-        temp_path.parent.mkdir(parents=True, exist_ok=True)
-        temp_path.write_bytes(file.getbuffer())
-
-        dtype = classify_doc(temp_path)
-        doc_types.append({"filename": file.name, "type": dtype})
-
-        issues = analyze_document(temp_path, dtype)
-        all_issues.extend(issues)
-
-        reviewed_path = outputs_dir / "reviewed" / f"reviewed_{file.name}"
-        annotate_docx(temp_path, issues, reviewed_path)
-
-        st.success(f"Reviewed: {file.name}")
+    sources = [(file.name, file.getvalue()) for file in uploaded]
+
+    engine = ReviewEngine(outputs_dir)
+    report_path = outputs_dir / "reports" / ("report.jsonl.gz" if archive_report else "report.jsonl")
+    writer = ReportWriter(report_path)
+    progress = st.progress(0.0, text="Reviewing documents…")
+    results = []
+    for result in engine.iter_review(sources):
+        results.append(result)
+        writer.add_document(result)
+        progress.progress(len(results) / len(sources), text=f"Reviewed {len(results)}/{len(sources)}")
+        if result.error:
+            st.error(f"Failed: {result.filename} — {result.error}")
+            continue
+        st.success(f"Reviewed: {result.filename}" + (" (cached)" if result.cached else ""))
         st.download_button(
             "⬇ Download reviewed .docx",
-            data=reviewed_path.read_bytes(),
-            file_name=reviewed_path.name,
-            key=f"dl-{file.name}"
+            data=result.reviewed_path.read_bytes(),
+            file_name=result.reviewed_path.name,
+            key=f"dl-{result.filename}"
         )
 
-    if all_issues:
-        bullets = "\n".join(
-            f"- {i.get('document')}: {i.get('section')} — {i.get('issue')} "
-            f"(Suggestion: {i.get('suggestion')})"
-            for i in all_issues if i.get("issue")
-        )
-        phrased_overall = ask_gemini(
-            "Rewrite these cross-document compliance findings as 5–7 concise, professional bullets for an executive summary.",
-            bullets[:8000]  
-        )
-        if phrased_overall and not phrased_overall.startswith("("):
-            all_issues.append({
-                "document": "ALL",
-                "section": "Summary",
-                "issue": "LLM phrased overall review notes",
-                "severity": "Info",
-                "suggestion": phrased_overall,
-                "citations": []
-            })
-
-    process_info = detect_process_and_compare(doc_types)
-    report = build_report(process_info, doc_types, all_issues)
-    report_path = outputs_dir / "reports" / "report.json"
-    report_path.write_text(report, encoding="utf-8")
-
+    pack = engine.finalize(results, json_report=False)
+    summary = writer.close(pack.process_info, [i for i in pack.issues if i.get("document") == "ALL"])
+    st.session_state["last_review"] = {
+        "summary": summary,
+        "process_info": pack.process_info,
+        "issues": [{"document": i.get("document"), "section": i.get("section"), "severity": i.get("severity"),
+                    "issue": i.get("issue"), "suggestion": i.get("suggestion"),
+                    "citations": len(i.get("citations") or [])} for i in pack.issues],
+        "report_path": str(report_path),
+        "run_id": engine.run_id,
+    }
+
+last = st.session_state.get("last_review")
+if last:
     st.subheader("Checklist Result")
-    st.json(process_info)
+    st.json(last["process_info"])
 
     st.subheader("Issues Found")
-    st.json(all_issues)
-
-    st.download_button("⬇ Download JSON Report", data=report, file_name="report.json")
+    summary = last["summary"]
+    cols = st.columns(3)
+    cols[0].metric("Documents", summary["documents_uploaded"])
+    cols[1].metric("Issues", summary["issues_found"])
+    cols[2].metric("Missing documents", len(summary["missing_document"]))
+    if summary["issues_by_severity"]:
+        st.caption(" · ".join(f"{k}: {v}" for k, v in sorted(summary["issues_by_severity"].items())))
+    issues = last["issues"]
+    pages = max(1, -(-len(issues) // ISSUES_PER_PAGE))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+    start = (page - 1) * ISSUES_PER_PAGE
+    st.dataframe(issues[start:start + ISSUES_PER_PAGE], use_container_width=True)
+    st.caption(f"Issues {start + 1 if issues else 0}–{min(start + ISSUES_PER_PAGE, len(issues))} of {len(issues)}; "
+               "citation texts are in the downloadable report.")
+
+    report_path = Path(last["report_path"])
+    if report_path.exists():
+        st.download_button("⬇ Download report (JSONL)", data=report_path.read_bytes(), file_name=report_path.name)
+
+    if show_perf:
+        st.subheader("Performance")
+        rows = telemetry.waterfall(last["run_id"])
+        if rows:
+            st.vega_lite_chart(rows, {
+                "mark": {"type": "bar", "tooltip": True, "opacity": 0.85},
+                "encoding": {
+                    "y": {"field": "document", "type": "nominal", "title": None},
+                    "x": {"field": "start_ms", "type": "quantitative", "title": "ms since run start"},
+                    "x2": {"field": "end_ms"},
+                    "color": {"field": "stage", "type": "nominal"},
+                },
+            }, use_container_width=True)
+        with st.expander("Counters"):
+            st.json(telemetry.counters())
@@ -0,0 +1,184 @@
+"""
+A local stand-in for the Gemini REST API, for exercising GeminiClient offline.
+
+    python -m bench.fake_gemini --port 8089 --latency 0.2     # serve; set GEMINI_API_ENDPOINT=http://127.0.0.1:8089
+    python -m bench.fake_gemini --port 8089 --fail 429,500    # first two requests fail, then succeed
+    python -m bench.fake_gemini --check                       # run the client's retry/quota/bucket/dedupe checks
+
+Answers POST /v1beta/models/<model>:generateContent with a deterministic
+reply. Scripted failures are returned in order before any success, and every
+request is recorded (time and prompt) so checks can assert on what reached
+the server.
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Sequence
+
+ERRORS = {
+    429: ("RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota)."),
+    500: ("INTERNAL", "An internal error has occurred."),
+    503: ("UNAVAILABLE", "The service is currently unavailable."),
+    400: ("INVALID_ARGUMENT", "Request contains an invalid argument."),
+}
+
+class FakeGemini:
+    """Threaded HTTP server on 127.0.0.1; use as a context manager."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail: Sequence[int] = ()):
+        self.latency = latency
+        self.requests: List[Dict] = []
+        self._fail = list(fail)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                                 for part in content.get("parts", []))
+                status = fake._record(self.path, prompt)
+                time.sleep(fake.latency)
+                if status != 200:
+                    code, message = ERRORS.get(status, ("UNKNOWN", "Fake failure."))
+                    payload = {"error": {"code": status, "message": message, "status": code}}
+                else:
+                    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+                    payload = {"candidates": [{"content": {"role": "model",
+                                                           "parts": [{"text": f"Fake reply {digest}."}]},
+                                               "finishReason": "STOP", "index": 0}]}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _record(self, path: str, prompt: str) -> int:
+        with self._lock:
+            self.requests.append({"at": time.monotonic(), "path": path, "prompt": prompt})
+            return self._fail.pop(0) if self._fail else 200
+
+    def fail_next(self, *statuses: int):
+        with self._lock:
+            self._fail.extend(statuses)
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self._fail.clear()
+
+    def start(self) -> "FakeGemini":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "FakeGemini":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def check() -> List[str]:
+    """Run GeminiClient against a fake server; returns failed checks (empty when all pass)."""
+    from core import llm
+
+    failures = []
+
+    def client(fake: FakeGemini, rpm: float = 0, max_retries: int = 2) -> llm.GeminiClient:
+        c = llm.GeminiClient(api_key="fake", model_name="gemini-fake", endpoint=fake.endpoint, rpm=rpm,
+                             max_retries=max_retries, cache_path=None)
+        c._call("warm up")  # configure the SDK once, outside the timed checks
+        fake.reset()
+        return c
+
+    def expect(name: str, ok: bool, detail: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+        if not ok:
+            failures.append(name)
+
+    with FakeGemini() as fake:
+        c = client(fake)
+        fake.fail_next(500, 500)  # the SDK retries 503 itself; 500 reaches the client's own backoff
+        text = c.generate("retry me")
+        expect("retry", text.startswith("Fake reply") and len(fake.requests) == 3 and c.counters["retries"] == 2,
+               f"{len(fake.requests)} requests, {c.counters['retries']} retries")
+
+        c = client(fake, max_retries=1)
+        fake.fail_next(429, 429)
+        try:
+            c.generate("over quota")
+            raised = False
+        except llm.QuotaExceeded:
+            raised = True
+        expect("quota", raised and len(fake.requests) == 2, f"QuotaExceeded={raised}, {len(fake.requests)} requests")
+
+        c = client(fake)
+        fake.fail_next(400)
+        try:
+            c.generate("bad request")
+            raised = None
+        except Exception as e:
+            raised = e
+        expect("no retry on client errors", isinstance(raised, Exception) and not isinstance(raised, llm.QuotaExceeded)
+               and len(fake.requests) == 1, f"{type(raised).__name__}, {len(fake.requests)} requests")
+
+        fake.latency = 0.3
+        c = client(fake)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            answers = list(pool.map(lambda _: c.generate("same prompt"), range(8)))
+        fake.latency = 0.0
+        expect("dedupe", len(set(answers)) == 1 and len(fake.requests) == 1,
+               f"{len(fake.requests)} requests for 8 identical prompts, {c.counters['deduplicated']} deduplicated")
+
+        c = client(fake, rpm=600)  # one request per 0.1 s once the single-token burst is spent
+        for i in range(4):
+            c.generate(f"bucket {i}")
+        times = [r["at"] for r in fake.requests]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        expect("bucket", len(times) == 4 and min(gaps) >= 0.08, "gaps " + ", ".join(f"{g * 1000:.0f} ms" for g in gaps))
+    return failures
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a fake Gemini REST API, or check GeminiClient against one.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--fail", default="", help="comma-separated HTTP statuses returned before the first success")
+    parser.add_argument("--check", action="store_true", help="run the client checks and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 1 if check() else 0
+    fail = [int(s) for s in args.fail.split(",") if s.strip()]
+    fake = FakeGemini(args.port, args.latency, fail)
+    print(f"Fake Gemini listening on {fake.endpoint} (GEMINI_API_ENDPOINT={fake.endpoint})")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Stand-ins for the network-bound and heavyweight pieces, so benchmarks are repeatable offline."""
+import re
+import time
+import hashlib
+from typing import List
+
+import numpy as np
+
+from core import embeddings, llm
+
+class FakeGeminiClient(llm.GeminiClient):
+    """
+    The real client (dedup, counters, telemetry) with the network call replaced
+    by a fixed delay and a deterministic answer. No response cache, so every
+    distinct prompt pays the delay once.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        super().__init__(api_key="bench", model_name="fake-gemini", endpoint=None, rpm=0,
+                         max_retries=0, cache_path=None)
+        self.latency = latency
+
+    def _call(self, prompt: str) -> str:
+        self._count("calls")
+        time.sleep(self.latency)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"- Review note {digest}: address the findings listed above before submission."
+
+class _HashingModel:
+    _TOKEN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self._TOKEN.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.where(norms == 0, 1.0, norms)
+        return out
+
+class HashingEmbedder(embeddings.EmbeddingService):
+    """Feature-hashing embeddings: no model download, deterministic, fast."""
+
+    def __init__(self, dim: int = 384):
+        super().__init__(model_name=f"hashing-{dim}")
+        self._model = _HashingModel(dim)
+
+def install(embedder: str = "hashing", llm_latency: float = 0.05) -> embeddings.EmbeddingService:
+    """
+    Route get_embedder() and get_client() to bench implementations. `embedder`
+    is "hashing" or a sentence-transformers model name (e.g. a small MiniLM).
+    """
+    service = HashingEmbedder() if embedder == "hashing" else embeddings.EmbeddingService(embedder)
+    embeddings._service = service
+    llm._client = FakeGeminiClient(latency=llm_latency)
+    llm.API_KEY = "bench"
+    llm.ENABLE_LLM = True
+    return service
@@ -0,0 +1,162 @@
+"""
+Import-time profile of the entry points.
+
+    python -m bench.imports                    # compare against bench/import_baseline.json
+    python -m bench.imports --update-baseline  # record a new baseline
+    python -m bench.imports --top 20
+
+Each profile is imported in a fresh interpreter under `-X importtime` (after
+one warm-up run so bytecode compilation is not counted). Reports the median
+total per profile and the packages that cost the most (self time summed per
+top-level package). Exits 1 when a profile is slower than the baseline by
+more than --threshold, or when the review path imports a heavy dependency it
+should only load on demand.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+BASELINE = BENCH_DIR / "import_baseline.json"
+RESULTS = BENCH_DIR / "results" / "imports.json"
+
+# profile -> modules imported together, as the corresponding entry point does.
+PROFILES = {
+    "review": ["core.engine", "core.summarize", "core.review_cache", "core.llm", "core.embeddings",
+               "core.telemetry"],  # app.py with REVIEW_ONLY=true, before the first review
+    "batch": ["core.batch"],
+    "retrieval": ["core.rag"],
+    "ingest": ["core.ingest"],
+}
+
+# Loaded on first use only; importing any of these on the review path is a regression.
+REVIEW_FORBIDDEN = ("core.ingest", "core.rag", "core.vectorstore", "langchain", "sentence_transformers", "torch",
+                    "transformers", "chromadb", "faiss", "google.generativeai", "pypdf")
+LAZY_PROFILES = ("review", "batch")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def profile(modules: List[str]) -> Dict:
+    """One `-X importtime` run: total microseconds, modules loaded and self time per top-level package."""
+    env = dict(os.environ, REVIEW_ONLY="true")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+                          cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    total = 0
+    loaded = []
+    packages: Counter = Counter()
+    errors = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            if line.strip() and not line.startswith("import time:"):
+                errors.append(line)
+            continue
+        self_us, cumulative_us, indent, name = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        if len(indent) <= 1:  # top-level import
+            total += cumulative_us
+        loaded.append(name)
+        packages[name.split(".")[0]] += self_us
+    return {"total_us": total, "modules": loaded, "packages": dict(packages),
+            "error": errors[-1] if proc.returncode else None}
+
+def run(args) -> Dict:
+    profiles = {}
+    for name, modules in PROFILES.items():
+        profile(modules)  # warm-up: compile .pyc files
+        runs = [profile(modules) for _ in range(args.repeat)]
+        last = runs[-1]
+        forbidden = []
+        if name in LAZY_PROFILES:
+            forbidden = sorted({f for f in REVIEW_FORBIDDEN for m in last["modules"]
+                                if m == f or m.startswith(f + ".")})
+        profiles[name] = {
+            "modules": modules,
+            "median_s": statistics.median(r["total_us"] for r in runs) / 1e6,
+            "min_s": min(r["total_us"] for r in runs) / 1e6,
+            "n_modules": len(last["modules"]),
+            "packages": dict(Counter(last["packages"]).most_common(args.top)),
+            "forbidden": forbidden,
+            "error": last["error"],
+        }
+    return {
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "profiles": profiles,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta: float) -> List[str]:
+    """Profiles whose median import time regressed by more than `threshold` (fraction) and `min_delta` seconds."""
+    regressions = []
+    for name, cur in current["profiles"].items():
+        base = baseline.get("profiles", {}).get(name)
+        if not base or cur["error"] or base.get("error"):
+            continue
+        slower = cur["median_s"] - base["median_s"]
+        if cur["median_s"] > base["median_s"] * (1 + threshold) and slower > min_delta:
+            regressions.append(f"{name}: {base['median_s'] * 1000:.0f} ms -> {cur['median_s'] * 1000:.0f} ms "
+                               f"(+{slower / base['median_s'] * 100:.0f}%)")
+    return regressions
+
+def print_report(current: Dict, baseline: Optional[Dict]):
+    print(f"{'profile':<12}{'modules':>9}{'median ms':>12}{'min ms':>10}{'baseline':>12}{'change':>9}")
+    for name, cur in current["profiles"].items():
+        line = f"{name:<12}{cur['n_modules']:>9}{cur['median_s'] * 1000:>12.1f}{cur['min_s'] * 1000:>10.1f}"
+        base = (baseline or {}).get("profiles", {}).get(name)
+        if base and base["median_s"]:
+            line += f"{base['median_s'] * 1000:>12.1f}{(cur['median_s'] / base['median_s'] - 1) * 100:>+8.0f}%"
+        print(line)
+    for name, cur in current["profiles"].items():
+        if cur["error"]:
+            print(f"\n{name}: import failed ({cur['error']}); timings are partial.")
+        heaviest = ", ".join(f"{pkg} {us / 1000:.0f} ms" for pkg, us in cur["packages"].items())
+        print(f"\n{name} heaviest packages: {heaviest}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile import time of the review, batch, retrieval and ingest paths.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="packages listed per profile")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--out", type=Path, default=RESULTS)
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=50.0, help="ignore regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    print_report(current, None if args.update_baseline else baseline)
+
+    status = 0
+    for name, cur in current["profiles"].items():
+        if cur["forbidden"]:
+            print(f"\n{name} imports on-demand dependencies eagerly: {', '.join(cur['forbidden'])}")
+            status = 1
+    if args.update_baseline or baseline is None:
+        args.baseline.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+        return status
+    regressions = compare(current, baseline, args.threshold, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"\nImport-time regressions beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"- {r}")
+        return 1
+    if not status:
+        print("\nNo regressions.")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Benchmark the review pipeline on synthetic data.
+
+    python -m bench.run                        # compare against bench/baseline.json
+    python -m bench.run --update-baseline      # record a new baseline
+    python -m bench.run --docs 20 --pages 10 --embedder sentence-transformers/all-MiniLM-L6-v2
+
+Everything runs in a scratch directory (references, index, outputs) with a
+fake Gemini client and, by default, a feature-hashing embedder. Exits 1 when
+a stage's median is slower than the baseline by more than --threshold.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Optional, Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE = BENCH_DIR / "baseline.json"
+RESULTS = BENCH_DIR / "results" / "latest.json"
+
+EXTRA_QUERIES = [
+    "minimum share capital for a private company limited by shares",
+    "appointment and removal of directors",
+    "ultimate beneficial owner register requirements",
+    "registered office address change notification",
+]
+
+# Parameters that must match for a comparison with the baseline to be meaningful.
+PARAMS = ("docs", "pages", "paragraphs", "tables", "placeholders", "bad_jurisdiction",
+          "corpus_files", "embedder", "llm_latency", "vector_db")
+
+def _timed(fn: Callable) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def _summary(samples: List[float]) -> Dict:
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "n": len(samples)}
+
+def run(args) -> Dict:
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="adgm-bench-"))
+    # Must be set before core modules are imported: they resolve paths and backends at import.
+    os.environ["ADGM_INDEX_DIR"] = str(workdir / "index")
+    os.environ["ADGM_REFS_DIR"] = str(workdir / "refs")
+    os.environ["RAG_CACHE_DIR"] = ""
+    os.environ["REVIEW_CACHE"] = "true"
+    os.environ["REVIEW_CACHE_PATH"] = str(workdir / "review_cache.sqlite")
+    os.environ["VECTOR_DB"] = args.vector_db
+
+    from bench import synth, fakes
+    from core import ingest, rag
+    from core.classify import classify_doc
+    from core.comments import annotate_docx
+    from core.engine import ReviewEngine
+    from core.parsed import ParsedDocument
+    from core.redflags import analyze_document
+    from core.rules import get_ruleset
+
+    fakes.install(args.embedder, args.llm_latency)
+    synth.make_corpus(workdir / "refs", n_files=args.corpus_files)
+    pack = synth.make_pack(workdir / "pack", n_docs=args.docs, pages=args.pages, paragraphs=args.paragraphs,
+                           tables=args.tables, placeholders=args.placeholders,
+                           bad_jurisdiction=args.bad_jurisdiction)
+    out_dir = workdir / "outputs"
+    (out_dir / "annotated").mkdir(parents=True, exist_ok=True)
+
+    samples: Dict[str, List[float]] = {}
+    queries = [r.query for r in get_ruleset().rules if r.query] + EXTRA_QUERIES
+    for _ in range(args.repeat):
+        samples.setdefault("build_index", []).append(_timed(lambda: ingest.build_index(incremental=False)))
+        samples.setdefault("build_index_noop", []).append(_timed(lambda: ingest.build_index(incremental=True)))
+
+        rag.clear_caches()
+        for q in queries:
+            samples.setdefault("retrieve_cold", []).append(_timed(lambda: rag.retrieve(q)))
+        for q in queries:
+            samples.setdefault("retrieve_warm", []).append(_timed(lambda: rag.retrieve(q)))
+        rag.clear_caches()
+
+        for path in pack:
+            t0 = time.perf_counter()
+            parsed = ParsedDocument.from_path(path)
+            samples.setdefault("parse", []).append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            doc_type = classify_doc(parsed)
+            samples.setdefault("classify_doc", []).append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            issues = analyze_document(parsed, doc_type)
+            samples.setdefault("analyze_document", []).append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            annotate_docx(parsed, issues, out_dir / "annotated" / path.name)
+            samples.setdefault("annotate_docx", []).append(time.perf_counter() - t0)
+
+        rag.clear_caches()
+        engine = ReviewEngine(out_dir / "engine", max_workers=args.workers, use_cache=False)
+        samples.setdefault("review_pack", []).append(_timed(lambda: engine.finalize(engine.review(pack))))
+        cached = ReviewEngine(out_dir / "engine", max_workers=args.workers)
+        cached.review(pack)  # populate the review cache
+        samples.setdefault("review_pack_cached", []).append(_timed(lambda: cached.finalize(cached.review(pack))))
+        cached.cache.clear()
+
+    if not args.workdir and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "params": {k: getattr(args, k) for k in PARAMS},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": {name: _summary(values) for name, values in samples.items()},
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta: float) -> List[str]:
+    """Stages whose median regressed by more than `threshold` (fraction) and `min_delta` seconds."""
+    regressions = []
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        slower = cur["median_s"] - base["median_s"]
+        if cur["median_s"] > base["median_s"] * (1 + threshold) and slower > min_delta:
+            regressions.append(f"{name}: {base['median_s'] * 1000:.1f} ms -> {cur['median_s'] * 1000:.1f} ms "
+                               f"(+{slower / base['median_s'] * 100:.0f}%)")
+    return regressions
+
+def print_table(current: Dict, baseline: Optional[Dict]):
+    print(f"{'stage':<20}{'n':>6}{'median ms':>12}{'min ms':>10}{'baseline':>12}{'change':>9}")
+    for name, cur in current["stages"].items():
+        base = (baseline or {}).get("stages", {}).get(name)
+        line = f"{name:<20}{cur['n']:>6}{cur['median_s'] * 1000:>12.1f}{cur['min_s'] * 1000:>10.1f}"
+        if base:
+            change = (cur["median_s"] / base["median_s"] - 1) * 100 if base["median_s"] else 0.0
+            line += f"{base['median_s'] * 1000:>12.1f}{change:>+8.0f}%"
+        print(line)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ingest, retrieval and review on synthetic ADGM packs.")
+    parser.add_argument("--docs", type=int, default=6, help="documents in the synthetic pack")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--paragraphs", type=int, default=12, help="numbered clauses per page")
+    parser.add_argument("--tables", type=int, default=1, help="tables per document")
+    parser.add_argument("--placeholders", type=int, default=2, help="unresolved placeholders per document")
+    parser.add_argument("--bad-jurisdiction", type=int, default=1, help="documents citing UAE Federal Courts")
+    parser.add_argument("--corpus-files", type=int, default=12, help="synthetic reference documents to index")
+    parser.add_argument("--embedder", default="hashing", help='"hashing" or a sentence-transformers model name')
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake Gemini call")
+    parser.add_argument("--vector-db", default="chroma", choices=["chroma", "faiss"])
+    parser.add_argument("--workers", type=int, default=4, help="ReviewEngine workers for the pack review")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--out", type=Path, default=RESULTS)
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore regressions smaller than this")
+    parser.add_argument("--workdir", type=Path, help="scratch directory (default: a temp dir, removed afterwards)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary scratch directory")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(current, indent=2), encoding="utf-8")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    if args.update_baseline or baseline is None:
+        print_table(current, None)
+        args.baseline.write_text(json.dumps(current, indent=2), encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    print_table(current, baseline)
+    if baseline.get("params") != current["params"]:
+        print("\nBaseline was recorded with different parameters; rerun with --update-baseline to compare.")
+        return 2
+    regressions = compare(current, baseline, args.threshold, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"- {r}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
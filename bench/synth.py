@@ -0,0 +1,108 @@
+"""Synthetic ADGM incorporation packs and reference corpus for benchmarking."""
+import random
+from pathlib import Path
+from typing import List
+
+from docx import Document
+
+# Document titles the classifier recognises, in checklist order.
+PACK_TITLES = [
+    "Articles of Association",
+    "Memorandum of Association",
+    "Board Resolution",
+    "Shareholder Resolution",
+    "Register of Members",
+    "Register of Directors",
+    "UBO Declaration",
+    "Incorporation Application Form",
+]
+
+# (category, doc_type) rows from data/sources_manifest.csv whose filename prefix
+# survives as-is, so synthetic references pick up real categories for `where` filters.
+CORPUS_SOURCES = [
+    ("Company Formation", "Resolution for Incorporation (LTD - Multiple Shareholders)"),
+    ("Regulatory Guidance", "Company Incorporation Package (Rulebook)"),
+    ("Employment & HR", "Standard Employment Contract Template (2019 short)"),
+]
+
+WORDS = (
+    "company shares director shareholder resolution registered office capital liability member "
+    "meeting notice board quorum transfer allotment dividend accounts auditor registrar application "
+    "beneficial owner declaration agreement governing law court dispute execution seal "
+    "article memorandum objects powers appointment removal vote proxy special ordinary"
+).split()
+
+PLACEHOLDERS = ["[Company Name]", "[Date]", "[Registered Address]", "[Director Name]", "[●]"]
+BAD_JURISDICTION = "Any dispute arising out of this document shall be referred to the UAE Federal Courts."
+GOOD_JURISDICTION = "This document is governed by ADGM law; disputes are subject to ADGM Courts."
+
+def _sentence(rng: random.Random, n_words: int = 18) -> str:
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng, rng.randint(12, 24)) for _ in range(rng.randint(2, 5)))
+
+def make_document(path: Path, title: str, rng: random.Random, pages: int = 3, paragraphs: int = 12,
+                  tables: int = 1, placeholders: int = 2, bad_jurisdiction: bool = False, signed: bool = True):
+    """One .docx of roughly `pages` pages, each with `paragraphs` numbered clauses."""
+    doc = Document()
+    doc.add_heading(title, level=1)
+    doc.add_paragraph("ADGM Private Company Limited by Shares")
+    clause = 1
+    for page in range(pages):
+        doc.add_heading(f"PART {page + 1}", level=2)
+        for i in range(paragraphs):
+            doc.add_paragraph(f"{clause}. {_paragraph(rng)}")
+            clause += 1
+        for _ in range(tables if page == 0 else 0):
+            table = doc.add_table(rows=4, cols=3)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = "Name" if r == 0 and c == 0 else rng.choice(WORDS).title()
+        if page < pages - 1:
+            doc.add_page_break()
+    for i in range(placeholders):
+        doc.add_paragraph(f"{clause}. The {rng.choice(WORDS)} shall be {PLACEHOLDERS[i % len(PLACEHOLDERS)]}.")
+        clause += 1
+    doc.add_paragraph(f"{clause}. {BAD_JURISDICTION if bad_jurisdiction else GOOD_JURISDICTION}")
+    if signed:
+        doc.add_paragraph("Signed by: ____________________  Authorised Signatory")
+    doc.save(str(path))
+
+def make_pack(out_dir: Path, n_docs: int = 5, pages: int = 3, paragraphs: int = 12, tables: int = 1,
+              placeholders: int = 2, bad_jurisdiction: int = 1, seed: int = 7) -> List[Path]:
+    """An incorporation pack; the first `bad_jurisdiction` documents cite UAE Federal Courts."""
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        title = PACK_TITLES[i % len(PACK_TITLES)]
+        path = out_dir / f"{i:03d}_{title.replace(' ', '_')}.docx"
+        make_document(path, title, rng, pages=pages, paragraphs=paragraphs, tables=tables,
+                      placeholders=placeholders, bad_jurisdiction=i < bad_jurisdiction, signed=i % 4 != 3)
+        paths.append(path)
+    return paths
+
+def make_corpus(out_dir: Path, n_files: int = 12, sections: int = 6, clauses: int = 10, seed: int = 11) -> List[Path]:
+    """Reference .docx files with headings and numbered clauses, named like fetched ADGM sources."""
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_files):
+        category, doc_type = CORPUS_SOURCES[i % len(CORPUS_SOURCES)]
+        path = out_dir / f"{category}__{doc_type}__synthetic_{i:03d}.docx".replace(" ", "_")
+        doc = Document()
+        doc.add_heading(f"{doc_type} — reference {i}", level=1)
+        for s in range(sections):
+            doc.add_heading(f"{s + 1}. {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}", level=2)
+            for c in range(clauses):
+                doc.add_paragraph(f"{s + 1}.{c + 1} {_paragraph(rng)}")
+            if s == 0:
+                doc.add_paragraph(f"{s + 1}.{clauses + 1} {GOOD_JURISDICTION} "
+                                  "Documents must be executed by an authorised signatory.")
+        doc.save(str(path))
+        paths.append(path)
+    return paths
@@ -0,0 +1,220 @@
+"""
+Headless batch review of document packs.
+
+    python -m core.batch INPUT_DIR --out outputs/batch
+    python -m core.batch --manifest packs.csv --out outputs/batch
+    python -m core.batch INPUT_DIR --report-format jsonl.gz
+
+Each immediate subdirectory of INPUT_DIR is one client pack (all .docx files
+below it); loose .docx files directly in INPUT_DIR form a pack named "_root".
+A manifest CSV with `pack,path` columns can be used instead. Packs whose
+content hash matches the last successful run are skipped. Reviewed copies
+mirror each pack's folder tree under OUT/<pack>/reviewed/.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from core.engine import ReviewEngine, REVIEW_WORKERS
+from core.summarize import ReportWriter
+
+PROGRESS_FILE = "progress.json"
+REPORT_FORMATS = ("json", "jsonl", "jsonl.gz")
+
+def discover_packs(root: Path) -> Dict[str, List[Path]]:
+    packs: Dict[str, List[Path]] = {}
+    loose = sorted(p for p in root.glob("*.docx") if p.is_file())
+    if loose:
+        packs["_root"] = loose
+    for sub in sorted(p for p in root.iterdir() if p.is_dir()):
+        files = sorted(p for p in sub.rglob("*.docx") if p.is_file() and not p.name.startswith("~$"))
+        if files:
+            packs[sub.name] = files
+    return packs
+
+def read_pack_manifest(path: Path) -> Dict[str, List[Path]]:
+    packs: Dict[str, List[Path]] = {}
+    with path.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            fp = Path(row["path"].strip())
+            if not fp.is_absolute():
+                fp = path.parent / fp
+            packs.setdefault(row["pack"].strip(), []).append(fp)
+    return packs
+
+def pack_root(files: List[Path]) -> Optional[Path]:
+    """Deepest directory containing every file of the pack; outputs mirror the tree below it."""
+    try:
+        return Path(os.path.commonpath([str(fp.resolve().parent) for fp in files]))
+    except ValueError:  # e.g. files on different drives
+        return None
+
+def _relative_name(fp: Path, root: Optional[Path]) -> str:
+    try:
+        return fp.resolve().relative_to(root).as_posix() if root else fp.name
+    except ValueError:
+        return fp.name
+
+def pack_hash(files: List[Path]) -> str:
+    root = pack_root(files)
+    h = hashlib.sha256()
+    for name, fp in sorted((_relative_name(fp, root), fp) for fp in files):
+        h.update(name.encode("utf-8"))
+        h.update(hashlib.sha256(fp.read_bytes()).digest())
+    return h.hexdigest()
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+class BatchRunner:
+    def __init__(self, out_dir: Path, doc_workers: int = REVIEW_WORKERS, pack_workers: int = 2, force: bool = False,
+                 report_format: str = "json"):
+        self.out_dir = Path(out_dir)
+        self.report_format = report_format
+        self.doc_workers = doc_workers
+        self.pack_workers = max(1, pack_workers)
+        self.force = force
+        self.progress_path = self.out_dir / PROGRESS_FILE
+        self.progress: Dict[str, str] = {}
+        if self.progress_path.exists() and not force:
+            self.progress = json.loads(self.progress_path.read_text(encoding="utf-8"))
+        self._lock = threading.Lock()
+        self.stage_times: Dict[str, List[float]] = {}
+        self.docs_reviewed = 0
+        self.failures: List[str] = []
+
+    def _save_progress(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.progress_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.progress, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.progress_path)
+
+    def _record(self, stage: str, seconds: float):
+        self.stage_times.setdefault(stage, []).append(seconds)
+
+    def review_pack(self, name: str, files: List[Path], digest: str) -> Optional[str]:
+        pack_dir = self.out_dir / name
+        root = pack_root(files)
+        files = [fp.resolve() for fp in files] if root else files
+        engine = ReviewEngine(pack_dir, max_workers=self.doc_workers, use_cache=not self.force, root=root)
+        report_path = pack_dir / "reports" / f"report.{self.report_format}"
+        if self.report_format == "json":
+            results = engine.review(files)
+            t0 = time.perf_counter()
+            pack = engine.finalize(results)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            report_path.write_text(pack.report, encoding="utf-8")
+        else:
+            writer = ReportWriter(report_path)
+            results = []
+            for result in engine.iter_review(files):
+                results.append(result)
+                writer.add_document(result)
+            t0 = time.perf_counter()
+            pack = engine.finalize(results, json_report=False)
+            writer.close(pack.process_info, [i for i in pack.issues if i.get("document") == "ALL"])
+        finalize_s = time.perf_counter() - t0
+
+        errors = [f"{name}/{r.filename}: {r.error}" for r in results if r.error]
+        with self._lock:
+            for r in results:
+                for stage, seconds in r.timings.items():
+                    self._record(stage, seconds)
+            self._record("pack_finalize", finalize_s)
+            self.docs_reviewed += sum(1 for r in results if not r.error)
+            self.failures.extend(errors)
+            if not errors:
+                self.progress[name] = digest
+                self._save_progress()
+        return None if not errors else f"{len(errors)} document(s) failed"
+
+    def run(self, packs: Dict[str, List[Path]]) -> int:
+        todo = {}
+        unreadable = 0
+        for name, files in packs.items():
+            try:
+                digest = pack_hash(files)
+            except OSError as e:
+                self.failures.append(f"{name}: {type(e).__name__}: {e}")
+                print(f"FAIL  {name} ({type(e).__name__}: {e})")
+                unreadable += 1
+                continue
+            if not self.force and self.progress.get(name) == digest:
+                print(f"skip  {name} (unchanged)")
+                continue
+            todo[name] = (files, digest)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.pack_workers, thread_name_prefix="pack") as pool:
+            futures = {pool.submit(self.review_pack, name, files, digest): name
+                       for name, (files, digest) in todo.items()}
+            for fut in as_completed(futures):
+                name = futures[fut]
+                try:
+                    problem = fut.result()
+                except Exception as e:
+                    problem = f"{type(e).__name__}: {e}"
+                    self.failures.append(f"{name}: {problem}")
+                print(f"{'FAIL' if problem else 'done'}  {name}" + (f" ({problem})" if problem else ""))
+        elapsed = time.perf_counter() - t0
+
+        self.print_summary(len(packs), len(todo), elapsed, unreadable)
+        return 1 if self.failures else 0
+
+    def print_summary(self, n_packs: int, n_reviewed: int, elapsed: float, n_unreadable: int = 0):
+        print()
+        line = f"Packs: {n_packs} total, {n_reviewed} reviewed, {n_packs - n_reviewed - n_unreadable} skipped"
+        print(line + (f", {n_unreadable} unreadable" if n_unreadable else ""))
+        rate = self.docs_reviewed / elapsed if elapsed else 0.0
+        print(f"Documents: {self.docs_reviewed} in {elapsed:.2f}s ({rate:.2f} docs/sec)")
+        if self.stage_times:
+            print(f"{'stage':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}")
+            for stage, values in self.stage_times.items():
+                print(f"{stage:<16}{len(values):>6}{percentile(values, 50) * 1000:>10.1f}"
+                      f"{percentile(values, 95) * 1000:>10.1f}")
+        if self.failures:
+            print("\nFailures:")
+            for f in self.failures:
+                print(f"- {f}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Review directories of ADGM document packs without the UI.")
+    parser.add_argument("input", nargs="?", type=Path, help="directory containing one subdirectory per pack")
+    parser.add_argument("--manifest", type=Path, help="CSV with pack,path columns (instead of INPUT)")
+    parser.add_argument("--out", type=Path, default=Path("outputs") / "batch")
+    parser.add_argument("--workers", type=int, default=REVIEW_WORKERS, help="documents reviewed concurrently per pack")
+    parser.add_argument("--pack-workers", type=int, default=2, help="packs reviewed concurrently")
+    parser.add_argument("--force", action="store_true", help="re-review packs even if unchanged")
+    parser.add_argument("--report-format", choices=REPORT_FORMATS, default="json",
+                        help="one JSON report per pack, or a streamed JSONL report (optionally gzipped)")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        packs = read_pack_manifest(args.manifest)
+    elif args.input and args.input.is_dir():
+        packs = discover_packs(args.input)
+    else:
+        parser.error("provide an INPUT directory or --manifest")
+    if not packs:
+        print("No .docx files found.")
+        return 0
+
+    runner = BatchRunner(args.out, doc_workers=args.workers, pack_workers=args.pack_workers, force=args.force,
+                         report_format=args.report_format)
+    return runner.run(packs)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import re
+import json
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from core.index_meta import DB_PATH
+
+BM25_PATH = DB_PATH / "bm25.json"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+def matches_where(meta: Dict, where: Optional[Dict]) -> bool:
+    """Evaluate the subset of Chroma's `where` syntax we use: equality, $eq, $ne, $in, $nin, $and, $or."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, arg in cond.items():
+                if op == "$eq" and value != arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+class BM25Index:
+    """
+    Okapi BM25 over the same chunks as the vector store, persisted as JSON
+    next to it and updated incrementally by build_index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict] = {}  # id -> {"tf", "len", "text", "meta"}
+        # (postings, average length), published together so a reader never sees one without the other.
+        self._stats: Optional[Tuple[Dict[str, List[tuple]], float]] = None
+        self._lock = threading.Lock()
+
+    def add(self, ids: Iterable[str], texts: Iterable[str], metas: Iterable[Dict]):
+        for cid, text, meta in zip(ids, texts, metas):
+            tokens = tokenize(text)
+            self.docs[cid] = {"tf": dict(Counter(tokens)), "len": len(tokens), "text": text, "meta": meta}
+        self._stats = None
+
+    def remove(self, ids: Iterable[str]):
+        for cid in ids:
+            self.docs.pop(cid, None)
+        self._stats = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _build_postings(self) -> Tuple[Dict[str, List[tuple]], float]:
+        with self._lock:
+            if self._stats is None:
+                postings: Dict[str, List[tuple]] = {}
+                for cid, doc in self.docs.items():
+                    for term, tf in doc["tf"].items():
+                        postings.setdefault(term, []).append((cid, tf))
+                avg_len = (sum(d["len"] for d in self.docs.values()) / len(self.docs)) if self.docs else 0.0
+                self._stats = (postings, avg_len)
+            return self._stats
+
+    def search(self, query: str, top_k: int = 5, where: Optional[Dict] = None) -> List[Dict]:
+        postings, avg_len = self._stats or self._build_postings()
+        n = len(self.docs)
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            plist = postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for cid, tf in plist:
+                dl = self.docs[cid]["len"]
+                denom = tf + self.k1 * (1 - self.b + self.b * dl / (avg_len or 1))
+                scores[cid] = scores.get(cid, 0.0) + idf * tf * (self.k1 + 1) / denom
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        out = []
+        for cid, score in ranked:
+            doc = self.docs[cid]
+            if not matches_where(doc["meta"], where):
+                continue
+            out.append({"id": cid, "text": doc["text"], "meta": doc["meta"], "score": score})
+            if len(out) == top_k:
+                break
+        return out
+
+    def save(self, path: Path = BM25_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"k1": self.k1, "b": self.b, "docs": self.docs}, ensure_ascii=False),
+                       encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path = BM25_PATH) -> "BM25Index":
+        index = cls()
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            index.k1, index.b, index.docs = data["k1"], data["b"], data["docs"]
+        index._build_postings()
+        return index
@@ -0,0 +1,130 @@
+import re
+import hashlib
+from typing import List, Dict, Optional, Iterable
+
+CHUNKER_VERSION = 2  # bump when chunk boundaries change so build_index re-chunks everything
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 200  # only applied when a single clause is longer than CHUNK_SIZE
+
+_PART = re.compile(r"^(PART|CHAPTER|SCHEDULE|ANNEX|APPENDIX|SECTION)\s+([0-9]+|[IVXLC]+)\b", re.I)
+_CLAUSE = re.compile(r"^\(?(\d{1,3}(?:\.\d{1,3})*)[.)]?\s+(\S.*)$")
+_HEADING_STYLE = re.compile(r"^heading\s*(\d+)$", re.I)
+
+def _is_caps_heading(line: str) -> bool:
+    letters = [c for c in line if c.isalpha()]
+    return 3 <= len(letters) and len(line) <= 80 and all(c.isupper() for c in letters)
+
+def classify_line(text: str, style: Optional[str] = None) -> Dict:
+    """
+    Turn one paragraph/line into a block: a heading (with level), the start of
+    a numbered clause (with its label), or plain body text.
+    """
+    text = text.strip()
+    if style:
+        m = _HEADING_STYLE.match(style)
+        if m:
+            return {"kind": "heading", "level": int(m.group(1)), "text": text}
+        if style.lower() == "title":
+            return {"kind": "heading", "level": 1, "text": text}
+    if _PART.match(text) and len(text) <= 120:
+        return {"kind": "heading", "level": 1, "text": text}
+    m = _CLAUSE.match(text)
+    if m:
+        label, rest = m.group(1), m.group(2)
+        depth = label.count(".") + 1
+        if len(rest) <= 80 and not rest.rstrip().endswith((".", ";", ",", ":")):
+            # "4. Share Capital" — a numbered heading rather than a clause body
+            return {"kind": "heading", "level": depth + 1, "text": text}
+        return {"kind": "clause", "label": label, "text": text}
+    if _is_caps_heading(text):
+        return {"kind": "heading", "level": 1, "text": text}
+    return {"kind": "body", "text": text}
+
+def _normalise(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(_normalise(text).encode("utf-8")).hexdigest()[:32]
+
+def _split_long(text: str, size: int, overlap: int) -> List[str]:
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = text.rfind(" ", start + size // 2, end)
+            end = cut if cut > start else end
+        pieces.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [p for p in pieces if p]
+
+def chunk_blocks(blocks: Iterable[Dict], meta: Dict, id_prefix: str,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Dict]:
+    """
+    Pack clauses into chunks without crossing a heading. Each chunk records
+    its section path (headings above it), the clause labels it covers and the
+    page it starts on. Consecutive clauses are packed whole; only a clause
+    longer than chunk_size is split, with overlap between its pieces.
+    """
+    # 1) group lines into units: a clause (or untitled paragraph run) plus its continuation lines
+    units: List[Dict] = []
+    path: List[tuple] = []
+    for b in blocks:
+        if not b.get("text", "").strip():
+            continue
+        if b["kind"] == "heading":
+            path = [p for p in path if p[0] < b["level"]] + [(b["level"], b["text"].strip())]
+            units.append({"heading": True})
+            continue
+        section = " > ".join(title for _, title in path)
+        if b["kind"] == "clause" or not units or units[-1].get("heading") or units[-1]["section"] != section:
+            units.append({"section": section, "label": b.get("label"), "text": b["text"].strip(),
+                          "page": b.get("page")})
+        else:
+            units[-1]["text"] += "\n" + b["text"].strip()
+
+    # 2) pack units into chunks, flushing at headings and at the size limit
+    chunks: List[Dict] = []
+    buf: List[Dict] = []
+
+    def flush():
+        if not buf:
+            return
+        body = "\n".join(u["text"] for u in buf)
+        labels = [u["label"] for u in buf if u.get("label")]
+        chunk_meta = dict(meta)
+        if buf[0]["section"]:
+            chunk_meta["section"] = buf[0]["section"]
+        if labels:
+            chunk_meta["clauses"] = labels[0] if len(labels) == 1 else f"{labels[0]}–{labels[-1]}"
+        if buf[0].get("page") is not None:
+            chunk_meta["page"] = buf[0]["page"]
+        chunk_meta["chunk_hash"] = chunk_hash(body)
+        text = f"{buf[0]['section']}\n{body}" if buf[0]["section"] else body
+        chunks.append({"id": f"{id_prefix}_{len(chunks)}", "text": text, "meta": chunk_meta})
+        buf.clear()
+
+    for unit in units:
+        if unit.get("heading"):
+            flush()
+            continue
+        pieces = [unit["text"]] if len(unit["text"]) <= chunk_size else _split_long(unit["text"], chunk_size, chunk_overlap)
+        for piece in pieces:
+            if buf and sum(len(u["text"]) + 1 for u in buf) + len(piece) > chunk_size:
+                flush()
+            buf.append(dict(unit, text=piece))
+            if len(pieces) > 1:
+                flush()  # pieces of one long clause stay separate chunks
+    flush()
+    return chunks
+
+def text_to_blocks(text: str, page: Optional[int] = None) -> List[Dict]:
+    blocks = []
+    for line in text.splitlines():
+        if line.strip():
+            block = classify_line(line)
+            block["page"] = page
+            blocks.append(block)
+    return blocks
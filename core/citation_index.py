@@ -0,0 +1,93 @@
+"""
+Rule citations precomputed at index time.
+
+Rule queries only change when the rule files do, and their answers only when
+the index does, so build_index resolves every rule's retrieval once and stores
+the results next to the index. Reviews look citations up here and fall back
+to live retrieval only for queries that were not precomputed (e.g. a rule
+added since the last build).
+
+    python -m core.citation_index    # refresh after editing rules, without re-indexing
+"""
+import os
+import sys
+import json
+import time
+import threading
+from typing import List, Dict, Optional, Sequence
+
+from dotenv import load_dotenv
+
+from core.index_meta import DB_PATH, read_fingerprint
+from core.rules import RuleSet, get_ruleset
+from core import telemetry
+
+load_dotenv()
+RETRIEVAL_MODE = (os.getenv("RETRIEVAL_MODE") or "hybrid").strip().lower()  # hybrid | dense | lexical
+DEFAULT_TOP_K = 5
+CITATION_SCHEMA = 2  # bump when the citation dict changes shape (2: "distance"/"relevance" replace "score")
+CITATIONS_PATH = DB_PATH / "rule_citations.json"
+
+def spec_key(spec: Dict, top_k: int = DEFAULT_TOP_K) -> str:
+    """Identity of a retrieval request {"query", "top_k", "where", "mode"} once defaults are applied."""
+    mode = (spec.get("mode") or RETRIEVAL_MODE).lower()
+    return json.dumps([spec["query"], spec.get("top_k") or top_k, spec.get("where"), mode], sort_keys=True)
+
+def rule_specs(ruleset: RuleSet) -> List[Dict]:
+    return [rule.retrieval_spec() for rule in ruleset.rules if rule.query and rule.citations]
+
+def precompute(fingerprint: Optional[str] = None, ruleset: Optional[RuleSet] = None) -> int:
+    """Resolve every rule query against the current index and persist the results; returns the count."""
+    from core.rag import retrieve_many  # needs the embedder and vector store; review-time lookups don't
+
+    specs = list({spec_key(s): s for s in rule_specs(ruleset or get_ruleset())}.values())
+    results = retrieve_many(specs) if specs else []
+    payload = {
+        "fingerprint": fingerprint or read_fingerprint(),
+        "schema": CITATION_SCHEMA,
+        "built_at": time.time(),
+        "entries": {spec_key(s): cites for s, cites in zip(specs, results)},
+    }
+    DB_PATH.mkdir(parents=True, exist_ok=True)
+    tmp = CITATIONS_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(CITATIONS_PATH)
+    return len(specs)
+
+_loaded = {"fingerprint": None, "entries": None}
+_loaded_lock = threading.Lock()
+
+def _entries() -> Dict[str, List[Dict]]:
+    fingerprint = read_fingerprint()
+    with _loaded_lock:
+        if _loaded["entries"] is None or _loaded["fingerprint"] != fingerprint:
+            entries = {}
+            try:
+                data = json.loads(CITATIONS_PATH.read_text(encoding="utf-8"))
+                # stale if the index was rebuilt or the citation format changed since
+                if data.get("fingerprint") == fingerprint and data.get("schema") == CITATION_SCHEMA:
+                    entries = data.get("entries", {})
+            except (OSError, ValueError):
+                pass
+            _loaded["entries"], _loaded["fingerprint"] = entries, fingerprint
+        return _loaded["entries"]
+
+def lookup(specs: Sequence[Dict]) -> List[Optional[List[Dict]]]:
+    """Precomputed citations for each spec, or None where it has to be retrieved live."""
+    entries = _entries()
+    out = []
+    for spec in specs:
+        cites = entries.get(spec_key(spec))
+        out.append([dict(c) for c in cites] if cites is not None else None)
+    hits = sum(1 for c in out if c is not None)
+    telemetry.incr("citation_index_hits_total", hits)
+    telemetry.incr("citation_index_misses_total", len(out) - hits)
+    return out
+
+def main() -> int:
+    n = precompute()
+    print(f"Precomputed citations for {n} rule queries -> {CITATIONS_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
 from pathlib import Path
-from docx import Document
+from typing import List, Tuple, Union
+from core.parsed import ParsedDocument, load
+from core.ahocorasick import Automaton
+
+CLASSIFIER_VERSION = 2  # bump when labels or scoring change; part of the review cache key
 
 KEYWORDS = {
     "Articles of Association": ["articles of association", "aoa"],
@@ -13,16 +17,100 @@ KEYWORDS = {
     "Change of Registered Address Notice": ["change of registered address"]
 }
 
-def classify_doc(path: Path) -> str:
-    text = extract_text_quick(path).lower()
+TITLE_WEIGHT = 5.0       # hits in the leading short paragraphs (the document title)
+FIRST_PAGE_WEIGHT = 2.0  # hits in roughly the first page
+TITLE_PARAGRAPHS = 3
+TITLE_MAX_CHARS = 80     # a longer paragraph ends the title block
+FIRST_PAGE_CHARS = 3000
+DECISIVE_SCAN_CHARS = 16 * 1024  # body text scanned when the title already names one label
+
+def _build_automaton() -> Automaton:
+    automaton = Automaton()
     for label, cues in KEYWORDS.items():
-        if any(cue in text for cue in cues):
-            return label
-    return "Unknown"
+        for cue in cues:
+            automaton.add(cue, label)
+    automaton.build()
+    return automaton
+
+_AUTOMATON = _build_automaton()
+
+def _cue_weight(cue: str) -> float:
+    # Multi-word phrases are far more specific than short abbreviations.
+    return float(len(cue.split()))
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end >= len(text) or not text[end].isalnum())
+
+def _score(text: str, scores: dict, weight_at) -> set:
+    """
+    Add each cue found in `text` to its label's score once, at the weight of its
+    best-placed occurrence, so a phrase repeated through the body can't outvote
+    the title.
+    """
+    best = {}
+    for start, cue, label in _AUTOMATON.iter(text):
+        end = start + len(cue)
+        if _is_word(text, start, end):
+            best[(cue, label)] = max(best.get((cue, label), 0.0), weight_at(start))
+    for (cue, label), weight in best.items():
+        scores[label] += _cue_weight(cue) * weight
+    return {label for _, label in best}
+
+def rank_labels(source: Union[ParsedDocument, Path]) -> List[Tuple[str, float]]:
+    """
+    Score every label in a single automaton pass and return (label, confidence)
+    pairs, best first. Confidence is the label's share of the total score. A
+    title that names exactly one label is decisive: that label ranks first.
+    """
+    try:
+        parsed = load(source)
+    except Exception:
+        return []
+
+    scores = {label: 0.0 for label in KEYWORDS}
+    title_lines = []
+    body_start = len(parsed.paragraphs)
+    for i, p in enumerate(parsed.paragraphs):
+        if not p.strip():
+            continue
+        if len(p) > TITLE_MAX_CHARS or len(title_lines) == TITLE_PARAGRAPHS:
+            body_start = i
+            break
+        title_lines.append(p)
+    title = "\n".join(title_lines).lower()
+    title_labels = _score(title, scores, lambda _: TITLE_WEIGHT)
+
+    # The body excludes the title paragraphs, so title cues aren't counted twice.
+    if len(title_labels) == 1:
+        # Decisive title: only the opening paragraphs can still add runner-up labels.
+        parts, size = [], 0
+        for p in parsed.paragraphs[body_start:]:
+            if p.strip():
+                parts.append(p)
+                size += len(p) + 1
+                if size >= DECISIVE_SCAN_CHARS:
+                    break
+        body = "\n".join(parts)[:DECISIVE_SCAN_CHARS].lower()
+    else:
+        # parsed.text starts with the non-empty paragraphs, title first.
+        body = parsed.lower_text[len(title) + 1:] if title_lines else parsed.lower_text
+    _score(body, scores, lambda pos: FIRST_PAGE_WEIGHT if pos < FIRST_PAGE_CHARS else 1.0)
+
+    total = sum(scores.values())
+    if not total:
+        return []
+    order = list(KEYWORDS)
+    decisive = next(iter(title_labels)) if len(title_labels) == 1 else None
+    ranked = sorted((l for l in scores if scores[l] > 0),
+                    key=lambda l: (l != decisive, -scores[l], order.index(l)))
+    return [(label, scores[label] / total) for label in ranked]
+
+def classify_doc(source: Union[ParsedDocument, Path]) -> str:
+    ranked = rank_labels(source)
+    return ranked[0][0] if ranked else "Unknown"
 
-def extract_text_quick(path: Path) -> str:
+def extract_text_quick(source: Union[ParsedDocument, Path]) -> str:
     try:
-        doc = Document(str(path))
-        return "\n".join(p.text for p in doc.paragraphs)
+        return load(source).text
     except Exception:
         return ""
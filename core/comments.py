@@ -1,35 +1,291 @@
-from pathlib import Path
+import io
+import os
 import re
-from typing import List, Dict
-from docx import Document
-
-def annotate_docx(src: Path, issues: List[Dict], out_path: Path):
-    doc = Document(str(src))
-
-    counter = 1
-    for issue in issues:
-        anchor = issue.get("anchor_regex")
-        if not anchor:
-            continue
-        pattern = re.compile(anchor, re.I)
-        placed = False
-        for para in doc.paragraphs:
-            if pattern.search(para.text or ""):
-                note = f" [COMMENT {counter}: {issue.get('issue')} | Suggestion: {issue.get('suggestion')}]"
-                para.text = (para.text or "") + note
-                counter += 1
-                placed = True
-                break
-        if not placed:
-            continue
-
-    if issues:
-        doc.add_paragraph("")
-        doc.add_paragraph("=== REVIEW NOTES (Auto-generated) ===")
-        for i, issue in enumerate(issues, start=1):
-            line = f"[{i}] {issue.get('section')}: {issue.get('issue')} (Severity: {issue.get('severity')})."
-            if issue.get("suggestion"):
-                line += f" Suggestion: {issue['suggestion']}"
-            doc.add_paragraph(line)
-
-    doc.save(str(out_path))
+import shutil
+import zipfile
+import posixpath
+from copy import deepcopy
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Union
+
+from lxml import etree
+
+from core.parsed import ParsedDocument, load
+
+ANNOTATION_VERSION = 1  # bump when comment placement or markup changes; part of the review cache key
+COMMENT_AUTHOR = os.getenv("REVIEW_COMMENT_AUTHOR") or "ADGM Corporate Agent"
+COMMENT_INITIALS = "CA"
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+OFFICE_DOC_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+COMMENTS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+COMMENTS_CT = "application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+NSMAP = {"w": W_NS}
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+# ---------- run text, mirroring python-docx's Paragraph.text ----------
+
+def _piece(el) -> str:
+    tag = etree.QName(el).localname if isinstance(el.tag, str) else ""
+    if tag == "t":
+        return el.text or ""
+    if tag in ("tab", "ptab"):
+        return "\t"
+    if tag == "cr":
+        return "\n"
+    if tag == "br":
+        return "\n" if el.get(_w("type"), "textWrapping") == "textWrapping" else ""
+    if tag == "noBreakHyphen":
+        return "-"
+    return ""
+
+def _run_text(r) -> str:
+    return "".join(_piece(c) for c in r)
+
+def _runs(p) -> List[Tuple[object, int, int]]:
+    """(run, start, end) for every text-bearing run, as offsets into the paragraph text."""
+    out, pos = [], 0
+    for r in p.xpath("./w:r | ./w:hyperlink/w:r", namespaces=NSMAP):
+        n = len(_run_text(r))
+        out.append((r, pos, pos + n))
+        pos += n
+    return out
+
+def _paragraph_text(p) -> str:
+    return "".join(_run_text(r) for r, _, _ in _runs(p))
+
+def _split_run(r, offset: int):
+    """Split run `r` so a new run (same formatting) starts `offset` characters in."""
+    tail = deepcopy(r)
+    pos = 0
+    head_content = [c for c in r if c.tag != _w("rPr")]
+    tail_content = [c for c in tail if c.tag != _w("rPr")]
+    for hc, tc in zip(head_content, tail_content):
+        n = len(_piece(hc))
+        if pos + n <= offset:
+            tail.remove(tc)
+        elif pos >= offset:
+            r.remove(hc)
+        else:
+            cut = offset - pos
+            hc.text, tc.text = hc.text[:cut], hc.text[cut:]
+            hc.set(XML_SPACE, "preserve")
+            tc.set(XML_SPACE, "preserve")
+        pos += n
+    r.addnext(tail)
+
+def _ensure_boundary(p, offset: int):
+    for r, start, end in _runs(p):
+        if start < offset < end:
+            if r.getparent().tag == _w("p"):  # leave runs inside hyperlinks whole
+                _split_run(r, offset - start)
+            return
+
+def _top(el, p):
+    """The direct child of the paragraph that contains `el` (a run or its hyperlink)."""
+    while el.getparent() is not p:
+        el = el.getparent()
+    return el
+
+def _reference_run(cid: int):
+    r = etree.Element(_w("r"))
+    ref = etree.SubElement(r, _w("commentReference"))
+    ref.set(_w("id"), str(cid))
+    return r
+
+def _mark(p, cid: int, start: Optional[int] = None, end: Optional[int] = None):
+    """Wrap [start, end) of the paragraph text (or the whole paragraph) in a comment range."""
+    range_start = etree.Element(_w("commentRangeStart"))
+    range_start.set(_w("id"), str(cid))
+    range_end = etree.Element(_w("commentRangeEnd"))
+    range_end.set(_w("id"), str(cid))
+
+    covered = []
+    if start is not None and end is not None and start < end:
+        _ensure_boundary(p, start)
+        _ensure_boundary(p, end)
+        covered = [r for r, s, e in _runs(p) if s < end and e > start and e > s]
+    if covered:
+        _top(covered[0], p).addprevious(range_start)
+        last = _top(covered[-1], p)
+    else:
+        ppr = p.find(_w("pPr"))
+        if ppr is not None:
+            ppr.addnext(range_start)
+        else:
+            p.insert(0, range_start)
+        last = p[-1]
+    last.addnext(range_end)
+    range_end.addnext(_reference_run(cid))
+
+def _text_paragraph(lines: List[str]):
+    p = etree.Element(_w("p"))
+    for i, line in enumerate(lines):
+        r = etree.SubElement(p, _w("r"))
+        if i:
+            etree.SubElement(r, _w("br"))
+        t = etree.SubElement(r, _w("t"))
+        t.text = line
+        t.set(XML_SPACE, "preserve")
+    return p
+
+def _comment(cid: int, issue: Dict, date: str):
+    c = etree.Element(_w("comment"), nsmap=NSMAP)
+    c.set(_w("id"), str(cid))
+    c.set(_w("author"), COMMENT_AUTHOR)
+    c.set(_w("initials"), COMMENT_INITIALS)
+    c.set(_w("date"), date)
+    c.append(_text_paragraph([f"{issue.get('issue')} (Severity: {issue.get('severity')})"]))
+    if issue.get("suggestion"):
+        c.append(_text_paragraph([f"Suggestion: {issue['suggestion']}"]))
+    return c
+
+# ---------- package plumbing ----------
+
+def _xml_bytes(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+def _main_part(zin: zipfile.ZipFile) -> str:
+    rels = etree.fromstring(zin.read("_rels/.rels"))
+    for rel in rels.iter(f"{{{REL_NS}}}Relationship"):
+        if rel.get("Type") == OFFICE_DOC_REL:
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+def _comments_part(zin: zipfile.ZipFile, doc_part: str, names: set) -> Tuple[str, Optional[bytes]]:
+    """Return (comments part name, updated rels xml or None if the relationship already exists)."""
+    rels_name = _rels_path(doc_part)
+    if rels_name in names:
+        rels = etree.fromstring(zin.read(rels_name))
+    else:
+        rels = etree.Element(f"{{{REL_NS}}}Relationships", nsmap={None: REL_NS})
+    for rel in rels.iter(f"{{{REL_NS}}}Relationship"):
+        if rel.get("Type") == COMMENTS_REL:
+            return posixpath.normpath(posixpath.join(posixpath.dirname(doc_part), rel.get("Target"))), None
+    used = {rel.get("Id") for rel in rels.iter(f"{{{REL_NS}}}Relationship")}
+    n = 1
+    while f"rId{n}" in used:
+        n += 1
+    rel = etree.SubElement(rels, f"{{{REL_NS}}}Relationship")
+    rel.set("Id", f"rId{n}")
+    rel.set("Type", COMMENTS_REL)
+    rel.set("Target", "comments.xml")
+    return posixpath.join(posixpath.dirname(doc_part), "comments.xml"), _xml_bytes(rels)
+
+def _content_types(zin: zipfile.ZipFile, comments_name: str) -> Optional[bytes]:
+    types = etree.fromstring(zin.read("[Content_Types].xml"))
+    part_name = "/" + comments_name
+    if any(o.get("PartName") == part_name for o in types.iter(f"{{{CT_NS}}}Override")):
+        return None
+    override = etree.SubElement(types, f"{{{CT_NS}}}Override")
+    override.set("PartName", part_name)
+    override.set("ContentType", COMMENTS_CT)
+    return _xml_bytes(types)
+
+def _source_bytes(src: Union[ParsedDocument, Path]) -> bytes:
+    parsed = src if isinstance(src, ParsedDocument) else None
+    if parsed is None:
+        return Path(src).read_bytes()
+    if parsed.data is not None:
+        return parsed.data
+    if parsed.path is not None:
+        return parsed.path.read_bytes()
+    buf = io.BytesIO()
+    parsed.document.save(buf)
+    return buf.getvalue()
+
+# ---------- entry point ----------
+
+def _find_anchor(paragraphs, issue: Dict) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    idx = issue.get("anchor_paragraph")
+    if idx is not None and 0 <= idx < len(paragraphs):
+        # Position precomputed by the rule engine's single scan.
+        return idx, issue.get("anchor_start"), issue.get("anchor_end")
+    if issue.get("anchor_regex"):
+        pattern = re.compile(issue["anchor_regex"], re.I)
+        for i, p in enumerate(paragraphs):
+            m = pattern.search(_paragraph_text(p))
+            if m:
+                return i, m.start(), m.end()
+    return None, None, None
+
+def annotate_docx(src: Union[ParsedDocument, Path], issues: List[Dict], out_path: Path):
+    """
+    Write a copy of the document with each issue as a native Word comment on
+    the matched text, plus a REVIEW NOTES list at the end. Only the main
+    document part and the comments part are rewritten; every other package
+    part is streamed unchanged from the source zip.
+    """
+    data = _source_bytes(src)
+    with zipfile.ZipFile(io.BytesIO(data)) as zin:
+        names = set(zin.namelist())
+        doc_part = _main_part(zin)
+        root = etree.fromstring(zin.read(doc_part))
+        body = root.find(_w("body"))
+        paragraphs = body.findall(_w("p"))  # index-aligned with python-docx's document.paragraphs
+
+        replaced: Dict[str, bytes] = {}
+        if issues:
+            comments_name, rels_xml = _comments_part(zin, doc_part, names)
+            if comments_name in names:
+                comments = etree.fromstring(zin.read(comments_name))
+            else:
+                comments = etree.Element(_w("comments"), nsmap=NSMAP)
+            existing = [int(c.get(_w("id"))) for c in comments.iter(_w("comment")) if c.get(_w("id"), "").isdigit()]
+            next_id = max(existing, default=-1) + 1
+            date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+            anchors = [_find_anchor(paragraphs, issue) for issue in issues]
+
+            notes = [_text_paragraph([""]), _text_paragraph(["=== REVIEW NOTES (Auto-generated) ==="])]
+            for i, issue in enumerate(issues, start=1):
+                line = f"[{i}] {issue.get('section')}: {issue.get('issue')} (Severity: {issue.get('severity')})."
+                if issue.get("suggestion"):
+                    line += f" Suggestion: {issue['suggestion']}"
+                notes.append(_text_paragraph([line]))
+            sect = body.find(_w("sectPr"))
+            for note in notes:
+                if sect is not None:
+                    sect.addprevious(note)
+                else:
+                    body.append(note)
+
+            for i, (issue, (idx, start, end)) in enumerate(zip(issues, anchors)):
+                cid = next_id + i
+                if idx is not None:
+                    _mark(paragraphs[idx], cid, start, end)
+                else:
+                    _mark(notes[2 + i], cid)  # unanchored issues comment on their review note
+                comments.append(_comment(cid, issue, date))
+
+            replaced[comments_name] = _xml_bytes(comments)
+            if rels_xml is not None:
+                replaced[_rels_path(doc_part)] = rels_xml
+            if comments_name not in names:
+                content_types = _content_types(zin, comments_name)
+                if content_types is not None:
+                    replaced["[Content_Types].xml"] = content_types
+        replaced[doc_part] = _xml_bytes(root)
+
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zout:
+            for item in zin.infolist():
+                info = zipfile.ZipInfo(item.filename, item.date_time)
+                info.compress_type = item.compress_type
+                info.external_attr = item.external_attr
+                if item.filename in replaced:
+                    zout.writestr(info, replaced.pop(item.filename))
+                    continue
+                with zin.open(item) as fin, zout.open(info, "w", force_zip64=item.file_size >= zipfile.ZIP64_LIMIT) as fout:
+                    shutil.copyfileobj(fin, fout, 1 << 20)
+            for name, payload in replaced.items():  # parts new to the package
+                zout.writestr(name, payload)
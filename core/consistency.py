@@ -0,0 +1,276 @@
+"""
+Cross-document consistency checks for a whole pack.
+
+Each document is scanned once for the facts that must agree across an
+incorporation pack (company name, share capital, directors, incorporation
+date). The mentions go into an in-memory index keyed by entity value, so
+conflicts fall out of one pass over the index, without comparing documents
+pairwise. Conflicts come back as ordinary issues anchored at the mention.
+"""
+import re
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable, Tuple, Hashable
+
+from core.parsed import ParsedDocument
+
+EXTRACTOR_VERSION = 1  # bump when entity extraction changes; part of the review cache key
+
+_SUFFIX = r"(?i:limited|ltd\.?|llc|l\.l\.c\.?|plc|p\.l\.c\.?)(?![\w])"
+_NAME = (r"[A-Z0-9][\w&'’.-]*(?:[ \t]+(?:[A-Z0-9(][\w&'’.()-]*|&|and)){0,8}?"
+         r",?[ \t]+" + _SUFFIX)
+_PERSON = (r"(?:(?:Mr|Mrs|Ms|Miss|Dr)\.?[ \t]+)?[A-Z][\w'’-]+"
+           r"(?:[ \t]+(?:[A-Z][\w'’-]*\.?|bin|bint|al|van|von|de)){1,4}")
+_CURRENCY = r"USD|AED|GBP|EUR|US\$|\$"
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_MONTH = r"(?i:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DATE = (rf"\d{{1,2}}(?:st|nd|rd|th)?[ \t]+{_MONTH},?[ \t]+\d{{4}}"
+         rf"|{_MONTH}[ \t]+\d{{1,2}}(?:st|nd|rd|th)?,?[ \t]+\d{{4}}"
+         r"|\d{1,2}[/.-]\d{1,2}[/.-]\d{4}|\d{4}-\d{2}-\d{2}")
+
+# One alternation per document unit; the outer group name says what was found.
+_MENTIONS = re.compile("|".join([
+    r"(?i:name\s+of\s+the\s+company\s+(?:is|shall\s+be)|company(?:'s)?\s+name\s*(?:is|:)|under\s+the\s+name(?:\s+of)?)"
+    rf"\s*[\"“']?(?P<company_a>{_NAME})",
+    rf"(?P<company_b>{_NAME})\s*\(\s*(?i:the\s+)?[\"“”']?(?i:company)[\"“”']?\s*\)",
+    r"(?P<capital_qualifier>(?i:authori[sz]ed|issued|paid[- ]up)\s+)?(?i:share\s+capital)[^.;\n]{0,80}?"
+    rf"(?P<capital>(?:{_CURRENCY})[ \t]?{_NUMBER}|{_NUMBER}[ \t]?(?:USD|AED|GBP|EUR|(?i:US\s+dollars|dirhams)))",
+    rf"(?i:appoint(?:s|ed|ment\s+of)?)\s+(?P<director_a>{_PERSON})\s+(?i:as\s+(?:a\s+|the\s+)?(?:sole\s+)?director)",
+    rf"(?i:(?:name\s+of\s+(?:the\s+)?)?director(?:'s)?(?:\s+name)?)\s*[:–-]\s*(?P<director_b>{_PERSON})",
+    rf"(?i:date\s+of\s+incorporation|incorporation\s+date|incorporated\s+on)\s*(?:is\s+|:\s*|[–-]\s*)?"
+    rf"(?P<incorporation_date>{_DATE})",
+]))
+
+# Table rows of the form "label | value", and column headers that list directors.
+_LABELS = [
+    ("company_name", re.compile(r"(?:company\s+name|name\s+of\s+(?:the\s+)?company)\s*:?", re.I), re.compile(_NAME)),
+    ("share_capital", re.compile(r"(?:(authori[sz]ed|issued|paid[- ]up)\s+)?share\s+capital(?:\s*\(\w+\))?\s*:?",
+                                 re.I), re.compile(rf"(?:{_CURRENCY})?[ \t]?{_NUMBER}(?:[ \t]?(?:USD|AED|GBP|EUR))?")),
+    ("director", re.compile(r"(?:name\s+of\s+(?:the\s+)?)?directors?(?:'s)?(?:\s+name)?\s*:?", re.I),
+     re.compile(_PERSON)),
+    ("incorporation_date", re.compile(r"(?:date\s+of\s+incorporation|incorporation\s+date)\s*:?", re.I),
+     re.compile(_DATE)),
+]
+_DIRECTOR_COLUMN = re.compile(r"(?:(?:full\s+)?name\s+of\s+(?:the\s+)?)?directors?(?:'s)?(?:\s+(?:full\s+)?name)?", re.I)
+_NAME_COLUMN = re.compile(r"(?:full\s+)?name", re.I)
+
+DIRECTOR_REGISTER = "Register of Directors"
+
+# kind -> (label used in issue text, severity, suggestion)
+KINDS = {
+    "company_name": ("Company name", "High", "Use the exact registered company name, including its suffix, "
+                                              "in every document of the pack."),
+    "authorised_share_capital": ("Authorised share capital", "High",
+                                 "Align the authorised share capital across the constitutional documents and resolutions."),
+    "issued_share_capital": ("Issued share capital", "High",
+                             "Align the issued share capital with the resolutions and the Register of Members."),
+    "paid_up_share_capital": ("Paid-up share capital", "High",
+                              "Align the paid-up share capital across the pack."),
+    "share_capital": ("Share capital", "High", "Use one share capital figure (and currency) throughout the pack."),
+    "director": ("Director name", "Medium", "Spell each director's name exactly as in their passport and the "
+                                            "Register of Directors."),
+    "incorporation_date": ("Incorporation date", "Medium", "Use one incorporation date throughout the pack."),
+}
+
+_TITLES = {"mr", "mrs", "ms", "miss", "dr"}
+_SUFFIXES = {"ltd": "limited", "l.l.c": "llc", "p.l.c": "plc"}
+_CURRENCIES = {"us$": "USD", "$": "USD", "us dollars": "USD", "dirhams": "AED"}
+_DATE_FORMATS = ("%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+def _company_value(text: str) -> str:
+    words = re.sub(r"[\"“”'’(),]", " ", text).lower().split()
+    if words and words[0] == "the":
+        words = words[1:]
+    if words:
+        last = words[-1].rstrip(".")
+        words[-1] = _SUFFIXES.get(last, last)
+    return " ".join(words)
+
+def _person_value(text: str) -> str:
+    words = [w.strip(".,").lower() for w in text.split()]
+    return " ".join(w for w in words if w and w not in _TITLES)
+
+def _capital_value(text: str) -> str:
+    m = re.search(_NUMBER, text)
+    amount = m.group(0).replace(",", "") if m else ""
+    rest = (text[:m.start()] + " " + text[m.end():]).strip().lower() if m else text.lower()
+    currency = _CURRENCIES.get(rest, rest.upper()) if rest else ""
+    if "." in amount:
+        amount = amount.rstrip("0").rstrip(".")
+    return f"{currency} {amount}".strip()
+
+def _date_value(text: str) -> str:
+    cleaned = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text).replace(",", " ")
+    cleaned = re.sub(r"\s+", " ", cleaned.replace(".", " ") if re.search("[A-Za-z]", cleaned) else cleaned).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return cleaned.lower()
+
+def _mention(kind: str, text: str, paragraph: Optional[int], start: int, end: int) -> Dict:
+    if kind == "company_name":
+        value = _company_value(text)
+    elif kind.endswith("share_capital"):
+        value = _capital_value(text)
+    elif kind == "director":
+        value = _person_value(text)
+    else:
+        value = _date_value(text)
+    return {"kind": kind, "value": value, "text": text.strip(), "paragraph": paragraph, "start": start, "end": end}
+
+def _capital_kind(qualifier: Optional[str]) -> str:
+    q = (qualifier or "").strip().lower().replace(" ", "-")
+    if q.startswith("authori"):
+        return "authorised_share_capital"
+    return {"issued": "issued_share_capital", "paid-up": "paid_up_share_capital"}.get(q, "share_capital")
+
+def _scan(text: str, paragraph: Optional[int]) -> Iterable[Dict]:
+    for m in _MENTIONS.finditer(text):
+        group = m.lastgroup if m.lastgroup != "capital_qualifier" else "capital"
+        if group in ("company_a", "company_b"):
+            kind = "company_name"
+        elif group == "capital":
+            kind = _capital_kind(m.group("capital_qualifier"))
+        elif group in ("director_a", "director_b"):
+            kind = "director"
+        else:
+            kind = group
+        yield _mention(kind, m.group(group), paragraph, m.start(group), m.end(group))
+
+def _scan_table(table: List[List[str]], doc_type: str) -> Iterable[Dict]:
+    if not table:
+        return
+    header = table[0]
+    columns = [c for c, cell in enumerate(header) if _DIRECTOR_COLUMN.fullmatch(cell.strip())
+               or (doc_type == DIRECTOR_REGISTER and _NAME_COLUMN.fullmatch(cell.strip()))]
+    person = re.compile(_PERSON)
+    for r, row in enumerate(table):
+        if r > 0:
+            for c in columns:
+                if c < len(row) and person.fullmatch(row[c].strip()):
+                    yield _mention("director", row[c], None, 0, 0)
+        cells = list(dict.fromkeys(cell.strip() for cell in row if cell.strip()))
+        for i, label in enumerate(cells[:-1]):
+            for kind, label_re, value_re in _LABELS:
+                m = label_re.fullmatch(label)
+                if m and value_re.fullmatch(cells[i + 1]):
+                    if kind == "share_capital":
+                        kind = _capital_kind(m.group(1))
+                    yield _mention(kind, cells[i + 1], None, 0, 0)
+                    break
+        for cell in dict.fromkeys(row):
+            yield from _scan(cell, None)
+
+def extract_entities(parsed: ParsedDocument, doc_type: str = "Unknown") -> List[Dict]:
+    """
+    Company names, share capital figures, directors and incorporation dates
+    mentioned in `parsed`: {"kind", "value" (normalised), "text", "paragraph",
+    "start", "end"}. Table, header and footer mentions have paragraph None.
+    """
+    mentions: List[Dict] = []
+    for i, text in enumerate(parsed.paragraphs):
+        if text.strip():
+            mentions.extend(_scan(text, i))
+    for table in parsed.tables:
+        mentions.extend(_scan_table(table, doc_type))
+    for text in parsed.headers + parsed.footers:
+        mentions.extend(_scan(text, None))
+    return mentions
+
+def _director_key(value: str) -> str:
+    """First and last name, so 'john a smith' and 'john smith' land together."""
+    words = value.split()
+    return f"{words[0]} {words[-1]}" if len(words) > 1 else value
+
+class EntityIndex:
+    """
+    entity kind -> normalised value -> documents and the mentions in them.
+    Built once per pack; conflicts() walks it once, so checking a pack is
+    linear in the number of mentions rather than quadratic in documents.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Dict[str, Dict[Hashable, List[Dict]]]] = {}
+        self._docs: Dict[Hashable, Tuple[str, str]] = {}
+
+    def add(self, doc: Hashable, name: str, doc_type: str, mentions: Iterable[Dict]):
+        """Index one document's mentions; `doc` is any unique key (the engine uses the pack index)."""
+        self._docs[doc] = (name, doc_type)
+        for m in mentions:
+            kind = m["kind"]
+            key = _director_key(m["value"]) if kind == "director" else ""
+            self._values.setdefault(f"{kind}\0{key}", {}).setdefault(m["value"], {}).setdefault(doc, []).append(m)
+
+    def _describe(self, value_docs: Dict[Hashable, List[Dict]], limit: int = 3) -> str:
+        docs = list(value_docs)
+        text = value_docs[docs[0]][0]["text"]
+        names = ", ".join(self._docs[d][0] for d in docs[:limit])
+        if len(docs) > limit:
+            names += f" and {len(docs) - limit} more"
+        return f"'{text}' ({names})"
+
+    @staticmethod
+    def _issue(name: str, kind: str, mention: Dict, issue: str, severity: Optional[str] = None) -> Dict:
+        label, default_severity, suggestion = KINDS[kind]
+        out = {
+            "document": name,
+            "section": "Consistency",
+            "issue": issue,
+            "severity": severity or default_severity,
+            "suggestion": suggestion,
+            "citations": [],
+            "rule_id": f"consistency_{kind}",
+        }
+        if mention["paragraph"] is not None:
+            out["anchor_paragraph"], out["anchor_start"], out["anchor_end"] = (
+                mention["paragraph"], mention["start"], mention["end"])
+        return out
+
+    def conflicts(self) -> Dict[Hashable, List[Dict]]:
+        """
+        doc -> conflict issues. Where most documents agree on a value, only the
+        documents that deviate are flagged; on a tie every variant is flagged.
+        A director named in the pack but missing from the Register of Directors
+        is flagged in the document that names them.
+        """
+        out: Dict[Hashable, List[Dict]] = {}
+        for slot, values in self._values.items():
+            if len(values) < 2:
+                continue
+            kind = slot.split("\0", 1)[0]
+            counts = sorted(((len(docs), value) for value, docs in values.items()), reverse=True)
+            prevailing = counts[0][1] if counts[0][0] > counts[1][0] else None
+            label = KINDS[kind][0]
+            for value, docs in values.items():
+                if value == prevailing:
+                    continue
+                others = "; ".join(self._describe(d) for v, d in values.items() if v != value)
+                for doc, mentions in docs.items():
+                    mention = next((m for m in mentions if m["paragraph"] is not None), mentions[0])
+                    issue = f"{label} '{mention['text']}' conflicts with {others} elsewhere in the pack."
+                    out.setdefault(doc, []).append(self._issue(self._docs[doc][0], kind, mention, issue))
+
+        registers = [doc for doc, (_, doc_type) in self._docs.items() if doc_type == DIRECTOR_REGISTER]
+        registered = {slot for slot, values in self._values.items() if slot.startswith("director\0")
+                      and any(doc in registers for docs in values.values() for doc in docs)}
+        if registers and registered:
+            register_names = ", ".join(self._docs[d][0] for d in registers)
+            for slot, values in self._values.items():
+                if not slot.startswith("director\0") or slot in registered:
+                    continue
+                for docs in values.values():
+                    for doc, mentions in docs.items():
+                        mention = next((m for m in mentions if m["paragraph"] is not None), mentions[0])
+                        issue = (f"Director '{mention['text']}' is not listed in the Register of Directors "
+                                 f"({register_names}).")
+                        out.setdefault(doc, []).append(self._issue(self._docs[doc][0], "director", mention, issue,
+                                                                   severity="High"))
+        return out
+
+def find_conflicts(documents: Iterable[Tuple[Hashable, str, str, List[Dict]]]) -> Dict[Hashable, List[Dict]]:
+    """Index (doc key, filename, doc type, mentions) for every document and return its conflicts."""
+    index = EntityIndex()
+    for doc, name, doc_type, mentions in documents:
+        index.add(doc, name, doc_type, mentions)
+    return index.conflicts()
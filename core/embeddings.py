@@ -0,0 +1,91 @@
+import os
+import threading
+from typing import List, Dict, Optional, TYPE_CHECKING
+
+from core import telemetry
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "mixedbread-ai/mxbai-embed-large-v1")
+
+class EmbeddingService:
+    """
+    Process-wide wrapper around a SentenceTransformer. The model is loaded on
+    first use (or by warm_up) and shared by ingest and retrieval;
+    sentence-transformers itself (and torch) is only imported then.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        self.model_name = model_name
+        self._model: Optional["SentenceTransformer"] = None
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.batches = 0
+        self.texts_encoded = 0
+        self.encode_seconds = 0.0
+        self.last_batch_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def model(self) -> "SentenceTransformer":
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    with telemetry.span("embedding_model_load", model=self.model_name) as s:
+                        from sentence_transformers import SentenceTransformer
+                        model = SentenceTransformer(self.model_name)
+                    self.load_seconds = s.duration
+                    self._model = model
+        return self._model
+
+    def encode(self, texts: List[str], **kwargs):
+        kwargs.setdefault("normalize_embeddings", True)
+        model = self.model()
+        with telemetry.span("embed", texts=len(texts)) as s:
+            vecs = model.encode(texts, **kwargs)
+        elapsed = s.duration
+        with self._stats_lock:
+            self.batches += 1
+            self.texts_encoded += len(texts)
+            self.encode_seconds += elapsed
+            self.last_batch_seconds = elapsed
+        return vecs
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """Load the model now, optionally on a daemon thread so callers don't block."""
+        if self.loaded:
+            return None
+        if not background:
+            self.model()
+            return None
+        t = threading.Thread(target=self.model, name="embedding-warmup", daemon=True)
+        t.start()
+        return t
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "loaded": self.loaded,
+                "load_seconds": self.load_seconds,
+                "batches": self.batches,
+                "texts_encoded": self.texts_encoded,
+                "encode_seconds": self.encode_seconds,
+                "last_batch_seconds": self.last_batch_seconds,
+                "avg_batch_seconds": (self.encode_seconds / self.batches) if self.batches else None,
+            }
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+def get_embedder() -> EmbeddingService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
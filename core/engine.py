@@ -0,0 +1,310 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Optional, Iterator, Sequence, Tuple, Union
+
+from core.classify import rank_labels, CLASSIFIER_VERSION
+from core.checklist import detect_process_and_compare
+from core.redflags import detect_issues, attach_citations, phrase_issues
+from core.comments import annotate_docx, ANNOTATION_VERSION, COMMENT_AUTHOR
+from core.consistency import extract_entities, find_conflicts, EXTRACTOR_VERSION
+from core.summarize import build_report
+from core.parsed import ParsedDocument
+from core.rules import get_ruleset
+from core.index_meta import read_fingerprint
+from core.citation_index import RETRIEVAL_MODE
+from core.review_cache import CachedReview, get_review_cache, review_key
+from core import llm, telemetry
+
+# A document to review: a path on disk or an in-memory (filename, bytes) upload.
+Source = Union[Path, str, Tuple[str, bytes]]
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+OUTPUTS_DIR = REPO_ROOT / "outputs"
+
+REVIEW_WORKERS = int(os.getenv("REVIEW_WORKERS", "4"))
+
+@dataclass
+class DocumentResult:
+    index: int
+    filename: str
+    doc_type: str = "Unknown"
+    labels: List[Tuple[str, float]] = field(default_factory=list)
+    issues: List[Dict] = field(default_factory=list)
+    reviewed_path: Optional[Path] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+    cached: bool = False
+    entities: List[Dict] = field(default_factory=list)  # see core.consistency
+
+@dataclass
+class PackResult:
+    documents: List[DocumentResult]
+    process_info: Dict
+    issues: List[Dict]
+    report: Optional[str] = None  # full JSON report, when requested
+
+class ReviewEngine:
+    """
+    Runs the per-document review pipeline (parse -> classify -> analyze ->
+    annotate) for several documents at once. Each .docx is parsed once into a
+    ParsedDocument shared by every stage; retrieval and Gemini calls are I/O
+    bound, so documents run on a thread pool. Usable from Streamlit, scripts
+    and the batch CLI alike. Every stage is recorded as a telemetry span tagged
+    with this engine's run id (one pack) and the document's id. Documents
+    whose bytes were already reviewed under the same rules, index and LLM
+    model are served from the review cache. Cross-document conflicts depend
+    on the whole pack, so they are never cached: they are added (and
+    annotated) on top of each document's own review.
+    """
+
+    def __init__(self, outputs_dir: Path = OUTPUTS_DIR, max_workers: int = REVIEW_WORKERS, use_cache: bool = True,
+                 root: Optional[Path] = None):
+        self.outputs_dir = Path(outputs_dir)
+        # Path sources under `root` are named by their relative path, and reviewed copies mirror that tree,
+        # so same-named files in different folders don't overwrite each other.
+        self.root = Path(root) if root is not None else None
+        self.max_workers = max(1, max_workers)
+        self.run_id = telemetry.new_id()
+        self.cache = get_review_cache() if use_cache else None
+
+    def _doc_id(self, index: int) -> str:
+        return f"{self.run_id}/{index}"
+
+    def _name(self, source: Source) -> str:
+        if isinstance(source, tuple):
+            return source[0]
+        if self.root is not None:
+            try:
+                return Path(source).relative_to(self.root).as_posix()
+            except ValueError:
+                pass
+        return Path(source).name
+
+    def _reviewed_path(self, name: str) -> Path:
+        rel = PurePosixPath(name)
+        reviewed_dir = self.outputs_dir / "reviewed" / rel.parent
+        reviewed_dir.mkdir(parents=True, exist_ok=True)
+        return reviewed_dir / f"reviewed_{rel.name}"
+
+    @staticmethod
+    def _cache_scope() -> Tuple[Optional[str], ...]:
+        """
+        Everything besides the document bytes that a review result depends on:
+        rules, index, LLM model, retrieval mode, comment author and the
+        versions of the classifier, entity extractor and annotator.
+        """
+        model = llm.get_client().model_name if llm.ENABLE_LLM and llm.API_KEY else "llm-off"
+        return (get_ruleset().version, read_fingerprint(), model, RETRIEVAL_MODE, COMMENT_AUTHOR,
+                f"classify-{CLASSIFIER_VERSION}", f"entities-{EXTRACTOR_VERSION}", f"annotate-{ANNOTATION_VERSION}")
+
+    def _lookup(self, index: int, source: Source, scope: Tuple):
+        """Return (source as (name, bytes), cache key, cached result or None)."""
+        name = self._name(source)
+        with telemetry.context(pack=self.run_id, doc=self._doc_id(index)):
+            try:
+                with telemetry.span("cache_lookup", filename=name) as s:
+                    data = source[1] if isinstance(source, tuple) else Path(source).read_bytes()
+                    key = review_key(data, *scope)
+                    hit = self.cache.get(key)
+            except Exception:
+                return source, None, None  # let _prepare report the problem
+        if hit is None:
+            telemetry.incr("review_cache_misses_total")
+            return (name, data), key, None
+        telemetry.incr("review_cache_hits_total")
+        result = DocumentResult(index=index, filename=name, doc_type=hit.doc_type, labels=hit.labels,
+                                issues=hit.issues, entities=hit.entities, cached=True,
+                                timings={"cache_lookup": s.duration})
+        for issue in result.issues:
+            if issue.get("document") not in (None, "ALL"):
+                issue["document"] = name  # same bytes may arrive under another filename
+        result.reviewed_path = self._reviewed_path(name)
+        result.reviewed_path.write_bytes(hit.annotated)
+        return (name, data), key, result
+
+    def _prepare(self, index: int, source: Source):
+        """Parse, classify and run the rule engine; no retrieval or LLM calls yet."""
+        result = DocumentResult(index=index, filename=self._name(source))
+        parsed = None
+        with telemetry.context(pack=self.run_id, doc=self._doc_id(index)):
+            try:
+                with telemetry.span("parse", filename=result.filename) as s:
+                    if isinstance(source, tuple):
+                        parsed = ParsedDocument.from_bytes(source[1], source[0])
+                    else:
+                        parsed = ParsedDocument.from_path(Path(source))
+                        parsed.name = result.filename  # relative to root, when one is set
+                result.timings["parse"] = s.duration
+                with telemetry.span("classify") as s:
+                    result.labels = rank_labels(parsed)
+                    result.doc_type = result.labels[0][0] if result.labels else "Unknown"
+                result.timings["classify"] = s.duration
+                with telemetry.span("detect") as s:
+                    result.issues = detect_issues(parsed, result.doc_type)
+                result.timings["detect"] = s.duration
+                with telemetry.span("extract_entities") as s:
+                    result.entities = extract_entities(parsed, result.doc_type)
+                result.timings["extract_entities"] = s.duration
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+        return parsed, result
+
+    def _finish(self, parsed: ParsedDocument, result: DocumentResult, key: Optional[str] = None,
+                conflicts: Sequence[Dict] = ()) -> DocumentResult:
+        """LLM phrasing and annotation, once citations are attached and the pack's conflicts are known."""
+        own_issues, annotated, degraded = result.issues, None, False
+        cacheable = key is not None and self.cache is not None
+        with telemetry.context(pack=self.run_id, doc=self._doc_id(result.index)):
+            try:
+                with telemetry.span("phrase") as s:
+                    own_issues, degraded = phrase_issues(parsed.name, result.issues)
+                    result.issues = own_issues
+                result.timings["phrase"] = s.duration
+                result.reviewed_path = self._reviewed_path(parsed.name)
+                with telemetry.span("annotate", issues=len(result.issues) + len(conflicts)) as s:
+                    if conflicts and cacheable:
+                        # The cache keeps this document's review on its own, without the pack's conflicts.
+                        annotate_docx(parsed, own_issues, result.reviewed_path)
+                        annotated = result.reviewed_path.read_bytes()
+                    result.issues = own_issues + list(conflicts)
+                    annotate_docx(parsed, result.issues, result.reviewed_path)
+                result.timings["annotate"] = s.duration
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+        # Don't persist reviews whose LLM phrasing was skipped for quota or failed; retry those next time.
+        if cacheable and result.error is None and not degraded:
+            try:
+                self.cache.put(key, CachedReview(result.doc_type, result.labels, own_issues,
+                                                 annotated or result.reviewed_path.read_bytes(), result.entities))
+            except Exception:
+                telemetry.incr("review_cache_errors_total")
+        return result
+
+    def _add_conflicts(self, source: Tuple[str, bytes], result: DocumentResult, conflicts: Sequence[Dict]):
+        """Re-annotate a cached review with conflicts found against the rest of this pack."""
+        with telemetry.context(pack=self.run_id, doc=self._doc_id(result.index)):
+            try:
+                parsed = ParsedDocument.from_bytes(source[1], source[0])
+                result.issues = result.issues + list(conflicts)
+                with telemetry.span("annotate", issues=len(result.issues)) as s:
+                    annotate_docx(parsed, result.issues, result.reviewed_path)
+                result.timings["annotate"] = s.duration
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    def iter_review(self, sources: Sequence[Source]) -> Iterator[DocumentResult]:
+        """
+        Yield each document's result as soon as it finishes (completion order).
+        Uncached documents are parsed and checked first, so every document's
+        entities can be indexed for the cross-document consistency check;
+        cached documents without conflicts are yielded then, and the rest
+        have their citation lookups resolved in one batched retrieval for
+        the whole pack.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="review") as pool:
+            pending = list(enumerate(sources))
+            keys: Dict[int, str] = {}
+            hits: List[Tuple[Tuple[str, bytes], DocumentResult]] = []
+            if self.cache is not None and pending:
+                scope = self._cache_scope()
+                looked_up = list(pool.map(lambda args: self._lookup(*args, scope), pending))
+                pending = []
+                for index, (source, key, hit) in enumerate(looked_up):
+                    if hit is not None:
+                        hits.append((source, hit))
+                        continue
+                    pending.append((index, source))
+                    if key:
+                        keys[index] = key
+
+            prepared = list(pool.map(lambda args: self._prepare(*args), pending))
+
+            ok = [(parsed, result) for parsed, result in prepared if result.error is None]
+            for _, result in prepared:
+                if result.error is not None:
+                    yield result
+
+            checked = [result for _, result in hits] + [result for _, result in ok]
+            with telemetry.context(pack=self.run_id), telemetry.span("consistency", documents=len(checked)) as s:
+                conflicts = find_conflicts((r.index, r.filename, r.doc_type, r.entities) for r in checked)
+            for result in checked:
+                result.timings["consistency"] = s.duration
+
+            futures = []
+            for source, result in hits:
+                if result.index in conflicts:
+                    futures.append(pool.submit(self._add_conflicts, source, result, conflicts[result.index]))
+                else:
+                    yield result
+
+            with telemetry.context(pack=self.run_id), telemetry.span("retrieve_batch", documents=len(ok)) as s:
+                try:
+                    attach_citations([issue for _, result in ok for issue in result.issues])
+                except Exception as e:
+                    for _, result in ok:
+                        result.error = f"{type(e).__name__}: {e}"
+            retrieve_s = s.duration
+
+            for parsed, result in ok:
+                if result.error is None:
+                    result.timings["retrieve_batch"] = retrieve_s
+                    futures.append(pool.submit(self._finish, parsed, result, keys.get(result.index),
+                                               conflicts.get(result.index, [])))
+                else:
+                    yield result
+            for fut in as_completed(futures):
+                yield fut.result()
+
+    def review(self, sources: Sequence[Source]) -> List[DocumentResult]:
+        """Review all documents and return results in input order."""
+        return sorted(self.iter_review(sources), key=lambda r: r.index)
+
+    def finalize(self, results: List[DocumentResult], json_report: bool = True) -> PackResult:
+        """
+        Pack-level steps: overall LLM summary, checklist comparison and, unless
+        json_report is False (callers streaming with ReportWriter), the JSON report.
+        """
+        with telemetry.context(pack=self.run_id):
+            pack = self._finalize(sorted(results, key=lambda r: r.index), json_report)
+        telemetry.flush()
+        return pack
+
+    def _finalize(self, results: List[DocumentResult], json_report: bool) -> PackResult:
+        doc_types = [{"filename": r.filename, "type": r.doc_type} for r in results]
+        all_issues = [issue for r in results for issue in r.issues]
+
+        with telemetry.span("summary"):
+            self._summarize(all_issues)
+        with telemetry.span("checklist"):
+            process_info = detect_process_and_compare(doc_types)
+        report = None
+        if json_report:
+            with telemetry.span("report"):
+                report = build_report(process_info, doc_types, all_issues)
+        return PackResult(documents=results, process_info=process_info, issues=all_issues, report=report)
+
+    @staticmethod
+    def _summarize(all_issues: List[Dict]):
+        """Append an LLM-phrased executive summary of the pack's findings."""
+        if all_issues:
+            bullets = "\n".join(
+                f"- {i.get('document')}: {i.get('section')} — {i.get('issue')} "
+                f"(Suggestion: {i.get('suggestion')})"
+                for i in all_issues if i.get("issue")
+            )
+            phrased_overall = llm.ask(
+                "Rewrite these cross-document compliance findings as 5–7 concise, professional bullets for an executive summary.",
+                bullets[:8000]
+            )
+            if phrased_overall and not phrased_overall.startswith("("):
+                all_issues.append({
+                    "document": "ALL",
+                    "section": "Summary",
+                    "issue": "LLM phrased overall review notes",
+                    "severity": "Info",
+                    "suggestion": phrased_overall,
+                    "citations": []
+                })
@@ -0,0 +1,33 @@
+import os
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = Path(os.getenv("ADGM_INDEX_DIR") or REPO_ROOT / "data" / "adgm_index")
+VERSION_FILE = DB_PATH / "index_version.json"
+
+_cached = {"mtime": None, "version": None}
+
+def read_fingerprint() -> Optional[str]:
+    """Version id of the current index; changes every time build_index writes to it."""
+    try:
+        mtime = VERSION_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if _cached["mtime"] != mtime:
+        try:
+            _cached["version"] = json.loads(VERSION_FILE.read_text(encoding="utf-8")).get("version")
+        except (OSError, ValueError):
+            _cached["version"] = None
+        _cached["mtime"] = mtime
+    return _cached["version"]
+
+def bump_fingerprint(**info) -> str:
+    DB_PATH.mkdir(parents=True, exist_ok=True)
+    version = uuid.uuid4().hex
+    VERSION_FILE.write_text(json.dumps({"version": version, "built_at": time.time(), **info}, indent=2),
+                            encoding="utf-8")
+    return version
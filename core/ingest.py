@@ -1,18 +1,37 @@
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterable
 import re
 import csv
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-from sentence_transformers import SentenceTransformer
-import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import numpy as np
 from pypdf import PdfReader
 from docx import Document
 
+from core.embeddings import get_embedder
+from core.index_meta import bump_fingerprint, DB_PATH
+from core import citation_index
+from core.vectorstore import open_store
+from core.bm25 import BM25Index, BM25_PATH
+from core.sources import LEDGER, ledger_by_file, ledger_hash
+from core.chunking import chunk_blocks, classify_line, text_to_blocks, CHUNKER_VERSION
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
-REF_DIR = REPO_ROOT / "data" / "adgm_refs"
-DB_PATH = REPO_ROOT / "data" / "adgm_index"
+REF_DIR = Path(os.getenv("ADGM_REFS_DIR") or REPO_ROOT / "data" / "adgm_refs")
 MANIFEST = REPO_ROOT / "data" / "sources_manifest.csv"
+INGEST_MANIFEST = DB_PATH / "ingest_manifest.json"
+CHECKPOINT = DB_PATH / "ingest_checkpoint.jsonl"
+SUPPORTED_SUFFIXES = {".pdf", ".docx"}
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS") or os.cpu_count() or 1)
+INGEST_QUEUE = int(os.getenv("INGEST_QUEUE") or 0) or 2 * max(INGEST_WORKERS, 1)
+PDF_PAGES_PER_TASK = int(os.getenv("INGEST_PDF_PAGES_PER_TASK", "50"))
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "32"))
+WRITE_BATCH = int(os.getenv("INGEST_WRITE_BATCH", "256"))
 
 def _read_manifest() -> Dict[str, Dict]:
     """Return a dict keyed by filename prefix -> {category, doc_type, url}"""
@@ -29,9 +48,10 @@ def _read_manifest() -> Dict[str, Dict]:
             out[prefix] = {"category": cat, "doc_type": dtyp, "url": url}
     return out
 
-def _extract_text_pdf(path: Path) -> str:
+def _extract_text_pdf(path: Path, start: int = 0, end: Optional[int] = None) -> str:
     reader = PdfReader(str(path))
-    text = "\n".join((p.extract_text() or "") for p in reader.pages)
+    pages = reader.pages[start:end] if (start or end is not None) else reader.pages
+    text = "\n".join((p.extract_text() or "") for p in pages)
     text = re.sub(r"[ \t]+\n", "\n", text)
     return text
 
@@ -40,54 +60,398 @@ def _extract_text_docx(path: Path) -> str:
     text = "\n".join(p.text for p in doc.paragraphs)
     return re.sub(r"[ \t]+\n", "\n", text)
 
-def load_texts_with_meta() -> List[Dict]:
+def _blocks_pdf(path: Path, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+    """Heading/clause/body blocks per text line, tagged with 1-based page numbers."""
+    reader = PdfReader(str(path))
+    first = start or 0
+    pages = reader.pages[first:end] if (start or end is not None) else reader.pages
+    blocks = []
+    for offset, page in enumerate(pages):
+        blocks.extend(text_to_blocks(page.extract_text() or "", page=first + offset + 1))
+    return blocks
+
+def _blocks_docx(path: Path) -> List[Dict]:
+    """Blocks per paragraph, using Word heading styles where the author applied them."""
+    doc = Document(str(path))
+    blocks = []
+    for p in doc.paragraphs:
+        if p.text.strip():
+            style = p.style.name if p.style is not None else None
+            blocks.append(classify_line(p.text, style))
+    return blocks
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _list_ref_files() -> List[Path]:
+    if not REF_DIR.exists():
+        return []
+    return sorted(fp for fp in REF_DIR.iterdir()
+                  if fp.is_file() and fp.suffix.lower() in SUPPORTED_SUFFIXES)
+
+def _load_ingest_manifest() -> Dict[str, Dict]:
+    """
+    filename -> {sha256, chunk_ids, chunk_hashes, dupes} for every file currently
+    in the index. An index built by a different chunker version counts as empty.
+    """
+    if not INGEST_MANIFEST.exists():
+        return {}
+    try:
+        data = json.loads(INGEST_MANIFEST.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+    return data.get("files", {}) if data.get("chunker") == CHUNKER_VERSION else {}
+
+def _save_ingest_manifest(files: Dict[str, Dict]):
+    DB_PATH.mkdir(parents=True, exist_ok=True)
+    tmp = INGEST_MANIFEST.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"chunker": CHUNKER_VERSION, "files": files}, indent=2), encoding="utf-8")
+    tmp.replace(INGEST_MANIFEST)
+
+def _read_ledger() -> Dict[str, Dict]:
+    """The fetcher's ledger for REF_DIR, keyed by filename."""
+    return ledger_by_file(REF_DIR / LEDGER.name)
+
+def _file_hashes(files: List[Path], ledger: Dict[str, Dict]) -> Dict[str, str]:
+    """Content hashes, reused from the fetch ledger for files it wrote and nobody touched since."""
+    return {fp.name: ledger_hash(fp, ledger.get(fp.name)) or _file_sha256(fp) for fp in files}
+
+def _meta_for(fp: Path, manifest: Dict[str, Dict], ledger: Optional[Dict[str, Dict]] = None) -> Dict:
+    meta = {"source_file": fp.name}
+    entry = (ledger or {}).get(fp.name)
+    if entry:
+        # The fetcher recorded exactly which manifest row produced this file.
+        meta.update({"category": entry["category"], "doc_type": entry["doc_type"], "url": entry["url"]})
+        return meta
+    for pref, info in manifest.items():
+        if fp.name.startswith(pref.replace(" ", "_")):
+            meta.update(info)
+            break
+    return meta
+
+def load_texts_with_meta(paths: Optional[Iterable[Path]] = None) -> List[Dict]:
     manifest = _read_manifest()
+    ledger = _read_ledger()
     docs = []
-    for fp in REF_DIR.iterdir():
-        if not fp.is_file():
-            continue
-        if fp.suffix.lower() not in {".pdf", ".docx"}:
-            continue
+    for fp in (_list_ref_files() if paths is None else paths):
         text = _extract_text_pdf(fp) if fp.suffix.lower() == ".pdf" else _extract_text_docx(fp)
-        meta = {"source_file": fp.name}
-        for pref, info in manifest.items():
-            if fp.name.startswith(pref.replace(" ", "_")):
-                meta.update(info)
-                break
-        docs.append({"text": text, "meta": meta})
+        docs.append({"text": text, "meta": _meta_for(fp, manifest, ledger)})
     return docs
 
 def chunk_docs(docs: List[Dict], chunk_size=1200, chunk_overlap=200):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     chunks = []
     for d in docs:
-        parts = splitter.split_text(d["text"])
-        for i, ch in enumerate(parts):
-            chunks.append({
-                "id": f"{d['meta'].get('source_file','src')}_{i}",
-                "text": ch,
-                "meta": d["meta"]
-            })
+        chunks.extend(chunk_blocks(text_to_blocks(d["text"]), d["meta"], d["meta"].get("source_file", "src"),
+                                   chunk_size=chunk_size, chunk_overlap=chunk_overlap))
     return chunks
 
-def embed_and_store(chunks: List[Dict]):
-    DB_PATH.mkdir(parents=True, exist_ok=True)
-    client = chromadb.PersistentClient(path=str(DB_PATH))
-    coll = client.get_or_create_collection("adgm")
+def _extraction_tasks(fp: Path, meta: Dict) -> List[tuple]:
+    """Split a file into (path, meta, start_page, end_page) units; large PDFs become page ranges."""
+    if fp.suffix.lower() == ".pdf" and PDF_PAGES_PER_TASK > 0:
+        try:
+            n_pages = len(PdfReader(str(fp)).pages)
+        except Exception:
+            n_pages = 0
+        if n_pages > PDF_PAGES_PER_TASK:
+            return [(str(fp), meta, start, min(start + PDF_PAGES_PER_TASK, n_pages))
+                    for start in range(0, n_pages, PDF_PAGES_PER_TASK)]
+    return [(str(fp), meta, None, None)]
+
+def _extract_and_chunk(path: str, meta: Dict, start: Optional[int], end: Optional[int]) -> Dict:
+    """Worker entry point: extract one file or PDF page range and chunk it."""
+    fp = Path(path)
+    t0 = time.perf_counter()
+    result = {"source_file": fp.name, "start": start, "chunks": [], "error": None}
+    try:
+        if fp.suffix.lower() == ".pdf":
+            blocks = _blocks_pdf(fp, start or 0, end)
+        else:
+            blocks = _blocks_docx(fp)
+        id_prefix = fp.name if start is None else f"{fp.name}_p{start}"
+        result["chunks"] = chunk_blocks(blocks, meta, id_prefix)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - t0
+    return result
 
-    model = SentenceTransformer("mixedbread-ai/mxbai-embed-large-v1")
-    docs = [c["text"] for c in chunks]
-    vecs = model.encode(docs, normalize_embeddings=True).tolist()
-    ids = [c["id"] for c in chunks]
-    metadatas = chunks_meta = [c["meta"] for c in chunks]
+def iter_extracted(paths: Iterable[Path], workers: int = INGEST_WORKERS,
+                   queue_size: int = INGEST_QUEUE, report: Optional[Dict] = None):
+    """
+    Extract and chunk reference files on a process pool, yielding each task's
+    result as soon as it finishes. At most `queue_size` tasks are in flight, so
+    a slow consumer (the embedder) holds back extraction instead of letting
+    text pile up in memory. Per-file timings and errors are collected in `report`.
+    """
+    manifest = _read_manifest()
+    ledger = _read_ledger()
+    tasks = (t for fp in paths for t in _extraction_tasks(fp, _meta_for(fp, manifest, ledger)))
+    report = report if report is not None else {}
 
-    coll.add(ids=ids, documents=docs, embeddings=vecs, metadatas=chunks_meta)
-    return coll.count()
+    def _record(res: Dict):
+        entry = report.setdefault(res["source_file"], {"seconds": 0.0, "tasks": 0, "chunks": 0, "errors": []})
+        entry["seconds"] += res["seconds"]
+        entry["tasks"] += 1
+        entry["chunks"] += len(res["chunks"])
+        if res["error"]:
+            entry["errors"].append(res["error"])
 
-def build_index():
-    docs = load_texts_with_meta()
-    if not docs:
+    if workers <= 1:
+        for task in tasks:
+            res = _extract_and_chunk(*task)
+            _record(res)
+            yield res
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(_extract_and_chunk, *task))
+            if len(pending) < max(queue_size, 1):
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                res = fut.result()
+                _record(res)
+                yield res
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                res = fut.result()
+                _record(res)
+                yield res
+
+def _max_write_batch(store) -> int:
+    return max(1, min(WRITE_BATCH, store.max_batch_size()))
+
+def _load_checkpoint() -> Dict[str, Dict]:
+    """source_file -> {sha256, ids} for chunks written by an interrupted build."""
+    out: Dict[str, Dict] = {}
+    if not CHECKPOINT.exists():
+        return out
+    with CHECKPOINT.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            entry = out.setdefault(rec["source_file"], {"sha256": rec["sha256"], "ids": set()})
+            if entry["sha256"] != rec["sha256"]:
+                out[rec["source_file"]] = entry = {"sha256": rec["sha256"], "ids": set()}
+            entry["ids"].update(rec["ids"])
+    return out
+
+class EmbeddingWriter:
+    """
+    Streams chunks into the vector store in fixed-size batches so peak memory
+    is bounded by the batch, not the corpus. Embeddings stay float32 numpy
+    arrays end to end. When `hashes` is given, every written batch is appended
+    to a checkpoint file and chunks already recorded there are skipped, so an
+    interrupted build resumes where it stopped.
+    """
+
+    def __init__(self, store, write_batch: int = 0, encode_batch: int = 0,
+                 hashes: Optional[Dict[str, str]] = None, done: Optional[Dict[str, Dict]] = None):
+        self.store = store
+        self.write_batch = write_batch or WRITE_BATCH
+        self.encode_batch = encode_batch or EMBED_BATCH
+        self.hashes = hashes
+        self.done = done or {}
+        self._buf: List[Dict] = []
+        self.written = 0
+        self.skipped = 0
+        self.seconds = 0.0
+
+    def add(self, chunks: Iterable[Dict]):
+        for c in chunks:
+            if c["id"] in self.done.get(c["meta"]["source_file"], {}).get("ids", ()):
+                self.skipped += 1
+                continue
+            self._buf.append(c)
+            if len(self._buf) >= self.write_batch:
+                self._write()
+
+    def flush(self):
+        if self._buf:
+            self._write()
+
+    def _write(self):
+        batch, self._buf = self._buf, []
+        t0 = time.perf_counter()
+        docs = [c["text"] for c in batch]
+        vecs = get_embedder().encode(docs, batch_size=self.encode_batch, convert_to_numpy=True)
+        vecs = np.asarray(vecs, dtype=np.float32)
+        self.store.upsert(ids=[c["id"] for c in batch], documents=docs, embeddings=vecs,
+                         metadatas=[c["meta"] for c in batch])
+        self.seconds += time.perf_counter() - t0
+        self.written += len(batch)
+        if self.hashes is not None:
+            self._checkpoint(batch)
+
+    def _checkpoint(self, batch: List[Dict]):
+        by_file: Dict[str, List[str]] = {}
+        for c in batch:
+            by_file.setdefault(c["meta"]["source_file"], []).append(c["id"])
+        with CHECKPOINT.open("a", encoding="utf-8") as f:
+            for name, ids in by_file.items():
+                f.write(json.dumps({"source_file": name, "sha256": self.hashes.get(name), "ids": ids}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+def embed_and_store(chunks: Iterable[Dict], store=None):
+    store = store if store is not None else open_store()
+    writer = EmbeddingWriter(store, write_batch=_max_write_batch(store))
+    writer.add(chunks)
+    writer.flush()
+    store.finalize()
+    return store.count()
+
+def _verify_store(store, previous: Dict[str, Dict], checkpoint: Dict[str, Dict]):
+    """
+    Check the store still holds what the manifest says. Returns (manifest, damaged sources);
+    sources with missing chunks are re-indexed, and if the store holds chunks nobody accounts
+    for (manifest or checkpoint), damaged is None and everything is re-indexed from scratch.
+    That includes a store left by another chunker version or with no manifest at all.
+    """
+    count = store.count()
+    known = {cid for entry in previous.values() for cid in entry.get("chunk_ids", [])}
+    if count == 0 or (known and count == len(known)):
+        return previous, set()
+    present = store.existing(known) if known else set()
+    damaged = {name for name, entry in previous.items()
+               if any(cid not in present for cid in entry.get("chunk_ids", []))}
+    resumed = {cid for entry in checkpoint.values() for cid in entry["ids"]} - known
+    if count > len(present) + (len(store.existing(resumed)) if resumed else 0):
+        return {}, None
+    return previous, damaged
+
+def build_index(incremental: bool = True):
+    """
+    Index everything in REF_DIR. In incremental mode only new or changed files
+    (by content hash, taken from the fetch ledger where it is still valid) are
+    re-extracted and re-embedded, and chunks belonging to removed or changed
+    files are deleted first.
+    """
+    files = _list_ref_files()
+    if not files:
         raise RuntimeError(f"No references in {REF_DIR}. Run the fetcher first.")
-    chunks = chunk_docs(docs)
-    n = embed_and_store(chunks)
-    return f"Indexed {n} chunks from {len(docs)} source documents."
+
+    if not incremental:
+        CHECKPOINT.unlink(missing_ok=True)
+        # Forget the old manifest before the store is wiped, so an interrupted rebuild
+        # can't leave a manifest that describes chunks which no longer exist.
+        INGEST_MANIFEST.unlink(missing_ok=True)
+    previous = _load_ingest_manifest() if incremental else {}
+    store = open_store(reset=not incremental)
+    if previous and (not store.count() or not BM25_PATH.exists()):
+        # Empty store (e.g. VECTOR_DB switched) or no lexical index yet: re-index everything.
+        previous = {}
+    hashes = _file_hashes(files, _read_ledger())
+    checkpoint = _load_checkpoint()
+    previous, damaged = _verify_store(store, previous, checkpoint)
+    if damaged is None:
+        CHECKPOINT.unlink(missing_ok=True)
+        checkpoint = {}
+        store = open_store(reset=True)
+    bm25 = BM25Index.load() if previous else BM25Index()
+
+    changed_names = {fp.name for fp in files if previous.get(fp.name, {}).get("sha256") != hashes[fp.name]}
+    changed_names.update(name for name in damaged or () if name in hashes)
+    removed = [name for name in previous if name not in hashes]
+
+    # Identical boilerplate chunks are stored once, owned by the first file that produced them.
+    # A file that dropped duplicates whose owner is changing or gone must be re-chunked too.
+    owners = {}
+    while True:
+        unchanged = [name for name in hashes if name in previous and name not in changed_names]
+        owners = {h: name for name in unchanged for h in previous[name].get("chunk_hashes", [])}
+        orphaned = [name for name in unchanged if any(h not in owners for h in previous[name].get("dupes", []))]
+        if not orphaned:
+            break
+        changed_names.update(orphaned)
+    changed = [fp for fp in files if fp.name in changed_names]
+
+    # Chunks a previous, interrupted run already wrote for the current file contents.
+    resumed = {name: entry for name, entry in checkpoint.items()
+               if entry["sha256"] == hashes.get(name)}
+
+    stale_ids = [cid for name in removed for cid in previous[name].get("chunk_ids", [])]
+    stale_ids += [cid for fp in changed for cid in previous.get(fp.name, {}).get("chunk_ids", [])
+                  if cid not in resumed.get(fp.name, {}).get("ids", ())]
+
+    if not changed and not stale_ids:
+        CHECKPOINT.unlink(missing_ok=True)
+        return f"Index up to date ({store.count()} chunks from {len(files)} source documents)."
+
+    if stale_ids:
+        store.delete(stale_ids)
+    bm25.remove(cid for name in removed + [fp.name for fp in changed]
+                for cid in previous.get(name, {}).get("chunk_ids", []))
+
+    current = {name: entry for name, entry in previous.items() if name in hashes}
+    for fp in changed:
+        current[fp.name] = {"sha256": hashes[fp.name], "chunk_ids": [], "chunk_hashes": [], "dupes": []}
+
+    report: Dict[str, Dict] = {}
+    n_dupes = 0
+    writer = EmbeddingWriter(store, write_batch=_max_write_batch(store), hashes=hashes, done=resumed)
+    for res in iter_extracted(changed, report=report):
+        entry = current[res["source_file"]]
+        fresh = []
+        for c in res["chunks"]:
+            h = c["meta"]["chunk_hash"]
+            if h in owners:
+                entry["dupes"].append(h)
+                n_dupes += 1
+                continue
+            owners[h] = res["source_file"]
+            entry["chunk_hashes"].append(h)
+            fresh.append(c)
+        writer.add(fresh)
+        bm25.add([c["id"] for c in fresh], [c["text"] for c in fresh], [c["meta"] for c in fresh])
+        entry["chunk_ids"].extend(c["id"] for c in fresh)
+    writer.flush()
+
+    failed = sorted(name for name, entry in report.items() if entry["errors"])
+    for name in failed:
+        # Forget the hash so the file is retried (and its partial chunks replaced) next build.
+        current[name]["sha256"] = None
+    _save_ingest_manifest(current)
+    CHECKPOINT.unlink(missing_ok=True)
+
+    store.finalize()
+    bm25.save()
+    n = store.count()
+    version = bump_fingerprint(chunks=n, sources=len(files), extraction=report,
+                               embedded=writer.written, chunks_per_sec=writer.chunks_per_sec)
+    try:
+        n_rule_queries = citation_index.precompute(version)
+    except Exception as e:
+        # The index itself is complete; reviews fall back to live retrieval.
+        n_rule_queries, precompute_error = 0, f"{type(e).__name__}: {e}"
+    else:
+        precompute_error = None
+    msg = (f"Indexed {n} chunks from {len(files)} source documents "
+           f"({len(changed)} new/changed, {len(removed)} removed, {writer.written} chunks embedded "
+           f"at {writer.chunks_per_sec:.1f} chunks/s")
+    if n_dupes:
+        msg += f", {n_dupes} duplicate chunks skipped"
+    if writer.skipped:
+        msg += f", {writer.skipped} resumed from checkpoint"
+    if damaged is None:
+        msg += ", store did not match the manifest so everything was re-indexed"
+    elif damaged:
+        msg += f", {len(damaged)} sources with missing chunks re-indexed"
+    msg += f"; citations precomputed for {n_rule_queries} rule queries)."
+    if failed:
+        msg += f" Failed to extract: {', '.join(failed)}."
+    if precompute_error:
+        msg += f" Citation precompute failed ({precompute_error})."
+    return msg
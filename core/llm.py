@@ -0,0 +1,242 @@
+import os
+import re
+import time
+import random
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from core import telemetry
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+load_dotenv()
+API_KEY = os.getenv("GEMINI_API_KEY")
+ENABLE_LLM = os.getenv("ENABLE_LLM_SUMMARY", "true").lower() == "true"
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. http://127.0.0.1:8089 for a local fake server
+RPM = float(os.getenv("GEMINI_RPM", "15"))  # free-tier requests per minute
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+CACHE_PATH = Path(os.getenv("GEMINI_CACHE_PATH") or REPO_ROOT / "data" / "cache" / "llm_cache.sqlite")
+MAX_PROMPT_CHARS = 8000
+
+class QuotaExceeded(Exception):
+    pass
+
+class Reply(str):
+    """Text returned by ask(); `degraded` is set when a quota skip or an error stands in for the model's answer."""
+    degraded = False
+
+def _degraded(text: str) -> Reply:
+    reply = Reply(text)
+    reply.degraded = True
+    return reply
+
+_QUOTA_ERROR = re.compile(r"\b429\b|ResourceExhausted|RESOURCE_EXHAUSTED|rate[ _-]?limit", re.I)
+_TRANSIENT_ERROR = re.compile(r"\b(?:500|502|503|504)\b|ServiceUnavailable|UNAVAILABLE|DeadlineExceeded|"
+                              r"DEADLINE_EXCEEDED|timed out")
+
+def _is_quota_error(msg: str) -> bool:
+    return bool(_QUOTA_ERROR.search(msg))
+
+def _is_transient_error(msg: str) -> bool:
+    return bool(_TRANSIENT_ERROR.search(msg))
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class ResponseCache:
+    """prompt hash -> response text, persisted in SQLite so it survives restarts."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, text TEXT, created REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT text FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, text: str):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, text, time.time()))
+
+class GeminiClient:
+    """
+    Gemini wrapper shared by the whole process: resolves the model once,
+    rate-limits to the configured RPM, retries transient and quota errors with
+    jittered backoff, collapses identical in-flight prompts into one request and
+    caches responses on disk.
+    """
+
+    def __init__(self, api_key: Optional[str] = API_KEY, model_name: str = MODEL_NAME,
+                 endpoint: Optional[str] = API_ENDPOINT, rpm: float = RPM,
+                 max_retries: int = MAX_RETRIES, cache_path: Optional[Path] = CACHE_PATH):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.endpoint = endpoint
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rpm / 60.0)
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.counters = {"calls": 0, "cache_hits": 0, "deduplicated": 0, "retries": 0, "quota_skips": 0, "errors": 0}
+
+    def _count(self, name: str):
+        with self._inflight_lock:
+            self.counters[name] += 1
+        telemetry.incr(f"llm_{name}_total", model=self.model_name)
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai  # slow to import; only needed for a real call
+                    kwargs = {"api_key": self.api_key}
+                    if self.endpoint:
+                        kwargs["transport"] = "rest"
+                        kwargs["client_options"] = {"api_endpoint": self.endpoint}
+                    genai.configure(**kwargs)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _call(self, prompt: str) -> str:
+        model = self._get_model()
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                self._count("calls")
+                with telemetry.span("llm_call", model=self.model_name, attempt=attempt):
+                    resp = model.generate_content(prompt)
+                return getattr(resp, "text", "").strip()
+            except Exception as e:
+                msg = str(e)
+                quota = _is_quota_error(msg)
+                if attempt == self.max_retries or not (quota or _is_transient_error(msg)):
+                    if quota:
+                        raise QuotaExceeded(msg) from e
+                    raise
+                self._count("retries")
+                time.sleep(min(30.0, (2 ** attempt)) * random.uniform(0.5, 1.5))
+
+    def generate(self, prompt: str) -> str:
+        """Return the model's text for `prompt`; raises QuotaExceeded or the underlying error."""
+        key = self._key(prompt)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            self._count("deduplicated")
+            return fut.result()
+
+        try:
+            text = self._call(prompt)
+            if text and self.cache is not None:
+                self.cache.set(key, text)
+            fut.set_result(text)
+            return text
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def agenerate(self, prompt: str) -> str:
+        return await asyncio.to_thread(self.generate, prompt)
+
+    def stats(self) -> Dict:
+        with self._inflight_lock:
+            return {"model": self.model_name, **self.counters}
+
+_client: Optional[GeminiClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> GeminiClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
+
+def _build_prompt(system_prompt: str, user_prompt: str) -> str:
+    prompt = (system_prompt + "\n\n" + user_prompt).strip()
+    return prompt[:MAX_PROMPT_CHARS]
+
+def ask(system_prompt: str, user_prompt: str) -> Reply:
+    """
+    Quota-safe wrapper for Gemini. Returns a benign string if:
+    - LLM is disabled,
+    - no API key,
+    - or quota/rate limits are still hit after retries.
+    The last case, and any other error, is marked `degraded` so callers can
+    avoid caching a result that would succeed on retry.
+    """
+    if not ENABLE_LLM:
+        return Reply("(LLM disabled by configuration)")
+    if not API_KEY:
+        return Reply("(Gemini not configured)")
+
+    client = get_client()
+    try:
+        return Reply(client.generate(_build_prompt(system_prompt, user_prompt)) or "(No response)")
+    except QuotaExceeded:
+        client._count("quota_skips")
+        return _degraded("(LLM summary skipped due to quota limits)")
+    except Exception as e:
+        client._count("errors")
+        return _degraded(f"(LLM error: {str(e)[:200]})")
+
+async def ask_async(system_prompt: str, user_prompt: str) -> Reply:
+    return await asyncio.to_thread(ask, system_prompt, user_prompt)
@@ -0,0 +1,71 @@
+import io
+from functools import cached_property
+from pathlib import Path
+from typing import List, Optional, Union
+
+from docx import Document
+
+class ParsedDocument:
+    """
+    A .docx parsed once and shared by classification, red-flag analysis and
+    annotation. Text views are computed lazily and cached.
+    `data` keeps the source bytes so annotate_docx can copy the package as-is.
+    """
+
+    def __init__(self, document, name: str, path: Optional[Path] = None, data: Optional[bytes] = None):
+        self.document = document
+        self.name = name
+        self.path = path
+        self.data = data
+
+    @classmethod
+    def from_path(cls, path: Path) -> "ParsedDocument":
+        path = Path(path)
+        data = path.read_bytes()
+        return cls(Document(io.BytesIO(data)), path.name, path=path, data=data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str) -> "ParsedDocument":
+        data = bytes(data)
+        return cls(Document(io.BytesIO(data)), name, data=data)
+
+    @cached_property
+    def paragraphs(self) -> List[str]:
+        """Body paragraph texts, index-aligned with document.paragraphs."""
+        return [p.text or "" for p in self.document.paragraphs]
+
+    @cached_property
+    def tables(self) -> List[List[List[str]]]:
+        return [[[cell.text or "" for cell in row.cells] for row in table.rows]
+                for table in self.document.tables]
+
+    @cached_property
+    def headers(self) -> List[str]:
+        return [p.text for s in self.document.sections for p in s.header.paragraphs if p.text.strip()]
+
+    @cached_property
+    def footers(self) -> List[str]:
+        return [p.text for s in self.document.sections for p in s.footer.paragraphs if p.text.strip()]
+
+    @cached_property
+    def text(self) -> str:
+        """Non-empty body paragraphs, then table rows, headers and footers."""
+        parts = [t for t in self.paragraphs if t.strip()]
+        for table in self.tables:
+            for row in table:
+                line = " | ".join(dict.fromkeys(c for c in row if c.strip()))
+                if line:
+                    parts.append(line)
+        parts.extend(self.headers)
+        parts.extend(self.footers)
+        return "\n".join(parts)
+
+    @cached_property
+    def lower_text(self) -> str:
+        return self.text.lower()
+
+def load(source: Union["ParsedDocument", Path, str]) -> ParsedDocument:
+    """Accept either an already parsed document or a path to a .docx."""
+    if isinstance(source, ParsedDocument):
+        return source
+    return ParsedDocument.from_path(Path(source))
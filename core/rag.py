@@ -1,97 +1,177 @@
 import os
-from typing import List, Dict
+import json
+import threading
+from typing import List, Dict, Optional, Sequence, Union
 from pathlib import Path
 from dotenv import load_dotenv
-import chromadb
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-
-REPO_ROOT = Path(__file__).resolve().parents[1]
-DB_PATH = REPO_ROOT / "data" / "adgm_index"
+from core.embeddings import get_embedder
+from core.cache import LRUCache
+from core.index_meta import read_fingerprint
+from core.vectorstore import get_store
+from core.bm25 import BM25Index
+from core.citation_index import RETRIEVAL_MODE, CITATION_SCHEMA
+from core import llm, telemetry
 
 load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-ENABLE_LLM = os.getenv("ENABLE_LLM_SUMMARY", "true").lower() == "true"
 
-if api_key:
-    genai.configure(api_key=api_key)
+CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "86400"))
+CACHE_DIR = os.getenv("RAG_CACHE_DIR")  # set to persist the caches across restarts
+
+RRF_K = 60           # reciprocal-rank fusion constant
+CANDIDATES_PER_HIT = 4  # each retriever contributes top_k * this candidates to the fusion
+
+def _cache_path(name: str):
+    return Path(CACHE_DIR) / name if CACHE_DIR else None
+
+_query_embeddings = LRUCache(CACHE_SIZE, CACHE_TTL, _cache_path("query_embeddings.pkl"))
+_query_results = LRUCache(CACHE_SIZE, CACHE_TTL, _cache_path("query_results.pkl"))
+
+def _embed_queries(queries: List[str]) -> List[List[float]]:
+    """Embeddings for `queries`, encoding only cache misses and all of them in one batch."""
+    embedder = get_embedder()
+    embs = {q: _query_embeddings.get((embedder.model_name, q)) for q in dict.fromkeys(queries)}
+    missing = [q for q, emb in embs.items() if emb is None]
+    telemetry.incr("rag_cache_hits_total", len(embs) - len(missing), cache="query_embeddings")
+    telemetry.incr("rag_cache_misses_total", len(missing), cache="query_embeddings")
+    if missing:
+        for q, vec in zip(missing, embedder.encode(missing)):
+            embs[q] = vec.tolist()
+            _query_embeddings.set((embedder.model_name, q), embs[q])
+        _query_embeddings.save()
+    return [embs[q] for q in queries]
+
+_bm25 = {"fingerprint": None, "index": None}
+_bm25_lock = threading.Lock()
+
+def _get_bm25() -> BM25Index:
+    fingerprint = read_fingerprint()
+    with _bm25_lock:
+        if _bm25["index"] is None or _bm25["fingerprint"] != fingerprint:
+            _bm25["index"] = BM25Index.load()
+            _bm25["fingerprint"] = fingerprint
+        return _bm25["index"]
+
+def _fuse(ranked_lists: List[List[Dict]], top_k: int) -> List[Dict]:
+    """Reciprocal-rank fusion: score = sum over lists of 1 / (RRF_K + rank)."""
+    fused: Dict[str, float] = {}
+    first_seen: Dict[str, Dict] = {}
+    for hits in ranked_lists:
+        for rank, hit in enumerate(hits, start=1):
+            fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (RRF_K + rank)
+            first_seen.setdefault(hit["id"], hit)
+    order = sorted(fused, key=lambda cid: -fused[cid])[:top_k]
+    return [dict(first_seen[cid], score=fused[cid]) for cid in order]
+
+def cache_stats() -> Dict:
+    return {"query_embeddings": _query_embeddings.stats(), "query_results": _query_results.stats()}
+
+def clear_caches():
+    _query_embeddings.clear()
+    _query_results.clear()
 
-def _choose_model() -> str:
+def _to_citation(hit: Dict, mode: str, dense: bool) -> Dict:
     """
-    Prefer a low-cost, free-tier friendly model.
-    We'll try to list models; if that fails, default to flash.
+    `distance` (lower is closer) is set for hits ranked by the vector store,
+    `relevance` (higher is better: BM25 or fused rank score) for the others.
     """
-    try:
-        models = list(genai.list_models())
-        generative = [m.name for m in models if "generateContent" in getattr(m, "supported_generation_methods", [])]
-        for p in ["gemini-1.5-flash", "gemini-1.5-pro"]:
-            if p in generative:
-                return p
-        return generative[0] if generative else "gemini-1.5-flash"
-    except Exception:
-        return "gemini-1.5-flash"
-
-def _collection():
-    client = chromadb.PersistentClient(path=str(DB_PATH))
-    return client.get_or_create_collection("adgm")
-
-def retrieve(query: str, top_k=5) -> List[Dict]:
+    md = hit["meta"] or {}
+    return {
+        "text": hit["text"],
+        "chunk_id": hit["id"],
+        "source_file": md.get("source_file", ""),
+        "category": md.get("category", ""),
+        "doc_type": md.get("doc_type", ""),
+        "url": md.get("url", ""),
+        "distance": hit["score"] if dense else None,
+        "relevance": None if dense else hit["score"],
+        "retrieval": mode,
+    }
+
+def retrieve_many(queries: Sequence[Union[str, Dict]], top_k=5) -> List[List[Dict]]:
     """
-    Vector search into the ADGM reference index. Returns text + rich metadata for citations.
+    Resolve several searches in one round-trip. Each query is a string or a
+    dict {"query", "top_k", "where", "mode"}; results are returned in input
+    order. Duplicates and cached results are resolved once, uncached query
+    texts are embedded in a single batch, and the dense searches sharing a
+    filter/mode/top_k run as one multi-embedding vector-store query.
     """
-    coll = _collection()
-    model = SentenceTransformer("mixedbread-ai/mxbai-embed-large-v1")
-    q_emb = model.encode([query], normalize_embeddings=True).tolist()
-
-    # NOTE: chromadb build does not accept "ids" in include
-    res = coll.query(
-        query_embeddings=q_emb,
-        n_results=top_k,
-        include=["documents", "metadatas", "distances"]
-    )
-
-    out: List[Dict] = []
-    if not res or not res.get("documents") or not res["documents"]:
-        return out
-
-    n_hits = len(res["documents"][0])
-    for i in range(n_hits):
-        md = res["metadatas"][0][i] if res.get("metadatas") else {}
-        out.append({
-            "text": res["documents"][0][i],
-            "source_file": md.get("source_file", ""),
-            "category": md.get("category", ""),
-            "doc_type": md.get("doc_type", ""),
-            "url": md.get("url", ""),
-            "score": float(res["distances"][0][i]) if res.get("distances") else None,
-        })
-    return out
+    fingerprint = read_fingerprint()
+    specs = []
+    for q in queries:
+        q = {"query": q} if isinstance(q, str) else q
+        mode = (q.get("mode") or RETRIEVAL_MODE).lower()
+        k = q.get("top_k") or top_k
+        where = q.get("where")
+        where_key = json.dumps(where, sort_keys=True) if where else None
+        specs.append({"query": q["query"], "top_k": k, "where": where, "mode": mode,
+                      "key": (q["query"], k, where_key, mode, fingerprint, CITATION_SCHEMA)})
+
+    results: Dict[tuple, List[Dict]] = {}
+    pending: Dict[tuple, Dict] = {}
+    for spec in specs:
+        if spec["key"] in results or spec["key"] in pending:
+            continue
+        cached = _query_results.get(spec["key"])
+        if cached is not None:
+            results[spec["key"]] = cached
+        else:
+            pending[spec["key"]] = spec
+    telemetry.incr("rag_cache_hits_total", len(results), cache="query_results")
+    telemetry.incr("rag_cache_misses_total", len(pending), cache="query_results")
+
+    dense_specs = [s for s in pending.values() if s["mode"] != "lexical"]
+    embs = dict(zip((s["key"] for s in dense_specs), _embed_queries([s["query"] for s in dense_specs])))
+    groups: Dict[tuple, List[Dict]] = {}
+    for spec in dense_specs:
+        groups.setdefault(spec["key"][1:4], []).append(spec)
+    dense_hits: Dict[tuple, List[Dict]] = {}
+    for group in groups.values():
+        first = group[0]
+        n_candidates = first["top_k"] * CANDIDATES_PER_HIT if first["mode"] == "hybrid" else first["top_k"]
+        with telemetry.span("vector_query", queries=len(group)):
+            hits = get_store().query([embs[s["key"]] for s in group], n_candidates, first["where"])
+        dense_hits.update(zip((s["key"] for s in group), hits))
+
+    for key, spec in pending.items():
+        k, mode = spec["top_k"], spec["mode"]
+        n_candidates = k * CANDIDATES_PER_HIT if mode == "hybrid" else k
+        lexical = []
+        if mode in ("hybrid", "lexical"):
+            with telemetry.span("bm25_search"):
+                lexical = _get_bm25().search(spec["query"], n_candidates, spec["where"])
+        dense = dense_hits.get(key, [])
+        if mode == "lexical":
+            hits, by_distance = lexical, False
+        elif mode == "hybrid" and lexical:
+            hits, by_distance = _fuse([dense, lexical], k), False
+        else:
+            hits, by_distance = dense[:k], True
+        out = [_to_citation(hit, mode, by_distance) for hit in hits]
+        if out:
+            _query_results.set(key, out)
+        results[key] = out
+    if pending:
+        _query_results.save()
+
+    return [[dict(hit) for hit in results[spec["key"]]] for spec in specs]
+
+def retrieve(query: str, top_k=5, where: Optional[Dict] = None, mode: Optional[str] = None) -> List[Dict]:
+    """
+    Search the ADGM reference index. Returns text + rich metadata for citations.
+    mode: "dense" (vector), "lexical" (BM25, no embedding needed) or "hybrid"
+    (both, fused by reciprocal rank). `where` is a Chroma-style metadata filter
+    such as {"category": {"$in": [...]}} applied before ranking.
+    Results are cached per (query, top_k, filter, mode, index version), so a rebuild invalidates them.
+    """
+    return retrieve_many([{"query": query, "top_k": top_k, "where": where, "mode": mode}])[0]
 
 def ask_gemini(system_prompt: str, user_prompt: str) -> str:
     """
-    Quota-safe wrapper for Gemini. Returns a benign string if:
-    - LLM is disabled,
-    - no API key,
-    - or quota/rate limits are hit.
+    Quota-safe wrapper for Gemini; see core.llm.ask. Returns a benign string if
+    the LLM is disabled, not configured, or rate limited.
     """
-    if not ENABLE_LLM:
-        return "(LLM disabled by configuration)"
-    if not api_key:
-        return "(Gemini not configured)"
-
-    model_name = _choose_model()
-    if model_name != "gemini-1.5-flash":
-        model_name = "gemini-1.5-flash"
-
-    try:
-        model = genai.GenerativeModel(model_name)
-        prompt = (system_prompt + "\n\n" + user_prompt).strip()
-        if len(prompt) > 8000:
-            prompt = prompt[:8000]
-        resp = model.generate_content(prompt)
-        return getattr(resp, "text", "").strip() or "(No response)"
-    except Exception as e:
-        msg = str(e)
-        if "ResourceExhausted" in msg or "429" in msg or "rate" in msg.lower():
-            return "(LLM summary skipped due to quota limits)"
-        return f"(LLM error: {msg[:200]})"
+    return llm.ask(system_prompt, user_prompt)
+
+async def ask_gemini_async(system_prompt: str, user_prompt: str) -> str:
+    return await llm.ask_async(system_prompt, user_prompt)
@@ -1,49 +1,57 @@
-import re
 from pathlib import Path
-from typing import List, Dict
-from docx import Document
-from core.rag import retrieve, ask_gemini
+from typing import List, Dict, Tuple, Union
+from core.parsed import ParsedDocument, load
+from core.llm import ask as ask_gemini
+from core.rules import get_ruleset
+from core import citation_index
 
-def analyze_document(path: Path, doc_type: str) -> List[Dict]:
-    doc = Document(str(path))
-    text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
+def detect_issues(source: Union[ParsedDocument, Path], doc_type: str) -> List[Dict]:
+    """Run the rule engine only; citations are filled in later by attach_citations."""
+    parsed = load(source)
     issues: List[Dict] = []
-
-    if re.search(r"UAE\s+Federal\s+Courts", text, re.I) and not re.search(r"ADGM\s+Courts", text, re.I):
-        cites = retrieve("ADGM governing law jurisdiction clause for contracts")
-        issues.append({
-            "document": path.name,
-            "section": "Jurisdiction",
-            "issue": "Jurisdiction refers to UAE Federal Courts; expected ADGM Courts.",
-            "severity": "High",
-            "suggestion": "Use: 'This agreement is governed by ADGM law; disputes are subject to ADGM Courts.'",
-            "citations": cites[:3],  
-            "anchor_regex": r"UAE\s+Federal\s+Courts"
-        })
-
-    if re.search(r"\[[^\]]+\]", text):
-        issues.append({
-            "document": path.name,
-            "section": "Placeholders",
-            "issue": "Unresolved placeholders detected.",
-            "severity": "Medium",
-            "suggestion": "Replace placeholders like [Company], [Date], [Address] before submission.",
+    for rule, hit in get_ruleset().evaluate(parsed, doc_type):
+        issue = {
+            "document": parsed.name,
+            "section": rule.section,
+            "issue": rule.issue,
+            "severity": rule.severity,
+            "suggestion": rule.suggestion,
             "citations": [],
-            "anchor_regex": r"\[[^\]]+\]"
-        })
+            "rule_id": rule.id,
+        }
+        if hit is not None:
+            issue["anchor_paragraph"], issue["anchor_start"], issue["anchor_end"] = hit
+        issues.append(issue)
+    return issues
 
-    if not re.search(r"Signature|Signed by|Authorised Signatory", text, re.I):
-        cites = retrieve("ADGM execution signature requirements")
-        issues.append({
-            "document": path.name,
-            "section": "Execution",
-            "issue": "Signature/signatory section appears to be missing.",
-            "severity": "High",
-            "suggestion": "Add authorized signatory block: name, title, date (and seal if required).",
-            "citations": cites[:2],
-            "anchor_regex": r"$^"
-        })
+def attach_citations(issues: List[Dict]) -> List[Dict]:
+    """
+    Fill in citations for every rule-based issue. Answers precomputed by
+    build_index are looked up directly; anything else is resolved with a
+    single batched retrieval, however many documents the issues come from.
+    """
+    rules = {r.id: r for r in get_ruleset().rules}
+    needing = [(i, rules[i["rule_id"]]) for i in issues
+               if i.get("rule_id") in rules and rules[i["rule_id"]].query and rules[i["rule_id"]].citations]
+    if not needing:
+        return issues
+    specs = [rule.retrieval_spec() for _, rule in needing]
+    results = citation_index.lookup(specs)
+    missing = [n for n, cites in enumerate(results) if cites is None]
+    if missing:
+        from core.rag import retrieve_many  # loads the embedder/vector store only when needed
+        for n, cites in zip(missing, retrieve_many([specs[n] for n in missing])):
+            results[n] = cites
+    for (issue, rule), cites in zip(needing, results):
+        issue["citations"] = cites[:rule.citations]
+    return issues
 
+def phrase_issues(document: str, issues: List[Dict]) -> Tuple[List[Dict], bool]:
+    """
+    Append an LLM-phrased summary of `issues` when the LLM is available.
+    Returns the issues and whether the LLM was skipped for quota or failed.
+    """
+    degraded = False
     if issues:
         bullet_points = "\n".join(f"- {i['section']}: {i['issue']} (Suggestion: {i['suggestion']})"
                                   for i in issues if i.get("issue"))
@@ -51,16 +59,19 @@ def analyze_document(path: Path, doc_type: str) -> List[Dict]:
             "Rewrite these compliance findings as succinct, professional review notes for a legal document.",
             bullet_points
         )
+        degraded = getattr(phrased, "degraded", False)
         if phrased and not phrased.startswith("(LLM error") and not phrased.startswith("(Gemini not configured)"):
             issues.append({
-                "document": path.name,
+                "document": document,
                 "section": "Summary",
                 "issue": "LLM phrased review notes",
                 "severity": "Info",
                 "suggestion": phrased,
                 "citations": []
             })
-        else:
-            pass
+    return issues, degraded
 
-    return issues
+def analyze_document(source: Union[ParsedDocument, Path], doc_type: str) -> List[Dict]:
+    parsed = load(source)
+    issues = attach_citations(detect_issues(parsed, doc_type))
+    return phrase_issues(parsed.name, issues)[0]
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+load_dotenv()
+ENABLED = (os.getenv("REVIEW_CACHE") or "true").lower() == "true"
+CACHE_PATH = Path(os.getenv("REVIEW_CACHE_PATH") or REPO_ROOT / "data" / "cache" / "review_cache.sqlite")
+MAX_BYTES = int(float(os.getenv("REVIEW_CACHE_MAX_MB") or "512") * 1024 * 1024)
+SCHEMA = "2"  # bump when the shape of cached issues or annotated output changes
+
+@dataclass
+class CachedReview:
+    doc_type: str
+    labels: List[Tuple[str, float]]
+    issues: List[Dict]
+    annotated: bytes
+    entities: List[Dict] = field(default_factory=list)  # consistency mentions, for pack-level checks
+
+def review_key(data: bytes, *scope: Optional[str]) -> str:
+    """
+    Content address of one document's review: its bytes plus everything else the
+    result depends on (see ReviewEngine._cache_scope).
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(data).digest())
+    for part in (SCHEMA, *scope):
+        h.update(b"\0" + (part if part is not None else "-").encode("utf-8"))
+    return h.hexdigest()
+
+class ReviewCache:
+    """
+    Finished per-document reviews in SQLite (WAL), shared safely by several
+    app processes on one host. Entries are evicted least-recently-used once
+    the stored payloads exceed `max_bytes`.
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reviews (key TEXT PRIMARY KEY, doc_type TEXT, labels TEXT, "
+                "issues TEXT, annotated BLOB, size INTEGER, created REAL, accessed REAL, entities TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS reviews_accessed ON reviews (accessed)")
+            if "entities" not in {row[1] for row in conn.execute("PRAGMA table_info(reviews)")}:
+                conn.execute("ALTER TABLE reviews ADD COLUMN entities TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[CachedReview]:
+        conn = self._conn()
+        row = conn.execute("SELECT doc_type, labels, issues, annotated, entities FROM reviews WHERE key = ?",
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE reviews SET accessed = ? WHERE key = ?", (time.time(), key))
+        return CachedReview(doc_type=row[0], labels=[tuple(l) for l in json.loads(row[1])],
+                            issues=json.loads(row[2]), annotated=row[3], entities=json.loads(row[4] or "[]"))
+
+    def put(self, key: str, review: CachedReview):
+        labels = json.dumps(review.labels)
+        issues = json.dumps(review.issues, ensure_ascii=False)
+        entities = json.dumps(review.entities, ensure_ascii=False)
+        size = len(review.annotated) + len(labels) + len(issues) + len(entities)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")  # serialise insert + eviction across processes
+            conn.execute("INSERT OR REPLACE INTO reviews (key, doc_type, labels, issues, annotated, size, created, "
+                         "accessed, entities) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, review.doc_type, labels, issues, review.annotated, size, now, now, entities))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reviews").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                victims = []
+                for victim, victim_size in conn.execute(
+                        "SELECT key, size FROM reviews WHERE key != ? ORDER BY accessed", (key,)):
+                    victims.append((victim,))
+                    freed += victim_size
+                    if freed >= excess:
+                        break
+                conn.executemany("DELETE FROM reviews WHERE key = ?", victims)
+
+    def stats(self) -> Dict:
+        entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reviews").fetchone()
+        return {"path": str(self.path), "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM reviews")
+
+_cache: Optional[ReviewCache] = None
+_cache_lock = threading.Lock()
+
+def get_review_cache() -> Optional[ReviewCache]:
+    """Process-wide cache, or None when REVIEW_CACHE=false."""
+    global _cache
+    if not ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReviewCache()
+    return _cache
@@ -0,0 +1,204 @@
+import re
+import json
+import bisect
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+from core.parsed import ParsedDocument
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RULES_DIR = REPO_ROOT / "data" / "rules"
+
+# (paragraph index or None for table/header/footer text, match start, match end)
+Hit = Tuple[Optional[int], int, int]
+
+# Global inline flags such as (?i) apply to the whole alternation (or fail to compile) once combined.
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One red-flag check. A rule fires when `when` matches and `unless` does not,
+    or, for presence checks, when `absent` matches nowhere in the document.
+    Patterns match within one paragraph, table cell, header or footer at a
+    time; set `multi_paragraph` for patterns that must span paragraphs (they
+    are searched over the whole document text, paragraphs joined by newlines).
+    """
+    id: str
+    section: str
+    issue: str
+    severity: str
+    suggestion: str = ""
+    when: Optional[str] = None
+    unless: Optional[str] = None
+    absent: Optional[str] = None
+    query: Optional[str] = None
+    citations: int = 0
+    where: Optional[Dict] = None       # metadata filter for the citation search
+    retrieval: Optional[str] = None    # dense | lexical | hybrid (default: RETRIEVAL_MODE)
+    doc_types: Tuple[str, ...] = ()
+    multi_paragraph: bool = False
+
+    def applies_to(self, doc_type: str) -> bool:
+        return not self.doc_types or doc_type in self.doc_types
+
+    def retrieval_spec(self) -> Dict:
+        """The citation search for this rule, in retrieve_many's query format."""
+        return {"query": self.query, "where": self.where, "mode": self.retrieval}
+
+class RuleSet:
+    """
+    All rules compiled into one alternation of named groups, so a document is
+    scanned once no matter how many rules exist. Each distinct pattern is a
+    group; scan() records where every pattern first matches in each paragraph.
+    The alternation only finds candidate offsets: at each one, every other
+    pattern is tried on its own, so patterns matching at the same offset are
+    all reported. Patterns that would change meaning inside the alternation
+    (capturing or named groups, backreferences, global inline flags) are
+    searched separately, and multi-paragraph patterns once over the whole
+    text. Every pattern is validated when the rules load.
+    """
+
+    def __init__(self, rules: List[Rule], version: str):
+        self.rules = rules
+        self.version = version
+        self._group_of: Dict[Tuple[str, bool], str] = {}  # (pattern, multi_paragraph) -> group
+        self._compiled: Dict[str, "re.Pattern"] = {}
+        combined: Dict[str, str] = {}
+        whole = []
+        for rule in rules:
+            for field in ("when", "unless", "absent"):
+                pattern = getattr(rule, field)
+                if not pattern or (pattern, rule.multi_paragraph) in self._group_of:
+                    continue
+                try:
+                    compiled = re.compile(pattern, re.I)
+                except re.error as e:
+                    raise ValueError(f"Rule {rule.id!r}: invalid {field} pattern {pattern!r}: {e}") from None
+                group = f"p{len(self._group_of)}"
+                self._group_of[(pattern, rule.multi_paragraph)] = group
+                self._compiled[group] = compiled
+                if rule.multi_paragraph:
+                    whole.append(group)
+                elif compiled.groups == 0 and not _GLOBAL_FLAGS.search(pattern):
+                    combined[group] = pattern
+        self._combined = list(combined)
+        self._whole = whole
+        self._separate = [g for g in self._compiled if g not in combined and g not in whole]
+        self._matcher = re.compile("|".join(f"(?P<{g}>{p})" for g, p in combined.items()) or r"(?!)", re.I)
+
+    @staticmethod
+    def _units(parsed: ParsedDocument):
+        for i, text in enumerate(parsed.paragraphs):
+            if text.strip():
+                yield i, text
+        for table in parsed.tables:
+            for row in table:
+                for cell in dict.fromkeys(row):
+                    if cell.strip():
+                        yield None, cell
+        for text in parsed.headers + parsed.footers:
+            yield None, text
+
+    def scan(self, parsed: ParsedDocument) -> Dict[str, List[Hit]]:
+        """group -> first hit per paragraph/unit, in document order."""
+        hits: Dict[str, List[Hit]] = {}
+        for idx, text in self._units(parsed):
+            seen = set()
+            pos = 0
+            while len(seen) < len(self._combined):
+                m = self._matcher.search(text, pos)
+                if not m:
+                    break
+                start = m.start()
+                for group in self._combined:
+                    if group in seen:
+                        continue
+                    end = m.end() if group == m.lastgroup else None
+                    if end is None:
+                        other = self._compiled[group].match(text, start)
+                        if other is None:
+                            continue
+                        end = other.end()
+                    seen.add(group)
+                    hits.setdefault(group, []).append((idx, start, end))
+                pos = start + 1
+                if pos > len(text):
+                    break
+            for group in self._separate:
+                m = self._compiled[group].search(text)
+                if m:
+                    hits.setdefault(group, []).append((idx, m.start(), m.end()))
+        if self._whole:
+            self._scan_whole(parsed, hits)
+        return hits
+
+    def _scan_whole(self, parsed: ParsedDocument, hits: Dict[str, List[Hit]]):
+        """First match of each multi-paragraph pattern in parsed.text, anchored in the paragraph it starts in."""
+        starts, indices, pos = [], [], 0
+        for i, text in enumerate(parsed.paragraphs):
+            if text.strip():  # parsed.text begins with the non-empty paragraphs joined by "\n"
+                starts.append(pos)
+                indices.append(i)
+                pos += len(text) + 1
+        for group in self._whole:
+            m = self._compiled[group].search(parsed.text)
+            if not m:
+                continue
+            k = bisect.bisect_right(starts, m.start()) - 1
+            if m.start() < pos and k >= 0:
+                idx = indices[k]
+                para = parsed.paragraphs[idx]
+                start = m.start() - starts[k]
+                hits.setdefault(group, []).append((idx, start, min(m.end() - starts[k], len(para))))
+            else:
+                hits.setdefault(group, []).append((None, m.start(), m.end()))
+
+    def evaluate(self, parsed: ParsedDocument, doc_type: str) -> List[Tuple[Rule, Optional[Hit]]]:
+        """Rules that fire for this document, each with its anchor hit (None = no anchor)."""
+        hits = self.scan(parsed)
+
+        def found(rule: Rule, pattern: Optional[str]) -> List[Hit]:
+            return hits.get(self._group_of[(pattern, rule.multi_paragraph)], []) if pattern else []
+
+        fired = []
+        for rule in self.rules:
+            if not rule.applies_to(doc_type):
+                continue
+            if rule.absent:
+                if not found(rule, rule.absent):
+                    fired.append((rule, None))
+                continue
+            when_hits = found(rule, rule.when)
+            if when_hits and not found(rule, rule.unless):
+                anchors = [h for h in when_hits if h[0] is not None]
+                fired.append((rule, anchors[0] if anchors else None))
+        return fired
+
+def load_ruleset(path: Path = RULES_DIR) -> RuleSet:
+    """Load every *.json rule file under `path` (or a single file)."""
+    files = sorted(path.glob("*.json")) if path.is_dir() else [path]
+    digest = hashlib.sha256()
+    rules: List[Rule] = []
+    for fp in files:
+        raw = fp.read_bytes()
+        digest.update(raw)
+        for spec in json.loads(raw.decode("utf-8")).get("rules", []):
+            spec = dict(spec)
+            spec["doc_types"] = tuple(spec.get("doc_types", ()))
+            rules.append(Rule(**spec))
+    return RuleSet(rules, digest.hexdigest()[:16])
+
+_ruleset: Optional[RuleSet] = None
+_ruleset_lock = threading.Lock()
+
+def get_ruleset() -> RuleSet:
+    global _ruleset
+    if _ruleset is None:
+        with _ruleset_lock:
+            if _ruleset is None:
+                _ruleset = load_ruleset()
+    return _ruleset
@@ -1,15 +1,45 @@
+"""
+Fetch the ADGM reference documents listed in data/sources_manifest.csv.
+
+    python -m core.sources [--base-url http://127.0.0.1:8000] [--workers 8] [--force]
+
+Downloads run concurrently over one pooled session, at most FETCH_PER_HOST
+at a time per host. Every fetch is recorded in a ledger (ETag, Last-Modified,
+SHA-256, file size and mtime) so later runs send conditional requests and an
+unchanged source costs a single 304. build_index reads the same ledger to
+reuse hashes and source metadata.
+"""
 from pathlib import Path
+import os
 import csv
+import sys
+import json
 import time
-import shutil
+import random
+import hashlib
+import argparse
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+
+load_dotenv()
 MANIFEST = REPO_ROOT / "data" / "sources_manifest.csv"
-RAW_DIR = REPO_ROOT / "data" / "adgm_refs"  
+RAW_DIR = Path(os.getenv("ADGM_REFS_DIR") or REPO_ROOT / "data" / "adgm_refs")
+LEDGER = RAW_DIR / "fetch_ledger.json"
 
-RAW_DIR.mkdir(parents=True, exist_ok=True)
+BASE_URL = os.getenv("SOURCES_BASE_URL")  # e.g. http://127.0.0.1:8000 to fetch from a local mirror
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS") or "8")
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST") or "2")
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT") or "60")
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES") or "2")
 
 HEADERS = {
     "User-Agent": "ADGM-Corporate-Agent/1.0 (+for research; contact: darren@example.com)"
@@ -18,57 +48,195 @@ HEADERS = {
 def sanitize_filename(name: str) -> str:
     return "".join(c for c in name if c.isalnum() or c in (" ", "-", "_", ".")).strip().replace(" ", "_")
 
-def download(url: str, out_path: Path, timeout=60):
-    with requests.get(url, headers=HEADERS, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            for chunk in r.iter_content(chunk_size=8192):
-                if chunk:
-                    tmp.write(chunk)
-            tmp_path = Path(tmp.name)
-    shutil.move(str(tmp_path), str(out_path))
-
-def fetch_all(max_retries=2, sleep_between=1.0):
+def target_name(row: Dict) -> str:
+    """Local filename for a manifest row: category__doc_type__<url tail>, with a .pdf/.docx suffix."""
+    url = row["url"].strip()
+    suffix = url.split("/")[-1][:70]
+    name = sanitize_filename(f"{row['category'].strip()}__{row['doc_type'].strip()}__{suffix}")
+    if not Path(name).suffix:
+        if ".pdf" in url.lower():
+            name += ".pdf"
+        elif ".docx" in url.lower():
+            name += ".docx"
+    return name
+
+def rebase(url: str, base_url: Optional[str]) -> str:
+    """Point `url` at `base_url` (scheme, host and optional path prefix), keeping its path and query."""
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, ""))
+
+def read_manifest() -> List[Dict]:
     assert MANIFEST.exists(), f"Manifest not found at {MANIFEST}"
-    failures = []
     with MANIFEST.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            url = row["url"].strip()
-            doc_type = row["doc_type"].strip()
-            category = row["category"].strip()
-            suffix = url.split("/")[-1][:70]  
-            base = sanitize_filename(f"{category}__{doc_type}__{suffix}")
-            out_path = RAW_DIR / base
-
-            if not out_path.suffix:
-                if ".pdf" in url.lower():
-                    out_path = out_path.with_suffix(".pdf")
-                elif ".docx" in url.lower():
-                    out_path = out_path.with_suffix(".docx")
-
-            if out_path.exists():
-                continue
-
-            ok = False
-            for attempt in range(max_retries + 1):
+        return [row for row in csv.DictReader(f) if row.get("url", "").strip()]
+
+def read_ledger(path: Path = LEDGER) -> Dict[str, Dict]:
+    """url -> {file, category, doc_type, etag, last_modified, sha256, size, mtime_ns, fetched_at}"""
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("sources", {})
+    except ValueError:
+        return {}
+
+def _write_ledger(ledger: Dict[str, Dict], path: Path = LEDGER):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"sources": ledger}, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+def ledger_by_file(path: Path = LEDGER) -> Dict[str, Dict]:
+    """The ledger keyed by local filename (with the source url added to each entry)."""
+    return {entry["file"]: dict(entry, url=url) for url, entry in read_ledger(path).items() if entry.get("file")}
+
+def ledger_hash(fp: Path, entry: Optional[Dict]) -> Optional[str]:
+    """The ledger's SHA-256 for `fp` if the file is still exactly what the fetcher wrote."""
+    if not entry or not entry.get("sha256"):
+        return None
+    try:
+        st = fp.stat()
+    except OSError:
+        return None
+    if st.st_size == entry.get("size") and st.st_mtime_ns == entry.get("mtime_ns"):
+        return entry["sha256"]
+    return None
+
+def make_session(pool_size: int = FETCH_WORKERS) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class Fetcher:
+    """Concurrent conditional downloader; see the module docstring."""
+
+    def __init__(self, out_dir: Path = RAW_DIR, base_url: Optional[str] = BASE_URL, workers: int = FETCH_WORKERS,
+                 per_host: int = FETCH_PER_HOST, timeout: float = FETCH_TIMEOUT,
+                 max_retries: int = FETCH_MAX_RETRIES, force: bool = False):
+        self.out_dir = Path(out_dir)
+        self.ledger_path = self.out_dir / LEDGER.name
+        self.base_url = base_url
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.force = force
+        self.session = make_session(self.workers)
+        self._hosts: Dict[str, threading.Semaphore] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.Semaphore(self.per_host)
+            return self._hosts[host]
+
+    def _get(self, url: str, headers: Dict) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+                if resp.status_code not in (429, 500, 502, 503, 504) or attempt == self.max_retries:
+                    return resp
+                retry_after = resp.headers.get("Retry-After", "")
+                resp.close()
+                delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                delay = 2 ** attempt
+            time.sleep(min(30.0, delay) * random.uniform(0.5, 1.5))
+
+    def fetch_one(self, row: Dict, entry: Optional[Dict]) -> Dict:
+        """Fetch one manifest row; returns the new ledger entry plus a `status` key."""
+        url = row["url"].strip()
+        name = target_name(row)
+        out_path = self.out_dir / name
+        base = {"file": name, "category": row["category"].strip(), "doc_type": row["doc_type"].strip()}
+
+        headers = {}
+        if entry and not self.force and out_path.exists() and entry.get("file") == name:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        source_url = rebase(url, self.base_url)
+        with self._host_slot(source_url), self._get(source_url, headers) as resp:
+            if resp.status_code == 304:
+                return dict(entry, **base, status="unchanged", fetched_at=time.time())
+            resp.raise_for_status()
+            digest = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=self.out_dir, prefix=".fetch-", delete=False) as tmp:
+                tmp_path = Path(tmp.name)
                 try:
-                    download(url, out_path)
-                    ok = True
-                    break
-                except Exception as e:
-                    if attempt == max_retries:
-                        failures.append((url, str(e)))
-                    time.sleep(sleep_between)
+                    for chunk in resp.iter_content(chunk_size=1 << 16):
+                        if chunk:
+                            tmp.write(chunk)
+                            digest.update(chunk)
+                except BaseException:
+                    tmp.close()
+                    tmp_path.unlink()
+                    raise
+            meta = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+
+        sha = digest.hexdigest()
+        if entry and entry.get("sha256") == sha and out_path.exists() and ledger_hash(out_path, entry) == sha:
+            # Server ignored the validators but the content is identical: keep the file (and its mtime).
+            tmp_path.unlink()
+            return dict(entry, **base, **meta, status="unchanged", fetched_at=time.time())
+        status = "updated" if out_path.exists() else "new"
+        os.replace(tmp_path, out_path)
+        st = out_path.stat()
+        return dict(base, **meta, sha256=sha, size=st.st_size, mtime_ns=st.st_mtime_ns,
+                    status=status, fetched_at=time.time())
 
-            if ok:
-                print(f"Saved: {out_path.name}")
-            else:
-                print(f"FAILED: {url}")
+    def run(self, rows: List[Dict]) -> Dict[str, List]:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        ledger = read_ledger(self.ledger_path)
+        summary: Dict[str, List] = {"new": [], "updated": [], "unchanged": [], "failed": []}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fetch") as pool:
+            futures = {pool.submit(self.fetch_one, row, ledger.get(row["url"].strip())): row for row in rows}
+            for fut in as_completed(futures):
+                url = futures[fut]["url"].strip()
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    summary["failed"].append((url, str(e)))
+                    continue
+                summary[result.pop("status")].append(result["file"])
+                ledger[url] = result
+        _write_ledger(ledger, self.ledger_path)
+        return summary
 
-    if failures:
+def fetch_all(base_url: Optional[str] = BASE_URL, workers: int = FETCH_WORKERS, per_host: int = FETCH_PER_HOST,
+              force: bool = False) -> Dict[str, List]:
+    fetcher = Fetcher(base_url=base_url, workers=workers, per_host=per_host, force=force)
+    summary = fetcher.run(read_manifest())
+    for name in summary["new"] + summary["updated"]:
+        print(f"Saved: {name}")
+    print(f"{len(summary['new'])} new, {len(summary['updated'])} updated, "
+          f"{len(summary['unchanged'])} unchanged, {len(summary['failed'])} failed")
+    if summary["failed"]:
         print("\nFailures:")
-        for u, err in failures:
+        for u, err in summary["failed"]:
             print(f"- {u} -> {err}")
-    else:
-        print("All sources downloaded.")
+    return summary
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Download the ADGM reference documents in sources_manifest.csv.")
+    parser.add_argument("--base-url", default=BASE_URL, help="fetch from this mirror instead of the original hosts")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS)
+    parser.add_argument("--per-host", type=int, default=FETCH_PER_HOST)
+    parser.add_argument("--force", action="store_true", help="ignore ETag/Last-Modified and download everything")
+    args = parser.parse_args(argv)
+    summary = fetch_all(args.base_url, args.workers, args.per_host, args.force)
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
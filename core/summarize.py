@@ -1,5 +1,14 @@
+import io
+import gzip
 import json
-from typing import Dict, List
+import shutil
+import hashlib
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Iterator, Optional
+
+REPORT_FORMAT = "adgm-review-report/1"
 
 def build_report(process_info: Dict, doc_types: List[Dict], issues: List[Dict]) -> str:
     return json.dumps({
@@ -9,3 +18,102 @@ def build_report(process_info: Dict, doc_types: List[Dict], issues: List[Dict])
         "missing_document": process_info["missing_document"],
         "issues_found": issues
     }, indent=2, ensure_ascii=False)
+
+def citation_ref(cite: Dict) -> str:
+    """Stable id for a cited chunk: its index chunk id, or a hash of source + text for older cache entries."""
+    if cite.get("chunk_id"):
+        return cite["chunk_id"]
+    digest = hashlib.sha256(f"{cite.get('source_file', '')}\n{cite.get('text', '')}".encode("utf-8"))
+    return "h" + digest.hexdigest()[:16]
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, mode + "b", compresslevel=6), encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+class ReportWriter:
+    """
+    Streaming review report: one JSON line per document, written as soon as
+    the document finishes. Each cited chunk is written once as a "citation"
+    record and issues refer to it by id. close() puts a compact "summary"
+    record first, so readers can stop after one line. A path ending in .gz
+    is gzip-compressed for archival.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._body = tempfile.NamedTemporaryFile("w+", encoding="utf-8", dir=self.path.parent,
+                                                 prefix=".report-", suffix=".jsonl", delete=False)
+        self._cited = set()
+        self.documents: List[Dict] = []  # compact per-document lines for the summary
+        self.severity = Counter()
+        self.n_issues = 0
+
+    def _write(self, record: Dict):
+        self._body.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _compact_issue(self, issue: Dict) -> Dict:
+        out = {k: v for k, v in issue.items() if k != "citations"}
+        refs = []
+        for cite in issue.get("citations") or []:
+            ref = citation_ref(cite)
+            if ref not in self._cited:
+                self._cited.add(ref)
+                self._write({"type": "citation", "ref": ref, "source_file": cite.get("source_file", ""),
+                             "url": cite.get("url", ""), "category": cite.get("category", ""),
+                             "text": cite.get("text", "")})
+            refs.append({"ref": ref, "source_file": cite.get("source_file", ""),
+                         "distance": cite.get("distance"), "relevance": cite.get("relevance")})
+        out["citations"] = refs
+        return out
+
+    def add_document(self, result) -> Dict:
+        """Write one finished document (an engine DocumentResult or anything with the same fields)."""
+        issues = [self._compact_issue(i) for i in result.issues]
+        record = {"type": "document", "index": result.index, "filename": result.filename,
+                  "doc_type": result.doc_type, "labels": [list(l) for l in result.labels],
+                  "error": result.error, "cached": getattr(result, "cached", False), "issues": issues}
+        self._write(record)
+        self._body.flush()
+        for issue in issues:
+            self.severity[issue.get("severity") or "Unknown"] += 1
+        self.n_issues += len(issues)
+        self.documents.append({"index": result.index, "filename": result.filename, "doc_type": result.doc_type,
+                               "issues": len(issues), "error": result.error})
+        return record
+
+    def close(self, process_info: Dict, pack_issues: Optional[List[Dict]] = None) -> Dict:
+        """Write the summary line followed by the streamed records; returns the summary."""
+        pack_issues = [self._compact_issue(i) for i in pack_issues or []]
+        self._body.close()
+        summary = {
+            "type": "summary",
+            "format": REPORT_FORMAT,
+            "process": process_info["process"],
+            "documents_uploaded": len(self.documents),
+            "required_documents": len(process_info["required_documents"]),
+            "missing_document": process_info["missing_document"],
+            "issues_found": self.n_issues,
+            "issues_by_severity": dict(self.severity),
+            "documents": sorted(self.documents, key=lambda d: d["index"]),
+            "pack_issues": pack_issues,
+        }
+        body = Path(self._body.name)
+        try:
+            with _open(self.path, "w") as out, body.open(encoding="utf-8") as src:
+                out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+                shutil.copyfileobj(src, out)
+        finally:
+            body.unlink(missing_ok=True)
+        return summary
+
+def iter_report(path: Path) -> Iterator[Dict]:
+    """Records of a report written by ReportWriter (plain or .gz), summary first."""
+    with _open(Path(path), "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_summary(path: Path) -> Dict:
+    return next(iter_report(path))
@@ -0,0 +1,217 @@
+"""
+In-process tracing and counters for the review pipeline.
+
+    with telemetry.context(pack=run_id, doc=doc_id):
+        with telemetry.span("parse", filename=name) as s:
+            ...
+    telemetry.incr("rag_cache_hits_total", cache="results")
+
+Spans carry the pack/document ids of the surrounding context and are kept in
+a bounded ring buffer. flush() appends new spans to TELEMETRY_JSONL and writes
+counters plus per-stage totals in Prometheus text format to
+TELEMETRY_PROMETHEUS (a file path, or an http(s) URL such as a Pushgateway).
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+ENABLED = (os.getenv("TELEMETRY_ENABLED") or "true").lower() == "true"
+JSONL_PATH = os.getenv("TELEMETRY_JSONL")
+PROMETHEUS_TARGET = os.getenv("TELEMETRY_PROMETHEUS")
+MAX_SPANS = int(os.getenv("TELEMETRY_MAX_SPANS") or "20000")
+METRIC_PREFIX = "adgm_"
+
+_pack: ContextVar[Optional[str]] = ContextVar("telemetry_pack", default=None)
+_doc: ContextVar[Optional[str]] = ContextVar("telemetry_doc", default=None)
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+@contextmanager
+def context(pack: Optional[str] = None, doc: Optional[str] = None):
+    """Tag spans opened inside this block (on this thread) with pack/document ids."""
+    tokens = []
+    if pack is not None:
+        tokens.append((_pack, _pack.set(pack)))
+    if doc is not None:
+        tokens.append((_doc, _doc.set(doc)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+@dataclass
+class Span:
+    name: str
+    pack: Optional[str] = None
+    doc: Optional[str] = None
+    start: float = 0.0      # wall clock (epoch seconds)
+    duration: float = 0.0   # seconds
+    attrs: Dict = field(default_factory=dict)
+
+class Recorder:
+    def __init__(self, max_spans: int = MAX_SPANS):
+        self._lock = threading.Lock()
+        self._spans: deque = deque(maxlen=max_spans)
+        # Spans awaiting the JSONL export; bounded so a process that never flushes can't grow without limit.
+        self._unexported: deque = deque(maxlen=max_spans)
+        self._counters: Dict[tuple, float] = {}
+        self._stages: Dict[str, List[float]] = {}  # name -> [count, total seconds]
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+            if JSONL_PATH:
+                if len(self._unexported) == self._unexported.maxlen:
+                    key = ("telemetry_spans_dropped_total", ())
+                    self._counters[key] = self._counters.get(key, 0) + 1
+                self._unexported.append(span)
+            stage = self._stages.setdefault(span.name, [0, 0.0])
+            stage[0] += 1
+            stage[1] += span.duration
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def spans(self, pack: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            return [s for s in self._spans if pack is None or s.pack == pack]
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            items = list(self._counters.items())
+        out = {}
+        for (name, labels), value in sorted(items):
+            label_str = ",".join(f"{k}={v}" for k, v in labels)
+            out[f"{name}{{{label_str}}}" if label_str else name] = value
+        return out
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            stages = sorted((k, list(v)) for k, v in self._stages.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value:g}")
+        if stages:
+            metric = METRIC_PREFIX + "span_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, (count, total) in stages:
+                lines.append(f"{metric}_sum{_labels((('span', name),))} {total:.6f}")
+                lines.append(f"{metric}_count{_labels((('span', name),))} {count}")
+        return "\n".join(lines) + "\n"
+
+    def take_unexported(self) -> List[Span]:
+        with self._lock:
+            out = list(self._unexported)
+            self._unexported.clear()
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._unexported.clear()
+            self._counters.clear()
+            self._stages.clear()
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+_recorder = Recorder()
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the enclosed block. The yielded Span's duration is set on exit, even when disabled."""
+    s = Span(name=name, pack=_pack.get(), doc=_doc.get(), start=time.time(), attrs=attrs)
+    t0 = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - t0
+        if ENABLED:
+            _recorder.record(s)
+
+def incr(name: str, value: float = 1, **labels):
+    if ENABLED:
+        _recorder.incr(name, value, **labels)
+
+def spans(pack: Optional[str] = None) -> List[Span]:
+    return _recorder.spans(pack)
+
+def counters() -> Dict[str, float]:
+    return _recorder.counters()
+
+def prometheus_text() -> str:
+    return _recorder.prometheus_text()
+
+def reset():
+    _recorder.reset()
+
+def waterfall(pack: str) -> List[Dict]:
+    """One row per span of a pack, with millisecond offsets from the pack's first span."""
+    pack_spans = spans(pack)
+    if not pack_spans:
+        return []
+    t0 = min(s.start for s in pack_spans)
+    names = {s.doc: s.attrs["filename"] for s in pack_spans if s.doc and "filename" in s.attrs}
+    return [{
+        "document": names.get(s.doc, s.doc) if s.doc else "(pack)",
+        "stage": s.name,
+        "start_ms": round((s.start - t0) * 1000, 2),
+        "end_ms": round((s.start - t0 + s.duration) * 1000, 2),
+        "duration_ms": round(s.duration * 1000, 2),
+    } for s in sorted(pack_spans, key=lambda s: s.start)]
+
+def flush():
+    """Export spans recorded since the last flush and the current metrics to the configured targets."""
+    if not ENABLED:
+        return
+    try:
+        new_spans = _recorder.take_unexported()
+        if JSONL_PATH and new_spans:
+            path = Path(JSONL_PATH)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                for s in new_spans:
+                    f.write(json.dumps(asdict(s), default=str) + "\n")
+        if PROMETHEUS_TARGET:
+            body = prometheus_text().encode("utf-8")
+            if PROMETHEUS_TARGET.startswith(("http://", "https://")):
+                req = urllib.request.Request(PROMETHEUS_TARGET, data=body, method="POST",
+                                             headers={"Content-Type": "text/plain; version=0.0.4"})
+                urllib.request.urlopen(req, timeout=5).close()
+            else:
+                path = Path(PROMETHEUS_TARGET)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(path.suffix + ".tmp")
+                tmp.write_bytes(body)
+                tmp.replace(path)
+    except Exception:
+        # Exporting metrics must never fail a review.
+        incr("telemetry_export_errors_total")
@@ -0,0 +1,550 @@
+"""
+Pluggable vector stores for the ADGM reference index.
+
+VECTOR_DB=chroma (default) keeps the existing Chroma collection. VECTOR_DB=faiss
+uses NumpyStore: embeddings in a flat memory-mapped file plus a JSONL sidecar
+for ids, text and metadata, searched exactly with numpy (VECTOR_INDEX=flat) or
+through a FAISS IVF/HNSW index (VECTOR_INDEX=ivf|hnsw). The memory map is
+opened read-only, so every worker process shares the same page-cache copy.
+
+    python -m core.vectorstore export    # copy the Chroma index into NumpyStore
+    python -m core.vectorstore compare   # recall@k vs latency for each backend
+"""
+import os
+import sys
+import json
+import math
+import shutil
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from core.index_meta import read_fingerprint, DB_PATH
+from core.bm25 import matches_where
+from core import telemetry
+
+NUMPY_PATH = DB_PATH / "numpy"
+COLLECTION = "adgm"
+
+load_dotenv()
+
+def _env_choice(name: str, default: str) -> str:
+    """Lower-cased setting, ignoring a trailing `# comment` copied along from .env.example."""
+    return (os.getenv(name) or "").split("#")[0].strip().lower() or default
+
+VECTOR_DB = _env_choice("VECTOR_DB", "chroma")                 # chroma | faiss
+VECTOR_INDEX = _env_choice("VECTOR_INDEX", "flat")             # flat | ivf | hnsw
+VECTOR_DTYPE = _env_choice("VECTOR_DTYPE", "float32")          # float32 | float16 | int8
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "8"))
+HNSW_M = int(os.getenv("VECTOR_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "64"))
+
+MAX_CACHED_FILTERS = 256
+
+INT8_SCALE = 127.0  # embeddings are L2-normalised, so components lie in [-1, 1]
+
+class VectorStore:
+    """
+    Minimal interface used by ingest and retrieval. query() returns, for each
+    query embedding, a list of {"id", "text", "meta", "score"} hits where
+    score is a distance (lower is closer).
+    """
+
+    def upsert(self, ids: List[str], documents: List[str], embeddings, metadatas: List[Dict]):
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def existing(self, ids: Sequence[str]) -> set:
+        """The subset of `ids` currently stored."""
+        raise NotImplementedError
+
+    def query(self, embeddings, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        raise NotImplementedError
+
+    def max_batch_size(self) -> int:
+        return 5000
+
+    def finalize(self):
+        """Called once a build has written everything (compaction, ANN index)."""
+
+class ChromaStore(VectorStore):
+    def __init__(self, path: Path = DB_PATH, reset: bool = False):
+        import chromadb
+        path.mkdir(parents=True, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=str(path))
+        if reset:
+            try:
+                self.client.delete_collection(COLLECTION)
+            except Exception:
+                pass
+        self.coll = self.client.get_or_create_collection(COLLECTION)
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.coll.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.coll.delete(ids=ids)
+
+    def count(self) -> int:
+        return self.coll.count()
+
+    def existing(self, ids):
+        ids = list(ids)
+        found = set()
+        step = self.max_batch_size()
+        for start in range(0, len(ids), step):
+            found.update(self.coll.get(ids=ids[start:start + step], include=[])["ids"])
+        return found
+
+    def max_batch_size(self) -> int:
+        try:
+            return int(self.client.get_max_batch_size())
+        except Exception:
+            return 5000
+
+    def query(self, embeddings, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        # NOTE: chromadb build does not accept "ids" in include; ids are always returned.
+        kwargs = {"where": where} if where else {}
+        res = self.coll.query(
+            query_embeddings=np.asarray(embeddings, dtype=np.float32),
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"],
+            **kwargs
+        )
+        out: List[List[Dict]] = []
+        if not res or not res.get("documents"):
+            return [[] for _ in range(len(embeddings))]
+        for q in range(len(res["documents"])):
+            hits = []
+            for i in range(len(res["documents"][q])):
+                hits.append({
+                    "id": res["ids"][q][i],
+                    "text": res["documents"][q][i],
+                    "meta": (res["metadatas"][q][i] if res.get("metadatas") else None) or {},
+                    "score": float(res["distances"][q][i]) if res.get("distances") else None,
+                })
+            out.append(hits)
+        return out
+
+    def export(self, page: int = 1000):
+        """Yield (ids, documents, embeddings, metadatas) pages of the whole collection."""
+        offset = 0
+        while True:
+            res = self.coll.get(include=["documents", "metadatas", "embeddings"], limit=page, offset=offset)
+            if not res["ids"]:
+                return
+            yield res["ids"], res["documents"], np.asarray(res["embeddings"], dtype=np.float32), res["metadatas"]
+            offset += len(res["ids"])
+
+class NumpyStore(VectorStore):
+    """
+    Append-only memory-mapped store. Rows are appended to vectors.bin and
+    rows.jsonl; deletes and overwrites tombstone old rows, and finalize()
+    compacts them away and (re)builds the FAISS index for ivf/hnsw modes.
+    config.json's row count is written last, so a torn append is ignored.
+    Every change to the rows bumps config's generation; an ANN index is only
+    used while the generation it was built at is current, so stores of
+    different modes can share the directory without serving stale rows.
+    """
+
+    def __init__(self, path: Path = NUMPY_PATH, mode: str = VECTOR_INDEX, dtype: str = VECTOR_DTYPE,
+                 reset: bool = False):
+        self.path = Path(path)
+        self.mode = mode
+        if reset and self.path.exists():
+            shutil.rmtree(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._appending = False
+        self._config = self._read_config() or {"dim": None, "dtype": dtype, "rows": 0, "generation": 0, "ann": {}}
+        self._warned_no_ann = False
+        self.dtype = np.dtype(self._config["dtype"])
+        self._load()
+
+    # -- files -------------------------------------------------------------------------------
+
+    @property
+    def _vectors_file(self) -> Path:
+        return self.path / "vectors.bin"
+
+    @property
+    def _rows_file(self) -> Path:
+        return self.path / "rows.jsonl"
+
+    @property
+    def _deleted_file(self) -> Path:
+        return self.path / "deleted.json"
+
+    @property
+    def _index_file(self) -> Path:
+        return self.path / f"index_{self.mode}.faiss"
+
+    def _read_config(self) -> Optional[Dict]:
+        fp = self.path / "config.json"
+        return json.loads(fp.read_text(encoding="utf-8")) if fp.exists() else None
+
+    def _write_config(self):
+        tmp = self.path / "config.json.tmp"
+        tmp.write_text(json.dumps(self._config), encoding="utf-8")
+        tmp.replace(self.path / "config.json")
+
+    def _load(self):
+        n = self._config["rows"]
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metas: List[Dict] = []
+        if self._rows_file.exists():
+            with self._rows_file.open(encoding="utf-8") as f:
+                for line in f:
+                    if len(self._ids) == n:
+                        break
+                    row = json.loads(line)
+                    self._ids.append(row["id"])
+                    self._texts.append(row["text"])
+                    self._metas.append(row["meta"])
+        self._deleted = set(json.loads(self._deleted_file.read_text())) if self._deleted_file.exists() else set()
+        self._row_of = {cid: i for i, cid in enumerate(self._ids) if i not in self._deleted}
+        self._filter_rows: Dict[str, np.ndarray] = {}  # where JSON -> live rows matching it
+        self._vectors = None
+        if n and self._config["dim"]:
+            self._vectors = np.memmap(self._vectors_file, dtype=self.dtype, mode="r", shape=(n, self._config["dim"]))
+        self._ann = None
+
+    def _truncate_to_config(self):
+        """Drop bytes/lines past the committed row count left by an interrupted append."""
+        n, dim = self._config["rows"], self._config["dim"] or 0
+        if self._vectors_file.exists():
+            with self._vectors_file.open("r+b") as f:
+                f.truncate(n * dim * self.dtype.itemsize)
+        if self._rows_file.exists():
+            lines = self._rows_file.read_text(encoding="utf-8").splitlines(keepends=True)[:n]
+            self._rows_file.write_text("".join(lines), encoding="utf-8")
+
+    # -- encoding ----------------------------------------------------------------------------
+
+    def _quantize(self, vecs: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return np.clip(np.rint(vecs * INT8_SCALE), -127, 127).astype(np.int8)
+        return vecs.astype(self.dtype, copy=False)
+
+    def _dequantize(self, block: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return block.astype(np.float32) / INT8_SCALE
+        return block.astype(np.float32, copy=False)
+
+    # -- writes ------------------------------------------------------------------------------
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        if vecs.ndim != 2 or not len(ids):
+            return
+        with self._lock:
+            if self._config["dim"] is None:
+                self._config["dim"] = int(vecs.shape[1])
+            if not self._appending:
+                self._truncate_to_config()
+                self._appending = True
+            for cid in ids:
+                old = self._row_of.pop(cid, None)
+                if old is not None:
+                    self._deleted.add(old)
+            with self._vectors_file.open("ab") as f:
+                f.write(self._quantize(vecs).tobytes())
+            with self._rows_file.open("a", encoding="utf-8") as f:
+                for cid, text, meta in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"id": cid, "text": text, "meta": meta}, ensure_ascii=False) + "\n")
+            self._deleted_file.write_text(json.dumps(sorted(self._deleted)))
+            first = self._config["rows"]
+            self._config["rows"] += len(ids)
+            self._bump_generation()
+            self._write_config()
+            self._ids.extend(ids)
+            self._texts.extend(documents)
+            self._metas.extend(metadatas)
+            self._row_of.update({cid: first + i for i, cid in enumerate(ids)})
+            self._filter_rows = {}
+            self._vectors = np.memmap(self._vectors_file, dtype=self.dtype, mode="r",
+                                      shape=(self._config["rows"], self._config["dim"]))
+
+    def delete(self, ids):
+        with self._lock:
+            for cid in ids:
+                row = self._row_of.pop(cid, None)
+                if row is not None:
+                    self._deleted.add(row)
+            self._deleted_file.write_text(json.dumps(sorted(self._deleted)))
+            self._filter_rows = {}
+            self._bump_generation()
+            self._write_config()
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def existing(self, ids):
+        return {cid for cid in ids if cid in self._row_of}
+
+    def max_batch_size(self) -> int:
+        return 1 << 30
+
+    def finalize(self):
+        with self._lock:
+            if self._deleted:
+                self._compact()
+                self._load()
+            if self.mode in ("ivf", "hnsw") and not self._ann_current():
+                # Only this mode's index: another mode's file stays usable while its generation is current.
+                self._index_file.unlink(missing_ok=True)
+                if self.count():
+                    self._build_ann()
+                    self._config.setdefault("ann", {})[self.mode] = self._config.get("generation", 0)
+                    self._write_config()
+            self._load()
+
+    def _bump_generation(self):
+        self._config["generation"] = self._config.get("generation", 0) + 1
+        self._config.setdefault("ann", {})
+
+    def _ann_current(self) -> bool:
+        """True when this mode's index file was built from the rows as they are now."""
+        if not self._index_file.exists():
+            return False
+        built = self._config.get("ann")
+        if built is None:  # store written before generations were tracked
+            return True
+        return built.get(self.mode) == self._config.get("generation", 0)
+
+    def _compact(self):
+        keep = sorted(self._row_of.values())
+        dim = self._config["dim"]
+        tmp_vec = self.path / "vectors.bin.tmp"
+        tmp_rows = self.path / "rows.jsonl.tmp"
+        with tmp_vec.open("wb") as fv, tmp_rows.open("w", encoding="utf-8") as fr:
+            for start in range(0, len(keep), 4096):
+                rows = keep[start:start + 4096]
+                fv.write(np.ascontiguousarray(self._vectors[rows]).tobytes())
+                for i in rows:
+                    fr.write(json.dumps({"id": self._ids[i], "text": self._texts[i], "meta": self._metas[i]},
+                                        ensure_ascii=False) + "\n")
+        self._vectors = None  # release the memmap before replacing the file
+        tmp_vec.replace(self._vectors_file)
+        tmp_rows.replace(self._rows_file)
+        self._deleted = set()
+        self._deleted_file.write_text("[]")
+        self._config["rows"] = len(keep)
+        self._config["dim"] = dim
+        self._bump_generation()  # row numbers changed
+        self._write_config()
+
+    def _build_ann(self):
+        import faiss
+        n, dim = self._config["rows"], self._config["dim"]
+        data = self._dequantize(np.asarray(self._vectors))
+        if self.dtype == np.int8:
+            qtype = faiss.ScalarQuantizer.QT_8bit
+        elif self.dtype == np.float16:
+            qtype = faiss.ScalarQuantizer.QT_fp16
+        else:
+            qtype = None
+        if self.mode == "ivf":
+            nlist = max(1, min(int(4 * math.sqrt(n)), n // 39 or 1))
+            quantizer = faiss.IndexFlatIP(dim)
+            if qtype is None:
+                index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+            index.train(data)
+        else:
+            if qtype is None:
+                index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWSQ(dim, qtype, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.add(data)
+        faiss.write_index(index, str(self._index_file))
+
+    # -- reads -------------------------------------------------------------------------------
+
+    def _ann_index(self):
+        if self._ann is None and not self._ann_current():
+            if not self._warned_no_ann:
+                self._warned_no_ann = True
+                telemetry.incr("vector_ann_missing_total", mode=self.mode)
+                warnings.warn(f"No current {self.mode} index in {self.path}; using exact flat search. "
+                              f"Run build_index (or `python -m core.vectorstore export --mode {self.mode}`) "
+                              f"to rebuild it.", RuntimeWarning, stacklevel=3)
+            return None
+        if self._ann is None:
+            import faiss
+            try:
+                self._ann = faiss.read_index(str(self._index_file), faiss.IO_FLAG_MMAP)
+            except RuntimeError:
+                self._ann = faiss.read_index(str(self._index_file))
+            if self.mode == "ivf":
+                self._ann.nprobe = IVF_NPROBE
+            else:
+                self._ann.hnsw.efSearch = HNSW_EF_SEARCH
+        return self._ann
+
+    def _rows_matching(self, where: Dict) -> np.ndarray:
+        """Live rows whose metadata matches `where`, computed once per filter until the next write."""
+        key = json.dumps(where, sort_keys=True)
+        cache = self._filter_rows
+        rows = cache.get(key)
+        if rows is None:
+            rows = np.array(sorted(i for i in self._row_of.values() if matches_where(self._metas[i], where)),
+                            dtype=np.int64)
+            if len(cache) >= MAX_CACHED_FILTERS:
+                cache.clear()
+            cache[key] = rows
+        return rows
+
+    def _search_flat(self, q: np.ndarray, k: int, where: Optional[Dict] = None):
+        if where:
+            subset = self._rows_matching(where)
+            if not len(subset):
+                return np.empty((q.shape[0], 0), dtype=np.float32), np.empty((q.shape[0], 0), dtype=np.int64)
+            scores = np.empty((q.shape[0], len(subset)), dtype=np.float32)
+            for start in range(0, len(subset), 65536):
+                block = self._dequantize(np.asarray(self._vectors[subset[start:start + 65536]]))
+                scores[:, start:start + len(block)] = q @ block.T
+        else:
+            subset = None
+            n = self._config["rows"]
+            scores = np.empty((q.shape[0], n), dtype=np.float32)
+            for start in range(0, n, 65536):
+                block = self._dequantize(np.asarray(self._vectors[start:start + 65536]))
+                scores[:, start:start + len(block)] = q @ block.T
+            if self._deleted:
+                scores[:, sorted(self._deleted)] = -np.inf
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        cols = np.take_along_axis(top, order, axis=1)
+        sims = np.take_along_axis(scores, cols, axis=1)
+        return sims, (subset[cols] if subset is not None else cols)
+
+    def query(self, embeddings, top_k: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        q = np.asarray(embeddings, dtype=np.float32)
+        if self._vectors is None or not self.count():
+            return [[] for _ in range(len(q))]
+        # Filtered queries score only the rows matching the filter (cached per filter until the
+        # next write), exactly, instead of searching the ANN graph.
+        ann = self._ann_index() if self.mode in ("ivf", "hnsw") and not where else None
+        if ann is not None:
+            sims, rows = ann.search(q, min(top_k, self._config["rows"]))
+        else:
+            sims, rows = self._search_flat(q, top_k, where)
+        out = []
+        for qi in range(len(q)):
+            hits = []
+            for sim, row in zip(sims[qi], rows[qi]):
+                row = int(row)
+                if row < 0 or row in self._deleted or not np.isfinite(sim):
+                    continue
+                hits.append({
+                    "id": self._ids[row],
+                    "text": self._texts[row],
+                    "meta": self._metas[row],
+                    # squared L2 distance between unit vectors, comparable with Chroma's default
+                    "score": max(0.0, float(2.0 - 2.0 * sim)),
+                })
+            out.append(hits)
+        return out
+
+def open_store(backend: str = VECTOR_DB, reset: bool = False) -> VectorStore:
+    if backend == "chroma":
+        return ChromaStore(reset=reset)
+    if backend in ("faiss", "numpy"):
+        return NumpyStore(reset=reset)
+    raise ValueError(f"Unknown VECTOR_DB backend: {backend!r} (expected chroma or faiss)")
+
+_store = {"fingerprint": None, "store": None}
+_store_lock = threading.Lock()
+
+def get_store() -> VectorStore:
+    """Process-wide read handle, reopened only when build_index has changed the index."""
+    fingerprint = read_fingerprint()
+    with _store_lock:
+        if _store["store"] is None or _store["fingerprint"] != fingerprint:
+            _store["store"] = open_store()
+            _store["fingerprint"] = fingerprint
+        return _store["store"]
+
+def export_chroma_to_numpy(mode: str = VECTOR_INDEX, dtype: str = VECTOR_DTYPE) -> NumpyStore:
+    target = NumpyStore(mode=mode, dtype=dtype, reset=True)
+    for ids, docs, vecs, metas in ChromaStore().export():
+        target.upsert(ids, docs, vecs, metas)
+    target.finalize()
+    return target
+
+def compare_backends(queries: Sequence[str], top_k: int = 5, modes: Sequence[str] = ("flat", "ivf", "hnsw"),
+                     repeats: int = 5) -> List[Dict]:
+    """
+    Recall@k (against exact flat search) and mean query latency for Chroma and
+    each NumpyStore mode. The numpy store must already be populated (see export).
+    """
+    from core.embeddings import get_embedder
+    q = np.asarray(get_embedder().encode(list(queries)), dtype=np.float32)
+
+    exact = NumpyStore(mode="flat")
+    truth = [{h["id"] for h in hits} for hits in exact.query(q, top_k)]
+
+    candidates = {"chroma": ChromaStore()}
+    for mode in modes:
+        store = NumpyStore(mode=mode)
+        if mode != "flat" and not store._ann_current():
+            store.finalize()
+        candidates[f"numpy-{mode}"] = store
+
+    rows = []
+    for name, store in candidates.items():
+        try:
+            store.query(q[:1], top_k)  # warm caches / memory map
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                results = store.query(q, top_k)
+            latency = (time.perf_counter() - t0) / (repeats * len(q))
+        except Exception as e:
+            rows.append({"backend": name, "error": f"{type(e).__name__}: {e}"})
+            continue
+        recall = np.mean([len(t & {h["id"] for h in hits}) / max(len(t), 1) for t, hits in zip(truth, results)])
+        rows.append({"backend": name, f"recall@{top_k}": float(recall), "ms_per_query": latency * 1000})
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Vector store utilities")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    exp = sub.add_parser("export", help="copy the Chroma collection into the numpy/FAISS store")
+    exp.add_argument("--mode", default=VECTOR_INDEX, choices=["flat", "ivf", "hnsw"])
+    exp.add_argument("--dtype", default=VECTOR_DTYPE, choices=["float32", "float16", "int8"])
+    cmp = sub.add_parser("compare", help="recall vs latency across backends")
+    cmp.add_argument("queries", nargs="*")
+    cmp.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "export":
+        store = export_chroma_to_numpy(args.mode, args.dtype)
+        print(f"Exported {store.count()} vectors to {NUMPY_PATH}")
+        return 0
+
+    queries = args.queries
+    if not queries:
+        from core.rules import get_ruleset
+        queries = [r.query for r in get_ruleset().rules if r.query]
+    for row in compare_backends(queries, args.top_k):
+        print(json.dumps(row))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
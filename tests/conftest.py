@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Module-level settings are read at import, so point the index and references at a scratch
+# directory before any core module is loaded. load_dotenv() never overrides these.
+_SCRATCH = Path(tempfile.mkdtemp(prefix="adgm-tests-"))
+os.environ.update({
+    "ADGM_INDEX_DIR": str(_SCRATCH / "index"),
+    "ADGM_REFS_DIR": str(_SCRATCH / "refs"),
+    "VECTOR_DB": "faiss",
+    "VECTOR_INDEX": "flat",
+    "INGEST_WORKERS": "1",
+    "RAG_CACHE_DIR": "",
+    "REVIEW_CACHE": "false",
+    "ENABLE_LLM_SUMMARY": "false",
+    "TELEMETRY_ENABLED": "false",
+})
+
+@pytest.fixture
+def index_dirs(monkeypatch):
+    """Empty index and reference directories, with feature-hashing embeddings instead of a model."""
+    from bench.fakes import HashingEmbedder
+    from core import embeddings
+
+    for name in ("index", "refs"):
+        shutil.rmtree(_SCRATCH / name, ignore_errors=True)
+        (_SCRATCH / name).mkdir(parents=True)
+    monkeypatch.setattr(embeddings, "_service", HashingEmbedder())
+    return _SCRATCH / "index", _SCRATCH / "refs"
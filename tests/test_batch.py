@@ -0,0 +1,29 @@
+import shutil
+from pathlib import Path
+
+from core.batch import BatchRunner, discover_packs, pack_hash
+
+SAMPLES = Path(__file__).resolve().parents[1] / "data" / "samples"
+
+def test_unreadable_pack_is_recorded_and_the_rest_reviewed(index_dirs, tmp_path):
+    good = tmp_path / "in" / "good"
+    good.mkdir(parents=True)
+    shutil.copy(SAMPLES / "AoA_bad_jurisdiction.docx", good / "aoa.docx")
+    packs = discover_packs(tmp_path / "in")
+    packs["missing"] = [tmp_path / "in" / "nowhere.docx"]
+
+    runner = BatchRunner(tmp_path / "out", doc_workers=1, pack_workers=1)
+    assert runner.run(packs) == 1
+    assert [f for f in runner.failures if f.startswith("missing:")]
+    assert (tmp_path / "out" / "good" / "reviewed" / "reviewed_aoa.docx").exists()
+    assert runner.progress.get("good") == pack_hash(packs["good"])
+
+def test_same_named_files_in_subfolders_are_kept_apart(index_dirs, tmp_path):
+    pack = tmp_path / "in" / "client"
+    for sub, sample in (("a", "AoA_bad_jurisdiction.docx"), ("b", "MoA_missing_signature.docx")):
+        (pack / sub).mkdir(parents=True)
+        shutil.copy(SAMPLES / sample, pack / sub / "doc.docx")
+
+    assert BatchRunner(tmp_path / "out", doc_workers=1).run(discover_packs(tmp_path / "in")) == 0
+    reviewed = tmp_path / "out" / "client" / "reviewed"
+    assert (reviewed / "a" / "reviewed_doc.docx").exists() and (reviewed / "b" / "reviewed_doc.docx").exists()
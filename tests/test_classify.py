@@ -0,0 +1,40 @@
+import io
+
+import pytest
+from docx import Document
+
+from core.classify import FIRST_PAGE_WEIGHT, TITLE_WEIGHT, _cue_weight, rank_labels
+from core.parsed import ParsedDocument
+
+def _docx(title, clauses):
+    doc = Document()
+    doc.add_heading(title, level=1)
+    for clause in clauses:
+        doc.add_paragraph(clause)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return ParsedDocument.from_bytes(buf.getvalue(), "doc.docx")
+
+def test_title_outweighs_repeated_body_cue():
+    clauses = [f"{n}. The board of directors may delegate its powers; the board of directors shall meet "
+               f"at least once a year and the board of directors shall keep minutes." for n in range(1, 30)]
+    ranked = rank_labels(_docx("Articles of Association", clauses))
+    assert ranked[0][0] == "Articles of Association"
+
+def test_body_cues_decide_without_a_title_match():
+    ranked = rank_labels(_docx("Resolution", ["The board of directors resolved as follows.",
+                                              "This board resolution is effective immediately."]))
+    assert ranked[0][0] == "Board Resolution"
+
+def test_title_cues_count_once():
+    clause = "These articles are to be read together with the memorandum of association of the Company as filed."
+    ranked = dict(rank_labels(_docx("Articles of Association", [clause])))
+    title = TITLE_WEIGHT * _cue_weight("articles of association")
+    body = FIRST_PAGE_WEIGHT * _cue_weight("memorandum of association")
+    assert ranked["Articles of Association"] == pytest.approx(title / (title + body))
+
+def test_decisive_title_does_not_build_the_full_text():
+    clause = "The board of directors shall meet at least once in every calendar year at the registered office."
+    parsed = _docx("Articles of Association", [clause] * 2000)
+    rank_labels(parsed)
+    assert "lower_text" not in vars(parsed) and "text" not in vars(parsed)
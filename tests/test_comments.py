@@ -0,0 +1,47 @@
+import io
+import zipfile
+
+from docx import Document
+
+from core.comments import annotate_docx
+from core.parsed import ParsedDocument
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def _source():
+    doc = Document()
+    doc.add_paragraph("Governing law.")
+    p = doc.add_paragraph("Disputes go to the ")
+    p.add_run("UAE Federal").bold = True
+    p.add_run(" Courts for resolution.")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return ParsedDocument.from_bytes(buf.getvalue(), "doc.docx")
+
+def test_comment_is_anchored_on_the_matched_text_across_runs(tmp_path):
+    parsed = _source()
+    text = parsed.paragraphs[1]
+    start = text.index("UAE")
+    issue = {"document": "doc.docx", "section": "Jurisdiction", "issue": "Wrong courts.", "severity": "High",
+             "suggestion": "Use ADGM Courts.", "citations": [], "anchor_paragraph": 1,
+             "anchor_start": start, "anchor_end": start + len("UAE Federal Courts")}
+    out = tmp_path / "reviewed.docx"
+    annotate_docx(parsed, [issue], out)
+
+    reviewed = Document(str(out))
+    assert reviewed.paragraphs[1].text == text  # splitting runs must not change the text
+    with zipfile.ZipFile(out) as z:
+        assert "word/comments.xml" in z.namelist()
+        comments = z.read("word/comments.xml").decode("utf-8")
+    assert "Wrong courts." in comments
+
+    body = reviewed.paragraphs[1]._p
+    inside, covered = False, ""
+    for el in body.iter():
+        if el.tag == W + "commentRangeStart":
+            inside = True
+        elif el.tag == W + "commentRangeEnd":
+            inside = False
+        elif el.tag == W + "t" and inside:
+            covered += el.text or ""
+    assert covered == "UAE Federal Courts"
@@ -0,0 +1,50 @@
+import io
+
+from docx import Document
+
+from core.consistency import extract_entities, find_conflicts
+from core.parsed import ParsedDocument
+
+def _docx(paragraphs, table=None):
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    if table:
+        t = doc.add_table(rows=len(table), cols=len(table[0]))
+        for r, row in enumerate(table):
+            for c, value in enumerate(row):
+                t.rows[r].cells[c].text = value
+    buf = io.BytesIO()
+    doc.save(buf)
+    return ParsedDocument.from_bytes(buf.getvalue(), "doc.docx")
+
+AOA = ["Articles of Association", "The name of the company is Falcon Ventures Ltd.",
+       "The authorised share capital of the Company is USD 50,000 divided into shares."]
+
+def test_extracts_company_name_and_capital_with_anchors():
+    parsed = _docx(AOA)
+    mentions = {m["kind"]: m for m in extract_entities(parsed, "Articles of Association")}
+    assert {"company_name", "authorised_share_capital"} <= set(mentions)
+    capital = mentions["authorised_share_capital"]
+    assert parsed.paragraphs[capital["paragraph"]][capital["start"]:capital["end"]] == capital["text"]
+
+def test_conflicting_capital_is_reported_against_both_documents():
+    aoa = extract_entities(_docx(AOA), "Articles of Association")
+    moa = extract_entities(_docx(["Memorandum of Association",
+                                  "Falcon Ventures Limited (the “Company”) is a private company.",
+                                  "The authorised share capital shall be 60,000 USD."]), "Memorandum of Association")
+    conflicts = find_conflicts([(0, "aoa.docx", "Articles of Association", aoa),
+                                (1, "moa.docx", "Memorandum of Association", moa)])
+    for doc in (0, 1):
+        rule_ids = {i["rule_id"] for i in conflicts.get(doc, [])}
+        assert "consistency_authorised_share_capital" in rule_ids
+        assert all(i["section"] == "Consistency" for i in conflicts[doc])
+    assert not any(i["rule_id"] == "consistency_company_name" for issues in conflicts.values() for i in issues)
+
+def test_agreeing_pack_has_no_conflicts():
+    aoa = extract_entities(_docx(AOA), "Articles of Association")
+    form = extract_entities(_docx(["Incorporation Application Form"],
+                                  [["Company Name", "Falcon Ventures Limited"],
+                                   ["Authorised Share Capital", "USD 50,000"]]), "Incorporation Application Form")
+    assert not find_conflicts([(0, "aoa.docx", "Articles of Association", aoa),
+                               (1, "form.docx", "Incorporation Application Form", form)])
@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from core import engine
+from core.engine import ReviewEngine
+from core.review_cache import ReviewCache
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data" / "samples" / "AoA_bad_jurisdiction.docx"
+
+@pytest.fixture
+def cached_engine(index_dirs, tmp_path):
+    def make():
+        eng = ReviewEngine(tmp_path / "out", max_workers=1)
+        eng.cache = ReviewCache(tmp_path / "review_cache.sqlite")
+        return eng
+    return make
+
+def test_review_is_cached_with_the_llm_disabled(cached_engine):
+    first = cached_engine().review([SAMPLE])[0]
+    second = cached_engine().review([SAMPLE])[0]
+    assert first.error is None and not first.cached
+    assert second.cached and second.issues == first.issues
+
+@pytest.mark.parametrize("name, value", [
+    ("RETRIEVAL_MODE", "lexical"),
+    ("COMMENT_AUTHOR", "Someone Else"),
+    ("CLASSIFIER_VERSION", 0),
+    ("EXTRACTOR_VERSION", 0),
+    ("ANNOTATION_VERSION", 0),
+])
+def test_cache_scope_changes_invalidate_cached_reviews(cached_engine, monkeypatch, name, value):
+    cached_engine().review([SAMPLE])
+    monkeypatch.setattr(engine, name, value)
+    assert not cached_engine().review([SAMPLE])[0].cached
@@ -0,0 +1,108 @@
+import json
+
+from docx import Document
+
+from core import ingest
+from core.bm25 import BM25Index
+from core.chunking import CHUNKER_VERSION
+from core.vectorstore import open_store
+
+def _write_ref(refs, name, topic, n=6):
+    doc = Document()
+    doc.add_heading(f"{topic} Regulations", level=1)
+    for i in range(1, n + 1):
+        doc.add_paragraph(f"{i}. A company must comply with the {topic} requirement number {i} "
+                          f"before registration with the Registrar in Abu Dhabi Global Market.")
+    doc.save(refs / name)
+
+def _counts():
+    manifest = ingest._load_ingest_manifest()
+    return (open_store().count(), len(BM25Index.load()),
+            sum(len(entry["chunk_ids"]) for entry in manifest.values()))
+
+def _add_legacy_row(dim=384):
+    store = open_store()
+    store.upsert(["legacy_old_chunk_99"], ["old chunker text"], [[1.0] + [0.0] * (dim - 1)],
+                 [{"source_file": "a.docx"}])
+    store.finalize()
+
+def test_incremental_build_reindexes_only_changed_files(index_dirs):
+    _, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    _write_ref(refs, "b.docx", "Data Protection")
+    ingest.build_index()
+    first = _counts()
+    assert first[0] > 0 and len(set(first)) == 1
+
+    assert ingest.build_index().startswith("Index up to date")
+    _write_ref(refs, "b.docx", "Data Protection", n=9)
+    assert "(1 new/changed" in ingest.build_index()
+    counts = _counts()
+    assert len(set(counts)) == 1 and counts[0] > first[0]
+
+def test_chunker_version_change_drops_old_chunks(index_dirs):
+    index, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    ingest.build_index()
+    _add_legacy_row()
+    manifest = json.loads(ingest.INGEST_MANIFEST.read_text(encoding="utf-8"))
+    manifest["chunker"] = CHUNKER_VERSION - 1
+    ingest.INGEST_MANIFEST.write_text(json.dumps(manifest), encoding="utf-8")
+
+    ingest.build_index()
+    counts = _counts()
+    assert len(set(counts)) == 1
+    assert not open_store().existing(["legacy_old_chunk_99"])
+
+def test_missing_manifest_with_unknown_chunks_rebuilds(index_dirs):
+    _, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    ingest.build_index()
+    _add_legacy_row()
+    ingest.INGEST_MANIFEST.unlink()
+
+    msg = ingest.build_index()
+    assert "everything was re-indexed" in msg
+    assert len(set(_counts())) == 1
+    assert not open_store().existing(["legacy_old_chunk_99"])
+
+def test_missing_chunks_are_reindexed(index_dirs):
+    _, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    _write_ref(refs, "b.docx", "Data Protection")
+    ingest.build_index()
+    manifest = ingest._load_ingest_manifest()
+    store = open_store()
+    store.delete(manifest["b.docx"]["chunk_ids"][:2])
+    store.finalize()
+
+    assert "1 sources with missing chunks re-indexed" in ingest.build_index()
+    assert len(set(_counts())) == 1
+
+def _interrupt_first_build():
+    """Leave the store and checkpoint as a first build killed after writing every chunk but before the manifest."""
+    ingest.build_index()
+    manifest = ingest._load_ingest_manifest()
+    ingest.INGEST_MANIFEST.unlink()
+    with ingest.CHECKPOINT.open("w", encoding="utf-8") as f:
+        for name, entry in manifest.items():
+            f.write(json.dumps({"source_file": name, "sha256": entry["sha256"], "ids": entry["chunk_ids"]}) + "\n")
+
+def test_interrupted_first_build_resumes_from_checkpoint(index_dirs):
+    _, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    _interrupt_first_build()
+
+    msg = ingest.build_index()
+    assert "resumed from checkpoint" in msg and "everything was re-indexed" not in msg
+    assert len(set(_counts())) == 1
+
+def test_interrupted_first_build_with_unknown_chunks_rebuilds(index_dirs):
+    _, refs = index_dirs
+    _write_ref(refs, "a.docx", "Employment")
+    _interrupt_first_build()
+    _add_legacy_row()
+
+    assert "everything was re-indexed" in ingest.build_index()
+    assert len(set(_counts())) == 1
+    assert not open_store().existing(["legacy_old_chunk_99"])
@@ -0,0 +1,90 @@
+import threading
+
+from docx import Document
+
+from core import ingest, rag
+from core.bm25 import BM25Index, matches_where, tokenize
+
+def _index():
+    index = BM25Index()
+    index.add(["a", "b", "c"],
+              ["ADGM Courts have jurisdiction over the company.",
+               "The registered office must be in Abu Dhabi Global Market.",
+               "Directors sign the register of directors, which the company secretary keeps at the registered office."],
+              [{"category": "Courts"}, {"category": "Formation"}, {"category": "Formation"}])
+    return index
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The ADGM Courts, in Abu-Dhabi!") == ["adgm", "courts", "abu", "dhabi"]
+
+def test_bm25_ranks_by_term_relevance():
+    hits = _index().search("registered office", top_k=3)
+    assert [h["id"] for h in hits] == ["b", "c"]
+    assert hits[0]["score"] > hits[1]["score"] > 0
+
+def test_bm25_applies_filters_and_updates_postings():
+    index = _index()
+    assert [h["id"] for h in index.search("office courts", where={"category": "Courts"})] == ["a"]
+    index.remove(["b"])
+    index.add(["d"], ["Office hours of the Registrar."], [{"category": "Courts"}])
+    assert {h["id"] for h in index.search("office")} == {"c", "d"}
+    assert "b" not in {h["id"] for h in index.search("registered office")}
+
+def test_bm25_round_trips_and_builds_postings_on_load(tmp_path):
+    path = tmp_path / "bm25.json"
+    _index().save(path)
+    loaded = BM25Index.load(path)
+    assert loaded._stats is not None
+    assert [h["id"] for h in loaded.search("registered office")] == ["b", "c"]
+
+def test_bm25_concurrent_first_search_sees_consistent_stats():
+    index = BM25Index()
+    index.add([str(i) for i in range(3000)], [f"clause {i} company office" for i in range(3000)], [{}] * 3000)
+    results, errors = [], []
+
+    def search():
+        try:
+            results.append([h["id"] for h in index.search("clause 7 office", top_k=3)])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors and len({tuple(r) for r in results}) == 1
+
+def test_matches_where_operators():
+    meta = {"category": "Courts", "doc_type": "Guide"}
+    assert matches_where(meta, {"category": {"$in": ["Courts", "Formation"]}})
+    assert not matches_where(meta, {"category": {"$nin": ["Courts"]}})
+    assert matches_where(meta, {"$or": [{"doc_type": "Form"}, {"category": {"$eq": "Courts"}}]})
+    assert not matches_where(meta, {"$and": [{"doc_type": "Guide"}, {"category": {"$ne": "Courts"}}]})
+
+def test_fuse_rewards_hits_found_by_both_retrievers():
+    dense = [{"id": "x", "score": 0.1}, {"id": "y", "score": 0.2}, {"id": "z", "score": 0.3}]
+    lexical = [{"id": "z", "score": 9.0}, {"id": "w", "score": 5.0}]
+    fused = rag._fuse([dense, lexical], top_k=3)
+    assert [h["id"] for h in fused] == ["z", "x", "y"]  # y and w tie at rank 2; first seen wins
+    assert fused[0]["score"] == 1 / (rag.RRF_K + 3) + 1 / (rag.RRF_K + 1)
+    assert all(a["score"] >= b["score"] for a, b in zip(fused, fused[1:]))
+
+def test_citations_separate_distance_from_relevance(index_dirs):
+    _, refs = index_dirs
+    doc = Document()
+    for i in range(1, 6):
+        doc.add_paragraph(f"{i}. The registered office of a company must be situated in Abu Dhabi Global Market, "
+                          f"and disputes are subject to the ADGM Courts under clause {i}.")
+    doc.save(refs / "guide.docx")
+    ingest.build_index()
+    rag.clear_caches()
+
+    dense = rag.retrieve("registered office ADGM Courts", top_k=3, mode="dense")
+    lexical = rag.retrieve("registered office ADGM Courts", top_k=3, mode="lexical")
+    hybrid = rag.retrieve("registered office ADGM Courts", top_k=3, mode="hybrid")
+    assert dense and all(c["distance"] is not None and c["relevance"] is None for c in dense)
+    assert [c["distance"] for c in dense] == sorted(c["distance"] for c in dense)
+    for cites in (lexical, hybrid):
+        assert cites and all(c["relevance"] is not None and c["distance"] is None for c in cites)
+        assert [c["relevance"] for c in cites] == sorted((c["relevance"] for c in cites), reverse=True)
@@ -0,0 +1,62 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from core.parsed import ParsedDocument
+from core.rules import Rule, RuleSet, get_ruleset
+
+SAMPLES = Path(__file__).resolve().parents[1] / "data" / "samples"
+
+def _parsed(paragraphs):
+    class Doc:  # just enough of python-docx for ParsedDocument
+        def __init__(self):
+            self.paragraphs = [type("P", (), {"text": t})() for t in paragraphs]
+            self.tables, self.sections = [], []
+    return ParsedDocument(Doc(), "doc.docx")
+
+def _whole_text_fires(rule, text):
+    """What the rule would do matched against the whole "\\n"-joined text, as before the rule engine."""
+    if rule.absent:
+        return not re.search(rule.absent, text, re.I)
+    return bool(re.search(rule.when, text, re.I)) and not (rule.unless and re.search(rule.unless, text, re.I))
+
+@pytest.mark.parametrize("sample, expected", [
+    ("AoA_bad_jurisdiction.docx", {"jurisdiction_uae_federal_courts", "missing_signature_block"}),
+    ("BoardResolution_incorrect_format.docx", {"missing_signature_block"}),
+    ("MoA_missing_signature.docx", {"unresolved_placeholders"}),
+])
+def test_shipped_rules_on_samples(sample, expected):
+    parsed = ParsedDocument.from_path(SAMPLES / sample)
+    fired = get_ruleset().evaluate(parsed, "Articles of Association")
+    assert {rule.id for rule, _ in fired} == expected
+    for rule, hit in fired:
+        if hit is not None and hit[0] is not None:
+            para = parsed.paragraphs[hit[0]]
+            assert re.fullmatch(rule.when, para[hit[1]:hit[2]], re.I)
+
+@pytest.mark.parametrize("sample", sorted(p.name for p in SAMPLES.glob("*.docx")))
+def test_per_paragraph_matching_agrees_with_whole_text(sample):
+    parsed = ParsedDocument.from_path(SAMPLES / sample)
+    fired = {rule.id for rule, _ in get_ruleset().evaluate(parsed, "Unknown")}
+    for rule in get_ruleset().rules:
+        assert (rule.id in fired) == _whole_text_fires(rule, parsed.text), rule.id
+
+def test_multi_paragraph_rule_matches_across_paragraphs():
+    rules = [Rule(id="split", section="S", issue="I", severity="Low", when=r"Governing\s+law\s+ADGM"),
+             Rule(id="joined", section="S", issue="I", severity="Low", when=r"Governing\s+law\s+ADGM",
+                  multi_paragraph=True)]
+    fired = RuleSet(rules, "t").evaluate(_parsed(["Intro.", "Governing law", "ADGM applies."]), "Unknown")
+    assert [(rule.id, hit) for rule, hit in fired] == [("joined", (1, 0, 13))]
+
+def test_patterns_matching_at_the_same_offset_all_fire():
+    rules = [Rule(id="short", section="S", issue="I", severity="Low", when="ADGM"),
+             Rule(id="long", section="S", issue="I", severity="Low", when="ADGM Courts"),
+             Rule(id="backref", section="S", issue="I", severity="Low", when=r"(ADGM) \1")]
+    fired = RuleSet(rules, "t").evaluate(_parsed(["Subject to ADGM Courts and ADGM ADGM."]), "Unknown")
+    assert {rule.id: hit for rule, hit in fired} == {"short": (0, 11, 15), "long": (0, 11, 22),
+                                                     "backref": (0, 27, 36)}
+
+def test_invalid_pattern_names_the_rule():
+    with pytest.raises(ValueError, match="Rule 'broken': invalid when pattern"):
+        RuleSet([Rule(id="broken", section="S", issue="I", severity="Low", when="(unclosed")], "t")
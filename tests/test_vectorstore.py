@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from core.vectorstore import NumpyStore
+
+def _vectors(n, dim=8, seed=0):
+    vecs = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+def _fill(path, n=20):
+    store = NumpyStore(path, mode="flat", reset=True)
+    store.upsert([f"c{i}" for i in range(n)], [f"text {i}" for i in range(n)], _vectors(n),
+                 [{"category": "even" if i % 2 == 0 else "odd", "n": i} for i in range(n)])
+    store.finalize()
+    return store
+
+@pytest.fixture
+def fake_ann(monkeypatch):
+    """Stand in for faiss: _build_ann just writes the index file."""
+    monkeypatch.setattr(NumpyStore, "_build_ann", lambda self: self._index_file.write_bytes(b"ann"))
+
+def test_flat_query_matches_exact_search(tmp_path):
+    store = _fill(tmp_path)
+    q = _vectors(1, seed=1)
+    hits = store.query(q, 3)[0]
+    expected = np.argsort(-(_vectors(20) @ q[0]))[:3]
+    assert [h["id"] for h in hits] == [f"c{i}" for i in expected]
+    assert hits[0]["score"] <= hits[-1]["score"]  # distances, closest first
+
+def test_filtered_query_only_returns_matching_rows(tmp_path):
+    store = _fill(tmp_path)
+    hits = store.query(_vectors(1, seed=1), 5, where={"category": "odd"})[0]
+    assert len(hits) == 5 and all(h["meta"]["category"] == "odd" for h in hits)
+    store.delete(["c1", "c3"])
+    store.upsert(["c40"], ["new"], _vectors(1, seed=2), [{"category": "odd", "n": 40}])
+    ids = {h["id"] for h in store.query(_vectors(1, seed=1), 20, where={"category": "odd"})[0]}
+    assert "c1" not in ids and "c3" not in ids and "c40" in ids
+
+def test_filtered_query_reuses_matching_rows_until_a_write(tmp_path, monkeypatch):
+    store = _fill(tmp_path)
+    calls = []
+    import core.vectorstore as vectorstore
+    real = vectorstore.matches_where
+    monkeypatch.setattr(vectorstore, "matches_where", lambda meta, where: calls.append(1) or real(meta, where))
+    for _ in range(3):
+        store.query(_vectors(2, seed=1), 3, where={"category": "even"})
+    assert len(calls) == 20
+    store.delete(["c0"])
+    assert "c0" not in {h["id"] for h in store.query(_vectors(1, seed=1), 20, where={"category": "even"})[0]}
+    assert len(calls) == 39
+
+def test_filter_matching_nothing_returns_no_hits(tmp_path):
+    store = _fill(tmp_path)
+    assert store.query(_vectors(2, seed=1), 3, where={"category": "none"}) == [[], []]
+
+def test_finalize_keeps_other_modes_index(tmp_path, fake_ann):
+    _fill(tmp_path)
+    ivf = NumpyStore(tmp_path, mode="ivf")
+    ivf.finalize()
+    NumpyStore(tmp_path, mode="hnsw").finalize()
+    assert (tmp_path / "index_ivf.faiss").exists() and (tmp_path / "index_hnsw.faiss").exists()
+    assert NumpyStore(tmp_path, mode="ivf")._ann_current()
+
+def test_stale_ann_index_warns_and_searches_exactly(tmp_path, fake_ann):
+    _fill(tmp_path)
+    NumpyStore(tmp_path, mode="ivf").finalize()
+    flat = NumpyStore(tmp_path, mode="flat")
+    flat.upsert(["c99"], ["late"], _vectors(1, seed=3), [{"category": "odd"}])
+    flat.finalize()
+    ivf = NumpyStore(tmp_path, mode="ivf")
+    assert not ivf._ann_current()
+    with pytest.warns(RuntimeWarning, match="No current ivf index"):
+        hits = ivf.query(_vectors(1, seed=3), 1)[0]
+    assert hits[0]["id"] == "c99"